@@ -0,0 +1,151 @@
+"""Alert latency of the agent daemon versus the one-shot batch run.
+
+--detections synthetic detections arrive at --rate per second, pushed to the
+daemon's queue socket (or appended to a watched NDJSON file with --via
+file). The LLM is the synthetic backend (--llm-latency seconds, lognormal
+jitter). Reported, per detection, from its arrival to its response being
+written:
+
+- daemon: what the daemon achieves analysing detections as they arrive
+- batch: the one-shot run started once the last detection has arrived, as
+  poll_detection_service is used today; every response appears when the
+  whole batch is done
+
+The daemon is then restarted on the same checkpoint with no new input, to
+check that nothing is processed twice.
+
+    python benchmarks/bench_daemon.py --detections 40 --rate 4 --concurrency 4
+"""
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+import synthetic  # also puts plan_creation on sys.path
+import threat_response_creation as agent
+from concurrent_pipeline import PipelineOptions
+from daemon import DetectionDaemon, NDJSONSource
+from llm_client import LlamaClient
+
+
+class TimedDaemon(DetectionDaemon):
+    """Records when each response is written, keyed by its detection's timestamp"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.written = {}
+
+    def write(self, responses):
+        super().write(responses)
+        now = time.time()
+        for response in responses:
+            self.written[response["detection"]["timestamp"]] = now
+
+
+def produce(detections, rate, via, target):
+    """Send detections at a fixed rate, stamping each with its arrival time"""
+    arrivals = []
+    connection = socket.create_connection(target) if via == "socket" else None
+    start = time.time()
+    for i, detection in enumerate(detections):
+        time.sleep(max(0.0, start + i / rate - time.time()))
+        detection["timestamp"] = time.time()
+        line = (json.dumps(detection) + "\n").encode("utf-8")
+        if connection is not None:
+            connection.sendall(line)
+        else:
+            with open(target, "ab") as f:
+                f.write(line)
+        arrivals.append(detection["timestamp"])
+    if connection is not None:
+        connection.close()
+    return arrivals
+
+
+def percentiles(values):
+    values = np.asarray(values)
+    return {"p50": round(float(np.percentile(values, 50)), 3), "p95": round(float(np.percentile(values, 95)), 3),
+            "max": round(float(values.max()), 3)}
+
+
+def make_daemon(workdir, args, options):
+    sources = [] if args.via == "socket" else [NDJSONSource(str(workdir / "detections.ndjson"))]
+    return TimedDaemon(sources, lambda detections: agent.process_detections(detections, options),
+                       checkpoint_path=str(workdir / "checkpoint.json"),
+                       responses_path=str(workdir / "responses.ndjson"),
+                       batch_size=args.batch_size or args.concurrency, poll_interval=args.poll_interval,
+                       listen=("127.0.0.1", 0) if args.via == "socket" else None,
+                       spool_path=str(workdir / "spool.ndjson"))
+
+
+def run_daemon(workdir, args, options, detections):
+    daemon = make_daemon(workdir, args, options)
+    runner = threading.Thread(target=daemon.run)
+    runner.start()
+    while args.via == "socket" and daemon.queue._thread is None:
+        time.sleep(0.01)
+    target = daemon.queue.address if args.via == "socket" else workdir / "detections.ndjson"
+    arrivals = produce(detections, args.rate, args.via, target)
+    while len(daemon.written) < len(arrivals):
+        time.sleep(0.01)
+    daemon.stop()
+    runner.join()
+    latencies = [daemon.written[t] - t for t in arrivals]
+    return arrivals, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--detections", type=int, default=40)
+    parser.add_argument("--rate", type=float, default=4.0, help="Detections arriving per second")
+    parser.add_argument("--via", choices=["socket", "file"], default="socket")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    agent.set_client(LlamaClient(synthetic.synthetic_llm_backend(args.llm_latency, args.llm_jitter, seed=args.seed)))
+    options = PipelineOptions(max_concurrency=args.concurrency)
+    with tempfile.TemporaryDirectory() as tmp, open("/dev/null", "w") as devnull:
+        workdir = Path(tmp)
+        stdout, sys.stdout = sys.stdout, devnull  # the agent prints every response
+        try:
+            arrivals, daemon_latencies = run_daemon(workdir, args, options,
+                                                    synthetic.synthetic_detections(args.detections, args.seed))
+            restarted = make_daemon(workdir, args, options).run(until_idle=True)
+
+            # Batch: starts when the last detection has arrived, all responses land together
+            detections = synthetic.synthetic_detections(args.detections, args.seed)
+            start = time.perf_counter()
+            agent.process_detections(detections, options)
+            batch_s = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    batch_latencies = [arrivals[-1] - t + batch_s for t in arrivals]
+
+    print(json.dumps({
+        "detections": args.detections,
+        "rate_per_s": args.rate,
+        "via": args.via,
+        "concurrency": args.concurrency,
+        "llm_latency_s": args.llm_latency,
+        "alert_latency_s": {"daemon": percentiles(daemon_latencies), "batch": percentiles(batch_latencies)},
+        "first_alert_s": {"daemon": round(daemon_latencies[0], 3), "batch": round(batch_latencies[0], 3)},
+        "batch_processing_s": round(batch_s, 3),
+        "reprocessed_after_restart": restarted["detections"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
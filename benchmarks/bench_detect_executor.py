@@ -0,0 +1,112 @@
+"""Latency of /detect-style requests with inference inline versus on InferenceExecutor.
+
+The real service needs YOLOv5 weights, so this builds a small FastAPI app with
+the same request path: an async handler that either runs a blocking
+"inference" (sleep of --service-ms, which like OpenCV/PyTorch releases the
+GIL) directly on the event loop, or awaits it on the bounded executor. It then
+fires --requests uploads at once and, during the burst, a cheap /ping request
+that does no inference. Reported: upload latency percentiles, rejected (503)
+uploads and the /ping latency, which shows whether the loop stayed responsive.
+
+    python benchmarks/bench_detect_executor.py --requests 64 --workers 4 --queue 16
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+import numpy as np
+import httpx
+from fastapi import FastAPI, File, UploadFile
+from fastapi.responses import JSONResponse
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "camera"))
+from inference_executor import InferenceExecutor, Overloaded
+
+
+def build_app(mode, service_s, workers, queue):
+    app = FastAPI()
+    executor = InferenceExecutor(workers=workers, max_queue=queue)
+
+    def inference(contents):
+        time.sleep(service_s)
+        return len(contents)
+
+    @app.exception_handler(Overloaded)
+    async def overloaded(request, exc):
+        return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+    @app.post("/detect")
+    async def detect(file: UploadFile = File(...)):
+        contents = await file.read()
+        if mode == "inline":
+            size = inference(contents)
+        else:
+            size = await executor.run(inference, contents)
+        return {"bytes": size}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app, executor
+
+
+async def burst(app, requests, payload):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Latencies are measured from when each request was issued (all at burst start, the
+        # ping 10 ms in); with inference inline, a task's own timer cannot start until the
+        # blocked loop gets round to it
+        start = time.perf_counter()
+
+        async def upload():
+            response = await client.post("/detect", files={"file": ("frame.jpg", payload)})
+            return response.status_code, time.perf_counter() - start
+
+        async def ping():
+            await asyncio.sleep(0.01)  # let the uploads get going first
+            await client.get("/ping")
+            return time.perf_counter() - (start + 0.01)
+
+        results, ping_s = await asyncio.gather(asyncio.gather(*(upload() for _ in range(requests))), ping())
+        return results, ping_s, time.perf_counter() - start
+
+
+def summarize(results, ping_s, wall_s):
+    ok = np.array([latency for status, latency in results if status == 200]) * 1000
+    return {
+        "ok": int(ok.size),
+        "rejected_503": sum(1 for status, _ in results if status == 503),
+        "p50_ms": float(np.percentile(ok, 50)) if ok.size else None,
+        "p99_ms": float(np.percentile(ok, 99)) if ok.size else None,
+        "max_ms": float(ok.max()) if ok.size else None,
+        "ping_during_burst_ms": ping_s * 1000,
+        "wall_s": wall_s,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the /detect inference executor')
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--service-ms', type=float, default=50.0)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queue', type=int, default=16)
+    parser.add_argument('--payload-kb', type=int, default=200)
+    args = parser.parse_args()
+
+    payload = np.random.default_rng(0).integers(0, 256, args.payload_kb * 1024, dtype=np.uint8).tobytes()
+    report = {"requests": args.requests, "service_ms": args.service_ms,
+              "workers": args.workers, "queue": args.queue}
+    for mode in ("inline", "executor"):
+        app, executor = build_app(mode, args.service_ms / 1000, args.workers, args.queue)
+        report[mode] = summarize(*asyncio.run(burst(app, args.requests, payload)))
+        executor.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
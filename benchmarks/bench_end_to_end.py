@@ -0,0 +1,323 @@
+"""Offline end-to-end benchmark of the detection service, sonar detector and agent.
+
+Every input and model is synthetic (see synthetic.py), so this runs without
+network access, YOLO weights, Modal or a GPU. Scenarios:
+
+  detect_camera     POST /detect with PNG frames, stand-in detector behind the
+                    real batcher and executor (in-process ASGI, no sockets)
+  detect_sonar      POST /detect with raw float32 beam buffers
+  sonar_file        sonar_threat_detector.process_sonar_data on a synthetic CSV
+  threat_detection  threat_response_creation.process_threat_detection with a
+                    fake LLM backend of --llm-latency seconds (lognormal jitter)
+
+Each scenario runs in a fresh child process, so its peak RSS is its own.
+Load is closed-loop (--concurrency callers back to back) unless --rate is
+given. With --rate, requests are sent open-loop at that many per second and
+latency counts from the scheduled send time, so queueing is not hidden. The
+report holds throughput, p50/p95/p99 latency, peak RSS and the instrumentation
+stage timings per scenario, tagged with the git commit. Write it to a file
+with --output and pass it to a later run's --compare to get ratios.
+
+    python benchmarks/bench_end_to_end.py --requests 200 --concurrency 4 --output base.json
+    python benchmarks/bench_end_to_end.py --requests 200 --concurrency 4 --compare base.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+sys.path.insert(0, str(ROOT / "sonar"))
+import synthetic
+
+SCENARIOS = ["detect_camera", "detect_sonar", "sonar_file", "threat_detection"]
+LOCATION = {"lat": 25.8371, "lon": -97.4023}
+
+
+def memory_mb(field):
+    """VmHWM (peak) or VmRSS (current) of this process in MB"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+async def drive(call, requests, rate, concurrency):
+    """Issue ``requests`` calls; returns (latencies of successes, error counts, elapsed seconds)"""
+    latencies, errors = [], {}
+
+    async def timed_call(i, scheduled):
+        try:
+            await call(i)
+        except Exception as e:
+            key = type(e).__name__ if not isinstance(e, RequestFailed) else str(e)
+            errors[key] = errors.get(key, 0) + 1
+            return
+        latencies.append(time.perf_counter() - scheduled)
+
+    start = time.perf_counter()
+    if rate:
+        slots = asyncio.Semaphore(concurrency)
+
+        async def scheduled_call(i):
+            scheduled = start + i / rate
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            async with slots:
+                await timed_call(i, scheduled)
+
+        await asyncio.gather(*(scheduled_call(i) for i in range(requests)))
+    else:
+        indices = iter(range(requests))
+
+        async def caller():
+            for i in indices:
+                await timed_call(i, time.perf_counter())
+
+        await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+class RequestFailed(Exception):
+    """A response with an error status; the message is the status code"""
+
+
+async def service_client(args):
+    """In-process client for detection_service with the stand-in detector installed"""
+    import httpx
+    import detection_service as service
+    from model_loader import ModelLoader
+
+    service.model_loader = ModelLoader(
+        lambda: synthetic.StandInDetector(args.input_size),
+        lambda model: model([np.zeros((args.height, args.width, 3), np.uint8)]),
+        name="stand-in",
+    )
+    service.model_loader.warm_up()
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=service.app), base_url="http://bench",
+                             timeout=None)
+
+
+async def setup_detect_camera(args):
+    client = await service_client(args)
+    frames = [synthetic.encode_png(frame)
+              for frame in synthetic.synthetic_frames(args.frames, args.width, args.height, seed=args.seed)]
+    location = json.dumps(LOCATION)
+
+    async def call(i):
+        response = await client.post("/detect", files={"file": ("frame.png", frames[i % len(frames)], "image/png")},
+                                     data={"detection_type": "camera", "location": location})
+        if response.status_code != 200:
+            raise RequestFailed(f"HTTP {response.status_code}")
+
+    return call, {"frames": len(frames), "frame_bytes": int(np.mean([len(f) for f in frames]))}
+
+
+async def setup_detect_sonar(args):
+    from sonar_processing import SonarConfig
+
+    client = await service_client(args)
+    config = SonarConfig(beams=args.beams)
+    samples = int(args.sonar_mb * 2**20 / 4 / args.beams)
+    buffers = [synthetic.sonar_buffer(config, samples, args.targets, seed=args.seed + k)[0] for k in range(4)]
+    location = json.dumps(LOCATION)
+    metadata = json.dumps({"beams": args.beams})
+
+    async def call(i):
+        response = await client.post("/detect", files={"file": ("ping.bin", buffers[i % len(buffers)])},
+                                     data={"detection_type": "sonar", "location": location,
+                                           "additional_data": metadata})
+        if response.status_code != 200:
+            raise RequestFailed(f"HTTP {response.status_code}")
+
+    return call, {"buffer_bytes": len(buffers[0]), "beams": args.beams}
+
+
+def threaded(fn, concurrency):
+    pool = ThreadPoolExecutor(concurrency)
+
+    async def call(i):
+        await asyncio.get_running_loop().run_in_executor(pool, fn, i)
+
+    return call
+
+
+async def setup_sonar_file(args):
+    import sonar_threat_detector as detector
+
+    workdir = tempfile.mkdtemp(prefix="bench-e2e-")
+    path = synthetic.sonar_csv(os.path.join(workdir, "pings.csv"), args.sonar_rows, seed=args.seed)
+    scorer = detector.SonarScorer(detector.load_model(args.sonar_model))
+    return threaded(lambda i: detector.process_sonar_data(path, scorer), args.concurrency), {
+        "rows": args.sonar_rows, "csv_bytes": path.stat().st_size, "model": args.sonar_model,
+    }
+
+
+async def setup_threat_detection(args):
+    import threat_response_creation as agent
+    from llm_client import LlamaClient
+
+    agent.set_client(LlamaClient(synthetic.synthetic_llm_backend(
+        args.llm_latency, args.llm_jitter, args.llm_failure_rate, seed=args.seed)))
+    detections = synthetic.synthetic_detections(64, seed=args.seed)
+    return threaded(lambda i: agent.process_threat_detection(detections[i % len(detections)], raise_errors=True),
+                    args.concurrency), {"llm_latency_s": args.llm_latency}
+
+
+def stage_summary():
+    """Per-stage timings recorded through instrumentation.py during the run, in ms"""
+    from instrumentation import REGISTRY, STAGE_METRIC
+
+    stages = {}
+    for label, value in REGISTRY.summary().items():
+        if label.startswith(STAGE_METRIC) and isinstance(value, dict):
+            name = label.split('stage="', 1)[1].rstrip('"}')
+            stages[name] = {"count": value["count"], **{k: round(value[k] * 1000, 3)
+                                                        for k in ("mean", "p50", "p95", "p99")}}
+    return stages
+
+
+async def run_child(scenario, args):
+    setup = globals()[f"setup_{scenario}"]
+    try:
+        call, info = await setup(args)
+    except ImportError as e:
+        return {"skipped": f"{type(e).__name__}: {e}"}
+    for i in range(args.warmup):
+        await call(i)
+    if "instrumentation" in sys.modules:
+        sys.modules["instrumentation"].REGISTRY.reset()
+    setup_rss = memory_mb("VmRSS")
+
+    latencies, errors, elapsed = await drive(call, args.requests, args.rate, args.concurrency)
+    latency_ms = np.array(latencies) * 1000
+    result = {
+        "requests": args.requests,
+        "ok": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "mean": round(float(latency_ms.mean()), 3) if len(latency_ms) else None,
+            **{f"p{q}": round(float(np.percentile(latency_ms, q)), 3) if len(latency_ms) else None
+               for q in (50, 95, 99)},
+            "max": round(float(latency_ms.max()), 3) if len(latency_ms) else None,
+        },
+        "setup_rss_mb": round(setup_rss, 1),
+        "peak_rss_mb": round(memory_mb("VmHWM"), 1),
+        "input": info,
+    }
+    if "instrumentation" in sys.modules:
+        result["stages_ms"] = stage_summary()
+    return result
+
+
+def child_main(scenario, args):
+    # The pipeline logs every call; keep stdout for the JSON result
+    out = sys.stdout
+    sys.stdout = io.StringIO() if args.quiet else sys.stderr
+    try:
+        result = asyncio.run(run_child(scenario, args))
+    finally:
+        sys.stdout = out
+    print(json.dumps(result))
+
+
+def git_revision():
+    def git(*command):
+        return subprocess.run(["git", *command], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+
+    return {"commit": git("rev-parse", "--short", "HEAD") or None,
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(report, baseline):
+    """Ratios against a previous report for the scenarios both have results for"""
+    comparison = {}
+    for name, current in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or "skipped" in before or "skipped" in current or not current["ok"] or not before["ok"]:
+            continue
+
+        def ratio(a, b):
+            return round(a / b, 3) if a and b else None
+
+        comparison[name] = {
+            "throughput_ratio": ratio(current["throughput_rps"], before["throughput_rps"]),
+            "p50_ratio": ratio(current["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            "p99_ratio": ratio(current["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+            "peak_rss_delta_mb": round(current["peak_rss_mb"] - before["peak_rss_mb"], 1),
+        }
+    return {"baseline_commit": baseline.get("revision", {}).get("commit"), "scenarios": comparison}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset to run")
+    parser.add_argument("--requests", type=int, default=200, help="Measured calls per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured calls before measuring")
+    parser.add_argument("--rate", type=float, default=0.0, help="Open-loop requests per second (0: closed loop)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Callers (closed loop) or max in flight")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=32, help="Distinct synthetic camera frames")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--input-size", type=int, default=320, help="Stand-in detector input size")
+    parser.add_argument("--sonar-mb", type=float, default=1.0, help="Size of each /detect sonar buffer")
+    parser.add_argument("--beams", type=int, default=16)
+    parser.add_argument("--targets", type=int, default=8, help="Echoes planted per sonar buffer")
+    parser.add_argument("--sonar-rows", type=int, default=2000, help="Pings in the sonar_file CSV")
+    parser.add_argument("--sonar-model", default=str(ROOT / "sonar" / "svm_model.npz"))
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Median fake LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="Lognormal sigma of the LLM latency")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--verbose", dest="quiet", action="store_false", help="Show pipeline logs on stderr")
+    parser.add_argument("--output", default=None, help="Also write the report to this file")
+    parser.add_argument("--compare", default=None, help="Baseline report to compare against")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child_main(args.child, args)
+        return
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("child", "output", "compare")},
+        "scenarios": {},
+    }
+    for scenario in [s for s in args.scenarios.split(",") if s]:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario {scenario!r}")
+        print(f"Running {scenario}...", file=sys.stderr)
+        proc = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--child", scenario],
+                              stdout=subprocess.PIPE, text=True)
+        lines = proc.stdout.strip().splitlines()
+        report["scenarios"][scenario] = (json.loads(lines[-1]) if proc.returncode == 0 and lines
+                                         else {"failed": f"exit code {proc.returncode}"})
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
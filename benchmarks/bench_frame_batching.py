@@ -0,0 +1,104 @@
+"""Frames per second of FrameBatcher against batch size and maximum wait.
+
+YOLOv5 weights are not available offline, so the model is a stand-in: a
+small convolutional backbone in PyTorch on --size frames, plus --call-overhead-ms
+of fixed per-call host work (YOLOv5's AutoShape letterboxing, tensor
+conversion and NMS launch are paid once per call, not per frame). Batching
+amortizes that fixed cost; how much the convolutions themselves gain depends
+on the CPU/GPU. --clients concurrent callers each submit frames back to back through
+the same FrameBatcher and InferenceExecutor path /detect uses. Reported per
+(batch size, wait) setting: throughput, mean batch size and p50/p99 per-frame
+latency.
+
+    python benchmarks/bench_frame_batching.py --batch-sizes 1,2,4,8,16 --waits-ms 0,5,20
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+import numpy as np
+import torch
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "camera"))
+from frame_batcher import FrameBatcher
+from inference_executor import InferenceExecutor
+
+
+def stand_in_model(size, call_overhead_s):
+    torch.manual_seed(0)
+    net = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 16, 3, stride=2, padding=1), torch.nn.SiLU(),
+        torch.nn.Conv2d(16, 32, 3, stride=2, padding=1), torch.nn.SiLU(),
+        torch.nn.Conv2d(32, 64, 3, stride=2, padding=1), torch.nn.SiLU(),
+        torch.nn.Conv2d(64, 85, 1),
+    ).eval()
+
+    def batch_fn(frames):
+        time.sleep(call_overhead_s)
+        with torch.inference_mode():
+            x = torch.from_numpy(np.stack(frames)).permute(0, 3, 1, 2).float().div_(255)
+            out = net(x)
+        return [float(o.max()) for o in out]
+
+    frame = np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    return batch_fn, frame
+
+
+async def run_setting(batch_fn, frame, batch_size, wait_s, clients, frames_per_client, workers):
+    executor = InferenceExecutor(workers=workers, max_queue=clients)
+    batcher = FrameBatcher(batch_fn, executor, max_batch_size=batch_size, max_wait=wait_s,
+                           max_pending=clients * 2)
+    latencies = []
+
+    async def client():
+        for _ in range(frames_per_client):
+            start = time.perf_counter()
+            await batcher.submit(frame)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    stats = batcher.stats()
+    await batcher.close()
+    executor.shutdown()
+    latencies = np.array(latencies) * 1000
+    return {
+        "batch_size": batch_size,
+        "wait_ms": wait_s * 1000,
+        "fps": len(latencies) / elapsed,
+        "mean_batch": stats["mean_batch_size"],
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark cross-request frame batching')
+    parser.add_argument('--batch-sizes', default='1,2,4,8,16')
+    parser.add_argument('--waits-ms', default='0,5,20')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--frames-per-client', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--size', type=int, default=320)
+    parser.add_argument('--call-overhead-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    batch_fn, frame = stand_in_model(args.size, args.call_overhead_ms / 1000)
+    batch_fn([frame])  # warm up
+    runs = []
+    for batch_size in [int(b) for b in args.batch_sizes.split(',')]:
+        for wait_ms in [float(w) for w in args.waits_ms.split(',')]:
+            runs.append(asyncio.run(run_setting(batch_fn, frame, batch_size, wait_ms / 1000, args.clients,
+                                                args.frames_per_client, args.workers)))
+            print(json.dumps(runs[-1]), file=sys.stderr)
+    print(json.dumps({"clients": args.clients, "call_overhead_ms": args.call_overhead_ms, "workers": args.workers, "torch_threads": torch.get_num_threads(),
+                      "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Fusion stage: lookup cost with thousands of open contacts, and how much it merges.
+
+--contacts contacts drift across a --area-km square box. Each one is reported
+by a camera every second and by sonar every --sonar-every seconds, with GPS
+noise of --noise-m metres, for --seconds seconds. Every record goes through
+FusionIndex.add in time order. Reported:
+
+- per-record add latency (p50/p99 in microseconds) while all the contacts
+  are open
+- the same nearest-incident lookup done as a linear scan over the open
+  incidents, for comparison
+- records per incident, i.e. LLM calls saved
+- purity: the share of incidents that merged records from a single true
+  contact
+- fragmentation: incidents per true contact
+- analyses: fused records handed on for analysis when the same stream
+  arrives through FusionIndex.fuse in batches of --stream-batch records, as in
+  daemon mode. An incident is re-sent only when its severity or object types
+  change
+
+    python benchmarks/bench_fusion.py --contacts 5000 --seconds 30
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "plan_creation"))
+from fusion import FusionIndex, METERS_PER_DEGREE, distance_m
+
+
+def simulate(contacts, seconds, area_km, noise_m, sonar_every, seed):
+    """Yield (contact, record) in time order"""
+    rng = np.random.default_rng(seed)
+    origin = (25.8, -97.4)
+    lon_scale = np.cos(np.radians(origin[0]))
+    position = rng.uniform(0, area_km * 1000, (contacts, 2))  # metres east, north
+    velocity = rng.normal(0, 4, (contacts, 2))  # up to a few m/s, boats and swimmers
+    for second in range(seconds):
+        sensors = ["camera"] + (["sonar"] if second % sonar_every == 0 else [])
+        for sensor in sensors:
+            noisy = position + rng.normal(0, noise_m, position.shape)
+            lats = origin[0] + noisy[:, 1] / METERS_PER_DEGREE
+            lons = origin[1] + noisy[:, 0] / (METERS_PER_DEGREE * lon_scale)
+            confidences = rng.uniform(0.4, 0.95, contacts)
+            for contact in rng.permutation(contacts):
+                coordinates = {"lat": float(lats[contact]), "lon": float(lons[contact])}
+                if sensor == "camera":
+                    record = {"objects_detected": [{"type": "boat", "confidence": float(confidences[contact])}],
+                              "coordinates": coordinates, "timestamp": float(second)}
+                else:
+                    record = {"type": "underwater_threat", "timestamp": float(second) + 0.5,
+                              "location": {"coordinates": coordinates},
+                              "detection": {"type": "mine", "confidence": float(confidences[contact])},
+                              "metadata": {"detection_method": "sonar"}}
+                yield int(contact), record
+        position += velocity
+
+
+def linear_match(index, lat, lon, at):
+    best, best_distance = None, index.distance_m
+    for incident in index.incidents.values():
+        if abs(at - incident.last_seen) > index.window_s:
+            continue
+        d = distance_m(lat, lon, incident.lat, incident.lon)
+        if d <= best_distance:
+            best, best_distance = incident, d
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contacts", type=int, default=5000)
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--area-km", type=float, default=100.0)
+    parser.add_argument("--noise-m", type=float, default=20.0)
+    parser.add_argument("--sonar-every", type=int, default=2)
+    parser.add_argument("--distance-m", type=float, default=200.0)
+    parser.add_argument("--window-s", type=float, default=10.0)
+    parser.add_argument("--linear-samples", type=int, default=200, help="Lookups timed with the linear scan")
+    parser.add_argument("--stream-batch", type=int, default=1, help="Records per fuse() call for the analyses count")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    index = FusionIndex(distance_m=args.distance_m, window_s=args.window_s)
+    latencies = []
+    members = {}  # incident id -> set of true contacts
+    incidents_of = {}  # contact -> set of incident ids
+    records = 0
+    for contact, record in simulate(args.contacts, args.seconds, args.area_km, args.noise_m,
+                                    args.sonar_every, args.seed):
+        start = time.perf_counter()
+        incident, _ = index.add(record)
+        latencies.append(time.perf_counter() - start)
+        members.setdefault(incident.incident_id, set()).add(contact)
+        incidents_of.setdefault(contact, set()).add(incident.incident_id)
+        records += 1
+
+    # Same lookups against the final open set: grid versus scanning every incident
+    rng = np.random.default_rng(args.seed + 1)
+    sample = [index.incidents[k] for k in rng.choice(list(index.incidents), args.linear_samples)]
+    at = max(i.last_seen for i in sample)
+    start = time.perf_counter()
+    for incident in sample:
+        index.match(incident.lat, incident.lon, at)
+    grid_us = (time.perf_counter() - start) / len(sample) * 1e6
+    start = time.perf_counter()
+    for incident in sample:
+        linear_match(index, incident.lat, incident.lon, at)
+    linear_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    # The same records streamed through fuse() in small batches, counting what would be analysed
+    stream_index = FusionIndex(distance_m=args.distance_m, window_s=args.window_s)
+    batch, analyses = [], 0
+    for _, record in simulate(args.contacts, args.seconds, args.area_km, args.noise_m, args.sonar_every, args.seed):
+        batch.append(record)
+        if len(batch) == args.stream_batch:
+            analyses += len(stream_index.fuse(batch))
+            batch = []
+    analyses += len(stream_index.fuse(batch)) if batch else 0
+
+    latency_us = np.array(latencies) * 1e6
+    print(json.dumps({
+        "records": records,
+        "contacts": args.contacts,
+        "incidents": index.incidents_created,
+        "open_incidents": len(index.incidents),
+        "records_per_incident": round(records / index.incidents_created, 2),
+        "purity": round(sum(len(c) == 1 for c in members.values()) / len(members), 4),
+        "incidents_per_contact": round(float(np.mean([len(i) for i in incidents_of.values()])), 3),
+        "stream_batch": args.stream_batch,
+        "analyses": analyses,
+        "records_per_analysis": round(records / analyses, 2),
+        "add_us": {"p50": round(float(np.percentile(latency_us, 50)), 1),
+                   "p99": round(float(np.percentile(latency_us, 99)), 1),
+                   "max": round(float(latency_us.max()), 1)},
+        "lookup_us": {"grid": round(grid_us, 1), "linear_scan": round(linear_us, 1)},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
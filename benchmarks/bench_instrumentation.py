@@ -0,0 +1,73 @@
+"""Overhead of instrumentation.py and accuracy of its histogram quantiles.
+
+Times --iterations empty ``with timed(...)`` blocks from --threads threads
+and reports the cost per block. Then it feeds lognormal latencies (median
+--median-ms) into a histogram and compares the bucket-estimated p50/p95/p99
+with exact numpy percentiles.
+
+    python benchmarks/bench_instrumentation.py --iterations 200000 --threads 4
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from instrumentation import Registry
+
+
+def overhead(registry, iterations, threads):
+    def work():
+        for _ in range(iterations):
+            with registry.timed("overhead"):
+                pass
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * threads) * 1e6
+
+
+def accuracy(registry, samples, median_ms, seed):
+    values = np.random.default_rng(seed).lognormal(np.log(median_ms / 1000), 0.8, samples)
+    histogram = registry.histogram("accuracy")
+    for v in values:
+        histogram.observe(float(v))
+    report = {}
+    for q in (50, 95, 99):
+        exact = float(np.percentile(values, q))
+        estimate = histogram.quantile(q / 100)
+        report[f"p{q}"] = {"exact_ms": round(exact * 1000, 3), "estimate_ms": round(estimate * 1000, 3),
+                           "relative_error": round(abs(estimate - exact) / exact, 4)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--median-ms", type=float, default=40.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    registry = Registry()
+    report = {
+        "timed_block_us": round(overhead(registry, args.iterations, args.threads), 3),
+        "quantiles": accuracy(registry, args.samples, args.median_ms, args.seed),
+        "prometheus_bytes_per_histogram": len(registry.render_prometheus()) // 2,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
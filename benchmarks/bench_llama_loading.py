@@ -0,0 +1,148 @@
+"""Cold-start cost of loading the LLM: the old Model.setup path against llama_loader.
+
+Builds a Llama-architecture checkpoint (--hidden-size, --layers, --vocab) in
+bf16 safetensors shards inside a local hub cache laid out the way the Modal
+volume is, pinned to a revision. Then each loading path runs --repeats times,
+each time in a fresh interpreter with HF_HUB_OFFLINE=1, and reports the
+median load time, peak RSS (VmHWM) and the loaded dtype:
+
+  old          Model.setup before this change: snapshot_download, then
+               from_pretrained(MODEL_ID, cache_dir=...) with no dtype or
+               device_map
+  old_fp32     the same with fp32 forced, which is what transformers 4.x did
+               by default
+  warm_cache   llama_loader.load_pretrained on the cached revision
+  preloaded    llama_loader.load_pretrained with LLAMA_MODEL_PATH pointing at
+               the snapshot directory
+
+Every path also runs one forward pass. Its next-token predictions are compared
+with warm_cache, to check that they load the same weights. old_fp32 computes
+in another precision, so it is not compared (same_predictions is null).
+
+    python benchmarks/bench_llama_loading.py --hidden-size 1024 --layers 16
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODEL_ID = "bench/tiny-llama"
+REVISION = "0" * 40
+MODES = ["old", "old_fp32", "warm_cache", "preloaded"]
+
+
+def build_cache(cache_dir: Path, hidden_size: int, layers: int, vocab: int, shard_size: str) -> Path:
+    """A hub-cache snapshot of a random bf16 Llama model; returns the snapshot directory"""
+    import torch
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    sys.path.insert(0, str(ROOT / "benchmarks"))
+    from tiny_lm import build_tokenizer
+
+    repo = cache_dir / f"models--{MODEL_ID.replace('/', '--')}"
+    snapshot = repo / "snapshots" / REVISION
+    snapshot.mkdir(parents=True)
+    (repo / "refs").mkdir()
+    (repo / "refs" / "main").write_text(REVISION)
+
+    torch.manual_seed(0)
+    config = LlamaConfig(vocab_size=vocab, hidden_size=hidden_size, intermediate_size=hidden_size * 11 // 4,
+                         num_hidden_layers=layers, num_attention_heads=hidden_size // 64,
+                         num_key_value_heads=max(1, hidden_size // 256), pad_token_id=0, bos_token_id=1,
+                         eos_token_id=2, dtype="bfloat16")
+    with torch.device("meta"):
+        model = LlamaForCausalLM(config)
+    model = model.to_empty(device="cpu").to(torch.bfloat16)
+    for param in model.parameters():
+        param.data.normal_(0, 0.02)
+    model.save_pretrained(snapshot, max_shard_size=shard_size)
+    build_tokenizer().save_pretrained(snapshot)
+    return snapshot
+
+
+def child(mode: str, cache_dir: str, snapshot: str) -> None:
+    """Runs in a fresh interpreter: load one way, print a JSON report"""
+    import time
+
+    sys.path.insert(0, str(ROOT))
+    import torch
+    from huggingface_hub import snapshot_download
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from llama_loader import load_pretrained, peak_rss_mb
+
+    # Imports cost the same on every path, so they are not timed
+    start = time.perf_counter()
+    if mode.startswith("old"):
+        snapshot_download(repo_id=MODEL_ID, cache_dir=cache_dir)
+        kwargs = {"dtype": torch.float32} if mode == "old_fp32" else {}
+        model = AutoModelForCausalLM.from_pretrained(MODEL_ID, cache_dir=cache_dir, **kwargs)
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, cache_dir=cache_dir)
+        report = {"dtype": str(next(model.parameters()).dtype)}
+    else:
+        model, tokenizer, report = load_pretrained(
+            MODEL_ID, revision=REVISION, cache_dir=cache_dir,
+            local_path=snapshot if mode == "preloaded" else None, device_map="auto")
+    load_s = time.perf_counter() - start
+    load_rss = peak_rss_mb()
+
+    with torch.inference_mode():
+        ids = tokenizer("Threat detected near the border", return_tensors="pt")["input_ids"]
+        predictions = model(ids).logits.argmax(-1)[0].tolist()
+    print(json.dumps({**report, "load_s": load_s, "peak_rss_mb": load_rss, "predictions": predictions}))
+
+
+def run_child(mode, cache_dir, snapshot):
+    env = {**os.environ, "HF_HUB_OFFLINE": "1", "TRANSFORMERS_VERBOSITY": "error"}
+    out = subprocess.run([sys.executable, __file__, "--child", mode, "--cache-dir", cache_dir,
+                          "--snapshot", snapshot], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hidden-size", type=int, default=1024)
+    parser.add_argument("--layers", type=int, default=16)
+    parser.add_argument("--vocab", type=int, default=32000)
+    parser.add_argument("--shard-size", default="200MB")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--snapshot", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.cache_dir, args.snapshot)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = build_cache(Path(tmp), args.hidden_size, args.layers, args.vocab, args.shard_size)
+        checkpoint_mb = sum(f.stat().st_size for f in snapshot.glob("*.safetensors")) / 2**20
+        runs = {mode: [] for mode in MODES}
+        for _ in range(args.repeats):
+            for mode in MODES:  # interleaved, so page-cache state is the same for every path
+                runs[mode].append(run_child(mode, tmp, str(snapshot)))
+
+    reference = runs["warm_cache"][0]
+    report = {"checkpoint_mb": round(checkpoint_mb, 1), "repeats": args.repeats, "modes": {}}
+    for mode, results in runs.items():
+        entry = {
+            "load_s": round(statistics.median(r["load_s"] for r in results), 3),
+            "peak_rss_mb": round(statistics.median(r["peak_rss_mb"] for r in results), 1),
+            "dtype": results[0]["dtype"],
+            "same_predictions": (results[0]["predictions"] == reference["predictions"]
+                                 if results[0]["dtype"] == reference["dtype"] else None),
+        }
+        for stage in ("resolve_s", "weights_s", "tokenizer_s"):
+            if stage in results[0]:
+                entry[stage] = round(statistics.median(r[stage] for r in results), 3)
+        report["modes"][mode] = entry
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Per-detection overhead of the persistent LLM client versus the legacy subprocess path.
+
+Both paths use the offline echo backend so only the calling overhead is measured:
+the subprocess path pays for a new interpreter and imports on every detection,
+the client path connects once and reuses the backend.
+
+    python benchmarks/bench_llm_client.py --detections 20
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "plan_creation"))
+
+from llm_client import LlamaClient, EchoBackend, SubprocessBackend
+from threat_response_creation import format_threat_prompt
+
+
+def time_calls(client: LlamaClient, prompts):
+    latencies = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        result = client.generate(prompt)
+        latencies.append(time.perf_counter() - start)
+        if not result.ok:
+            raise RuntimeError(result.error)
+    return latencies
+
+
+def summarize(name, latencies):
+    return {
+        "path": name,
+        "calls": len(latencies),
+        "total_s": sum(latencies),
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "median_ms": statistics.median(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LLM calling overhead per detection')
+    parser.add_argument('--detections', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(ROOT / "plan_creation" / "mock_detections.json") as f:
+        mock = json.load(f)
+    prompts = [format_threat_prompt(mock[i % len(mock)]) for i in range(args.detections)]
+
+    legacy = LlamaClient(SubprocessBackend(
+        [sys.executable, str(ROOT / "plan_creation" / "llm_client.py"), "--backend", "echo"]
+    ))
+    persistent = LlamaClient(EchoBackend())
+
+    results = [
+        summarize("subprocess", time_calls(legacy, prompts)),
+        summarize("persistent", time_calls(persistent, prompts)),
+    ]
+    results.append({
+        "speedup": results[0]["mean_ms"] / max(results[1]["mean_ms"], 1e-9)
+    })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Cold start and per-worker memory: model loaded in every worker vs. loaded before fork.
+
+YOLOv5 weights are not available offline, so the model is a stand-in: a
+convolutional network with about as many parameters as yolov5s (~7M), saved
+to a local weights file and loaded through ModelLoader like the service does.
+Two ways of running --workers server processes are compared:
+
+  per_worker    every worker is a fresh interpreter that imports torch, loads
+                the weights and warms up (uvicorn --workers, or the old
+                import-time torch.hub.load in each worker)
+  preload_fork  one process imports torch and loads the weights, then forks the
+                workers, which only warm up (gunicorn preload_app, gunicorn.conf.py)
+
+Reported per mode: time from launch until each worker is ready (weights loaded
+and one warmup inference done), and each worker's RSS, PSS (shared pages
+split between the processes sharing them) and USS (pages only it holds),
+read from /proc/<pid>/smaps_rollup while all workers are alive. total_pss_mb
+is the memory the whole group costs, including the preloading parent.
+
+    python benchmarks/bench_model_loading.py --workers 4 --size 320
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "camera"))
+from model_loader import ModelLoader
+
+
+def stand_in_model():
+    import torch
+    layers, channels = [], [3, 32, 64, 128, 256, 256, 512, 512, 512]
+    for i, (c_in, c_out) in enumerate(zip(channels, channels[1:])):
+        stride = 2 if i < 5 else 1
+        layers += [torch.nn.Conv2d(c_in, c_out, 3, stride=stride, padding=1), torch.nn.SiLU()]
+    layers.append(torch.nn.Conv2d(512, 255, 1))
+    return torch.nn.Sequential(*layers)
+
+
+def make_loader(weights: str, size: int) -> ModelLoader:
+    def load():
+        import torch
+        model = stand_in_model()
+        model.load_state_dict(torch.load(weights, map_location="cpu", weights_only=True))
+        return model.eval()
+
+    def warmup(model):
+        import torch
+        with torch.inference_mode():
+            model(torch.zeros(1, 3, size, size))
+
+    return ModelLoader(load, warmup, name="stand-in")
+
+
+def memory(pid: int):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss_mb": round(fields["Rss"], 1),
+        "pss_mb": round(fields["Pss"], 1),
+        "uss_mb": round(fields["Private_Clean"] + fields["Private_Dirty"], 1),
+    }
+
+
+def child_main(weights: str, size: int, launched: float) -> None:
+    """One per_worker server process: load everything itself, report, then wait to be measured"""
+    loader = make_loader(weights, size)
+    loader.warm_up()
+    print(json.dumps({"pid": os.getpid(), "ready_s": time.time() - launched, **loader.timings}), flush=True)
+    signal.pause()
+
+
+def run_per_worker(weights: str, size: int, workers: int):
+    launched = time.time()
+    procs = [subprocess.Popen([sys.executable, __file__, "--child", weights, "--size", str(size),
+                               "--launched", repr(launched)], stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    reports = [json.loads(p.stdout.readline()) for p in procs]
+    for report in reports:
+        report.update(memory(report["pid"]))
+    for p in procs:
+        p.terminate()
+        p.wait()
+    return reports, None
+
+
+def preload_main(weights: str, size: int, workers: int, launched: float) -> None:
+    """The preload_fork parent: load once, fork the workers, report for all of them"""
+    loader = make_loader(weights, size)
+    loader.load_weights()
+    for _ in range(workers):
+        if os.fork() == 0:
+            loader.warm_up()
+            report = {"pid": os.getpid(), "ready_s": time.time() - launched, **loader.timings}
+            os.write(1, (json.dumps(report) + "\n").encode())
+            signal.pause()
+            os._exit(0)
+    os.write(1, (json.dumps({"parent": os.getpid(), **loader.timings}) + "\n").encode())
+    signal.signal(signal.SIGTERM, lambda *_: os.killpg(0, signal.SIGKILL))
+    signal.pause()
+
+
+def run_preload_fork(weights: str, size: int, workers: int):
+    launched = time.time()
+    proc = subprocess.Popen([sys.executable, __file__, "--preload", weights, "--size", str(size),
+                             "--workers", str(workers), "--launched", repr(launched)],
+                            stdout=subprocess.PIPE, text=True, start_new_session=True)
+    reports, parent_report = [], None
+    while len(reports) < workers or parent_report is None:
+        message = json.loads(proc.stdout.readline())
+        if "parent" in message:
+            parent_report = message
+        else:
+            reports.append(message)
+    for report in reports:
+        report.update(memory(report["pid"]))
+    parent_report.update(memory(proc.pid))
+    # Takes the forked workers down with it (they share its process group)
+    proc.terminate()
+    proc.wait()
+    return reports, parent_report
+
+
+def summarize(reports, parent_report):
+    total_pss = sum(r["pss_mb"] for r in reports) + (parent_report["pss_mb"] if parent_report else 0)
+    return {
+        "all_ready_s": round(max(r["ready_s"] for r in reports), 3),
+        "mean_ready_s": round(sum(r["ready_s"] for r in reports) / len(reports), 3),
+        "mean_rss_mb": round(sum(r["rss_mb"] for r in reports) / len(reports), 1),
+        "mean_pss_mb": round(sum(r["pss_mb"] for r in reports) / len(reports), 1),
+        "mean_uss_mb": round(sum(r["uss_mb"] for r in reports) / len(reports), 1),
+        "total_pss_mb": round(total_pss, 1),
+        "parent": parent_report,
+        "workers": reports,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--size", type=int, default=320, help="Warmup frame size")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--preload", help=argparse.SUPPRESS)
+    parser.add_argument("--launched", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child_main(args.child, args.size, args.launched)
+        return
+    if args.preload:
+        preload_main(args.preload, args.size, args.workers, args.launched)
+        return
+
+    import torch
+    with tempfile.TemporaryDirectory() as tmp:
+        weights = os.path.join(tmp, "stand_in.pt")
+        model = stand_in_model()
+        torch.save(model.state_dict(), weights)
+        params = sum(p.numel() for p in model.parameters())
+        del model
+        report = {
+            "workers": args.workers,
+            "parameters": params,
+            "weights_mb": round(os.path.getsize(weights) / 2**20, 1),
+            "per_worker": summarize(*run_per_worker(weights, args.size, args.workers)),
+            "preload_fork": summarize(*run_preload_fork(weights, args.size, args.workers)),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Load time and memory of .ping archives versus parsing sonar CSV.
+
+Writes a synthetic labelled CSV of --rows pings (about 1.3 KB per row, so the
+default 2M rows is ~2.6 GB), converts it to a .ping archive, then loads each in
+a fresh child process and reports wall time, time to a full pass over the
+features, and the child's peak RSS.
+
+    python benchmarks/bench_ping_store.py --rows 2000000 --workdir /tmp/ping-bench
+"""
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sonar"))
+from ping_store import csv_to_ping, load_dataset
+
+
+def write_synthetic_csv(path, rows, chunk_rows=100_000, seed=0):
+    rng = np.random.default_rng(seed)
+    with open(path, "w") as f:
+        for start in range(0, rows, chunk_rows):
+            count = min(chunk_rows, rows - start)
+            values = rng.random((count, 60))
+            labels = rng.choice(["R", "M"], count)
+            for row, label in zip(values, labels):
+                f.write(",".join(f"{v:.4f}" for v in row) + f",{label}\n")
+
+
+def peak_rss_mb():
+    """Peak RSS of this process image; ru_maxrss is carried over from the parent across exec"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(kind, path):
+    """Runs in a subprocess so peak RSS belongs to this loader alone"""
+    start = time.perf_counter()
+    features, labels = load_dataset(path)
+    load_s = time.perf_counter() - start
+    checksum = float(np.asarray(features[:, 0], dtype=np.float64).sum())
+    for start_row in range(0, len(features), 100_000):
+        checksum += float(features[start_row:start_row + 100_000].sum(dtype=np.float64))
+    pass_s = time.perf_counter() - start
+    print(json.dumps({
+        "format": kind,
+        "rows": len(features),
+        "load_s": load_s,
+        "load_and_full_pass_s": pass_s,
+        "peak_rss_mb": peak_rss_mb(),
+        "checksum": checksum,
+    }))
+
+
+def run_child(kind, path):
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", kind, str(path)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark .ping archives against CSV parsing')
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--workdir', default='/tmp/ping-bench')
+    parser.add_argument('--child', nargs=2, metavar=('FORMAT', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    csv_path = workdir / f"sonar_{args.rows}.csv"
+    if not csv_path.exists():
+        write_synthetic_csv(csv_path, args.rows)
+
+    start = time.perf_counter()
+    ping_path = csv_to_ping(csv_path)
+    convert_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "rows": args.rows,
+        "csv_mb": csv_path.stat().st_size / 2**20,
+        "ping_mb": ping_path.stat().st_size / 2**20,
+        "convert_s": convert_s,
+        "csv": run_child("csv", csv_path),
+        "ping": run_child("ping", ping_path),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Prefix KV-cache reuse for the threat-analysis prompt, on CPU with a tiny causal LM.
+
+Registers THREAT_PROMPT_PREFIX once, then for every mock detection compares the
+cached path against plain generation of THREAT_PROMPT_PREFIX + prompt:
+completions must match exactly (exit status 1 otherwise), and
+time-to-first-token plus prefill FLOPs (~2 * params * prefilled tokens) are
+reported for both.
+
+    python benchmarks/bench_prefix_cache.py --repeats 5
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from tiny_lm import ROOT, load_tiny_lm
+from llama_engine import GenerationEngine
+
+sys.path.insert(0, str(ROOT / "plan_creation"))
+from threat_response_creation import (
+    THREAT_PROMPT_PREFIX, THREAT_PROMPT_PREFIX_NAME, format_detection_section
+)
+
+
+def time_first_token(engine, prompt, use_cache, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        engine.generate_with_prefix(THREAT_PROMPT_PREFIX_NAME, [prompt], max_new_tokens=1, use_cache=use_cache)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark prefix KV-cache reuse')
+    parser.add_argument('--model', default=None, help='Path to a local HF causal LM (default: random tiny Llama)')
+    parser.add_argument('--hidden-size', type=int, default=256)
+    parser.add_argument('--layers', type=int, default=4)
+    parser.add_argument('--max-new-tokens', type=int, default=24)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    model, tokenizer = load_tiny_lm(args.model, hidden_size=args.hidden_size, layers=args.layers)
+    engine = GenerationEngine(model, tokenizer, max_new_tokens=args.max_new_tokens,
+                              generation_kwargs={"do_sample": False})
+    params = sum(p.numel() for p in model.parameters())
+
+    start = time.perf_counter()
+    prefix = engine.register_prefix(THREAT_PROMPT_PREFIX_NAME, THREAT_PROMPT_PREFIX)
+    register_s = time.perf_counter() - start
+
+    with open(ROOT / "plan_creation" / "mock_detections.json") as f:
+        detections = json.load(f)
+    prompts = [format_detection_section(detection) for detection in detections]
+
+    mismatches = 0
+    rows = []
+    for prompt in prompts:
+        cached = engine.generate_with_prefix(THREAT_PROMPT_PREFIX_NAME, [prompt])
+        mismatches += cached != [engine.generate(THREAT_PROMPT_PREFIX + prompt)]
+
+        total_tokens = engine.prefix_inputs(THREAT_PROMPT_PREFIX_NAME, [prompt])[0].shape[1]
+        suffix_tokens = total_tokens - prefix.num_tokens
+        rows.append({
+            "prefix_tokens": prefix.num_tokens,
+            "suffix_tokens": suffix_tokens,
+            "ttft_uncached_ms": time_first_token(engine, prompt, False, args.repeats) * 1000,
+            "ttft_cached_ms": time_first_token(engine, prompt, True, args.repeats) * 1000,
+            "prefill_gflops_uncached": 2 * params * total_tokens / 1e9,
+            "prefill_gflops_cached": 2 * params * suffix_tokens / 1e9,
+        })
+
+    # All detections in one batch must also match plain generation
+    batched = engine.generate_with_prefix(THREAT_PROMPT_PREFIX_NAME, prompts)
+    reference = [engine.generate(THREAT_PROMPT_PREFIX + prompt) for prompt in prompts]
+    mismatches += sum(a != b for a, b in zip(batched, reference))
+
+    print(json.dumps({
+        "model_params": params,
+        "register_prefix_ms": register_s * 1000,
+        "detections": rows,
+        "mismatches": mismatches,
+    }, indent=2))
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
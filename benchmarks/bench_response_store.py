@@ -0,0 +1,149 @@
+"""Response store: write cost and query latency at millions of records.
+
+--records responses, arriving in time order over --days days and spread
+over a --area-km square box, are appended in batches of --batch. Severities
+are skewed toward low, as triage sees them. Reported:
+
+- write cost per response (µs), and the file size
+- the cost of appending one response to a JSON list file the way main() used
+  to write threat_responses.json (reload and rewrite everything), measured
+  on --json-records records
+- latency (p50/max over --repeats runs) of typical dashboard queries:
+  "high severity in the last hour near X", the newest page, a page 1000
+  pages deep, one sensor over the last day, and everything near X
+
+    python benchmarks/bench_response_store.py --records 1000000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from detection_records import METERS_PER_DEGREE
+from response_store import ResponseStore
+
+ORIGIN = (25.8, -97.4)
+SENSORS = ["camera", "sonar", "video"]
+SEVERITIES = ["none", "low", "medium", "high"]
+SEVERITY_WEIGHTS = [0.3, 0.45, 0.2, 0.05]
+
+
+def synthetic_responses(count, days, area_km, seed):
+    rng = random.Random(seed)
+    now = time.time()
+    lon_scale = np.cos(np.radians(ORIGIN[0]))
+    for i in range(count):
+        severity = rng.choices(SEVERITIES, SEVERITY_WEIGHTS)[0]
+        sensor = rng.choice(SENSORS)
+        lat = ORIGIN[0] + rng.uniform(0, area_km * 1000) / METERS_PER_DEGREE
+        lon = ORIGIN[1] + rng.uniform(0, area_km * 1000) / (METERS_PER_DEGREE * lon_scale)
+        detection = {"type": f"{sensor}_detection", "metadata": {"detection_method": sensor}}
+        yield {
+            "threat_level": severity,
+            "detection": {"type": detection["type"], "timestamp": now - (count - i) / count * days * 86400,
+                          "location": {"coordinates": {"lat": round(lat, 6), "lon": round(lon, 6)}}},
+            "analysis": {"threat_analysis": {"severity": severity, "threat_type": "vessel",
+                                             "confidence": round(rng.random(), 3)},
+                         "recommended_actions": ["monitor"]},
+        }, detection
+
+
+def timed(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": round(float(np.median(times)), 3), "max_ms": round(max(times), 3),
+            "items": len(result["items"])}
+
+
+def json_append_cost(path, records, seed):
+    responses = [r for r, _ in synthetic_responses(records, 1, 10, seed)]
+    with open(path, "w") as f:
+        json.dump(responses, f, indent=2)
+    start = time.perf_counter()
+    with open(path) as f:
+        existing = json.load(f)
+    existing.append(responses[0])
+    with open(path, "w") as f:
+        json.dump(existing, f, indent=2)
+    return (time.perf_counter() - start) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=100, help="Responses written per transaction")
+    parser.add_argument("--days", type=float, default=30.0)
+    parser.add_argument("--area-km", type=float, default=200.0)
+    parser.add_argument("--radius-m", type=float, default=10000.0)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json-records", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResponseStore(os.path.join(tmp, "store.db"))
+        batch, detections = [], []
+        write_s = 0.0
+        for response, detection in synthetic_responses(args.records, args.days, args.area_km, args.seed):
+            batch.append(response)
+            detections.append(detection)
+            if len(batch) == args.batch:
+                start = time.perf_counter()
+                store.add_responses(batch, detections)
+                write_s += time.perf_counter() - start
+                batch, detections = [], []
+        if batch:
+            start = time.perf_counter()
+            store.add_responses(batch, detections)
+            write_s += time.perf_counter() - start
+
+        now = time.time()
+        half = args.area_km * 500
+        center = (ORIGIN[0] + half / METERS_PER_DEGREE,
+                  ORIGIN[1] + half / (METERS_PER_DEGREE * np.cos(np.radians(ORIGIN[0]))))
+        near = (*center, args.radius_m)
+
+        # Walk 1000 pages to time it and to get a deep cursor for the page query
+        start = time.perf_counter()
+        page = store.query(limit=50)
+        for _ in range(999):
+            cursor = page["next_cursor"]
+            page = store.query(limit=50, cursor=cursor)
+        deep_ms = (time.perf_counter() - start) * 1000
+
+        queries = {
+            "high_last_hour_near": lambda: store.query(severity="high", since=now - 3600, near=near),
+            "newest_page": lambda: store.query(limit=50),
+            "page_1000": lambda: store.query(limit=50, cursor=cursor),
+            "sonar_last_day": lambda: store.query(sensor="sonar", since=now - 86400),
+            "high_near_all_time": lambda: store.query(min_severity="high", near=near),
+            "near_all_time": lambda: store.query(near=near),
+        }
+        report = {
+            "records": args.records,
+            "spatial_index": store.spatial,
+            "write_us_per_response": round(write_s / args.records * 1e6, 2),
+            "file_mb": round(sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 2**20, 1),
+            "json_rewrite_us_per_response": round(json_append_cost(os.path.join(tmp, "responses.json"),
+                                                                   args.json_records, args.seed), 1),
+            "json_records": args.json_records,
+            "walk_1000_pages_ms": round(deep_ms, 1),
+            "queries": {name: timed(fn, args.repeats) for name, fn in queries.items()},
+        }
+        store.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Sonar SVM inference: NumPy evaluator on svm_model.npz versus the pickled SVC.
+
+Startup is measured in fresh interpreters (import the detector, load the
+model, score one ping). Per-batch latency is the median over --repeats calls
+at each batch size, and the decisions of both paths are compared on the same
+synthetic pings.
+
+    python benchmarks/bench_sonar_inference.py --repeats 200
+"""
+import sys
+import json
+import time
+import argparse
+import subprocess
+import statistics
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sonar"))
+import sonar_threat_detector as detector
+
+MODELS = {
+    "numpy": ROOT / "sonar" / "svm_model.npz",
+    "sklearn": ROOT / "sonar" / "svm_model.pkl",
+}
+
+STARTUP_SNIPPET = """
+import sys, time, warnings
+warnings.simplefilter('ignore')
+start = time.perf_counter()
+sys.path.insert(0, {sonar!r})
+import numpy as np
+import sonar_threat_detector as detector
+scorer = detector.SonarScorer(detector.load_model({model!r}))
+scorer.score(np.zeros((1, detector.NUM_FEATURES)))
+print(time.perf_counter() - start, len(sys.modules))
+"""
+
+
+def measure_startup(model_path, runs):
+    code = STARTUP_SNIPPET.format(sonar=str(ROOT / "sonar"), model=str(model_path))
+    samples, modules = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+        process_s = time.perf_counter() - start
+        in_process_s, modules = out.split()
+        samples.append((float(in_process_s), process_s))
+    return {
+        "import_and_load_s": statistics.median(s[0] for s in samples),
+        "process_s": statistics.median(s[1] for s in samples),
+        "modules_loaded": int(modules),
+    }
+
+
+def synthetic_pings(count, seed=0):
+    base = np.loadtxt(ROOT / "sonar" / "sonar.csv", delimiter=",", usecols=range(detector.NUM_FEATURES))
+    rng = np.random.default_rng(seed)
+    return np.clip(base[rng.integers(0, len(base), count)] + rng.normal(0, 0.02, (count, base.shape[1])), 0, 1)
+
+
+def batch_latency(scorer, X, batch_size, repeats):
+    timings = []
+    for i in range(repeats):
+        start = (i * batch_size) % (len(X) - batch_size + 1)
+        batch = X[start:start + batch_size]
+        t0 = time.perf_counter()
+        scorer.score(batch)
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark NumPy versus scikit-learn sonar inference')
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--startup-runs', type=int, default=5)
+    parser.add_argument('--batch-sizes', default='1,16,256,4096')
+    args = parser.parse_args()
+
+    import warnings
+    warnings.simplefilter('ignore')
+    scorers = {name: detector.SonarScorer(detector.load_model(path)) for name, path in MODELS.items()}
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+    X = synthetic_pings(max(100_000, max(batch_sizes)))
+
+    mine = {name: scorer.score(X) for name, scorer in scorers.items()}
+    report = {
+        "startup": {name: measure_startup(path, args.startup_runs) for name, path in MODELS.items()},
+        "batch_latency_us": {
+            str(size): {name: batch_latency(scorer, X, size, args.repeats) for name, scorer in scorers.items()}
+            for size in batch_sizes
+        },
+        "equivalence": {
+            "pings": len(X),
+            "decision_mismatches": int((mine["numpy"][0] != mine["sklearn"][0]).sum()),
+            "max_abs_confidence_diff": float(np.abs(mine["numpy"][1] - mine["sklearn"][1]).max()),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Sonar peak detection throughput and accuracy on synthetic echoes.
+
+Each buffer is white noise across --beams channels with --targets chirp
+echoes planted at random beams and ranges, at SNRs spread over --snr-db. The
+buffer is handed to detect_peaks as raw bytes, the way /detect receives it.
+Detections within one beam and one resolution cell of a planted echo count as
+hits; everything else is a false alarm.
+
+    python benchmarks/bench_sonar_peaks.py --sizes-mb 1,8,32 --beams 64
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "camera"))
+from sonar_processing import SonarConfig, detect_peaks
+from synthetic import sonar_buffer
+
+
+def score(peaks, truth, config):
+    tolerance = config.resolution_cells()
+    matched = np.zeros(len(peaks), dtype=bool)
+    detected_snr, missed_snr = [], []
+    for beam, start, snr in truth:
+        close = (np.abs(peaks.beam - beam) <= 1) & (np.abs(peaks.sample - start) <= tolerance) & ~matched
+        if close.any():
+            matched[np.argmax(close)] = True
+            detected_snr.append(float(snr))
+        else:
+            missed_snr.append(float(snr))
+    return {
+        "planted": len(truth),
+        "detected": len(detected_snr),
+        "false_alarms": int((~matched).sum()),
+        "weakest_detected_snr_db": min(detected_snr) if detected_snr else None,
+        "strongest_missed_snr_db": max(missed_snr) if missed_snr else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vectorized sonar peak detection')
+    parser.add_argument('--sizes-mb', default='1,8,32', help='Comma-separated buffer sizes in MB')
+    parser.add_argument('--beams', type=int, default=64)
+    parser.add_argument('--targets', type=int, default=50)
+    parser.add_argument('--snr-db', type=float, nargs=2, default=(14.0, 30.0))
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    config = SonarConfig(beams=args.beams)
+    runs = []
+    for size_mb in [float(size) for size in args.sizes_mb.split(',')]:
+        samples = int(size_mb * 2 ** 20 / 4 / args.beams)
+        buffer, truth = sonar_buffer(config, samples, args.targets, args.snr_db)
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            peaks = detect_peaks(buffer, config)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        runs.append({
+            "buffer_mb": len(buffer) / 2 ** 20,
+            "beams": args.beams,
+            "samples_per_beam": samples,
+            "seconds": best,
+            "mb_per_s": len(buffer) / 2 ** 20 / best,
+            "msamples_per_s": len(buffer) / 4 / best / 1e6,
+            **score(peaks, truth, config),
+        })
+    print(json.dumps({"config": vars(config), "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
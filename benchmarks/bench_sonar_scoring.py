@@ -0,0 +1,96 @@
+"""Sonar scoring throughput: vectorized SonarScorer versus the old per-row loop.
+
+Synthetic pings are drawn around the real sonar.csv rows. The legacy path
+(reload the model, pandas predict, then decision_function and iloc per mine)
+is timed on a small sample and reported per row; the vectorized path is timed
+at several sizes up to --pings to show it stays linear.
+
+    python benchmarks/bench_sonar_scoring.py --pings 1000000
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "sonar"))
+import sonar_threat_detector as detector
+
+
+def synthetic_pings(count, seed=0):
+    base = pd.read_csv(ROOT / "sonar" / "sonar.csv", header=None).iloc[:, :detector.NUM_FEATURES].to_numpy()
+    rng = np.random.default_rng(seed)
+    rows = base[rng.integers(0, len(base), count)]
+    noise = rng.normal(0, 0.02, rows.shape)
+    return np.clip(rows + noise, 0, 1)
+
+
+def legacy_score(X):
+    """The per-row implementation process_sonar_data used before the scoring engine
+    (with the label check fixed so it also matches models trained on 0/1 labels)"""
+    model = joblib_load()
+    X = pd.DataFrame(X)
+    predictions = model.predict(X)
+    threats = []
+    for idx, pred in enumerate(predictions):
+        if pred in detector.MINE_LABELS:
+            threats.append({
+                "confidence": float(model.decision_function([X.iloc[idx]])[0]),
+                "sonar_signature": X.iloc[idx].tolist(),
+            })
+    return threats
+
+
+def joblib_load():
+    import joblib
+    return joblib.load(ROOT / "sonar" / "svm_model.pkl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vectorized sonar scoring')
+    parser.add_argument('--pings', type=int, default=1_000_000)
+    parser.add_argument('--legacy-sample', type=int, default=2000)
+    args = parser.parse_args()
+
+    X = synthetic_pings(args.pings)
+    scorer = detector.SonarScorer()
+
+    start = time.perf_counter()
+    legacy = legacy_score(X[:args.legacy_sample])
+    legacy_s = time.perf_counter() - start
+
+    sizes = sorted({size for size in (10_000, 100_000, args.pings) if size <= args.pings})
+    runs = []
+    for size in sizes:
+        start = time.perf_counter()
+        mines = 0
+        for offset, is_mine, confidence in scorer.score_chunks(X[:size]):
+            chunk = X[offset:offset + len(is_mine)]
+            mines += len(detector.build_threat_records(chunk[is_mine], confidence[is_mine]))
+        elapsed = time.perf_counter() - start
+        runs.append({
+            "pings": size,
+            "mines": mines,
+            "seconds": elapsed,
+            "pings_per_s": size / elapsed,
+            "us_per_ping": elapsed / size * 1e6,
+        })
+
+    sample = detector.detect_threats(X[:args.legacy_sample], scorer)
+    print(json.dumps({
+        "legacy": {
+            "pings": args.legacy_sample,
+            "mines": len(legacy),
+            "us_per_ping": legacy_s / args.legacy_sample * 1e6,
+        },
+        "vectorized": runs,
+        "same_mines_on_sample": len(sample) == len(legacy),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
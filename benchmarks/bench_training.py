@@ -0,0 +1,64 @@
+"""Training wall time of train_sonar.py as a function of core count.
+
+Each --jobs value runs the full cross-validated search (without saving
+artifacts) in a fresh interpreter. The fold cache is warmed once beforehand,
+so every run measures the search and refits only. Speedup and parallel
+efficiency are relative to the single-core run.
+
+    python benchmarks/bench_training.py --jobs 1,2,4,8
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+RUN_SNIPPET = """
+import sys, json, warnings
+warnings.simplefilter('ignore')
+sys.path.insert(0, {sonar!r})
+from train_sonar import train
+report = train(n_jobs={jobs}, only={only!r}, cache_dir={cache!r}, save=False, verbose=False)
+print(json.dumps(report['timings']))
+"""
+
+
+def run(jobs, only, cache_dir):
+    code = RUN_SNIPPET.format(sonar=str(ROOT / "sonar"), jobs=jobs, only=only, cache=cache_dir)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sonar model selection across core counts')
+    parser.add_argument('--jobs', default=None, help='Comma-separated n_jobs values (default: 1, 2, 4, ... up to all cores)')
+    parser.add_argument('--only', nargs='+', default=None, help='Restrict the search to these candidates')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if args.jobs:
+        job_counts = [int(j) for j in args.jobs.split(',')]
+    else:
+        job_counts = sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        run(1, ['logistic_regression'], cache_dir)  # warm the fold cache
+        runs = []
+        for jobs in job_counts:
+            timings = run(jobs, args.only, cache_dir)
+            runs.append({"jobs": jobs, "fits": timings["fits"], "search_s": timings["search_s"],
+                         "total_s": timings["total_s"]})
+
+    baseline = next((r["total_s"] for r in runs if r["jobs"] == 1), runs[0]["total_s"])
+    for r in runs:
+        r["speedup"] = baseline / r["total_s"]
+        r["efficiency"] = r["speedup"] / r["jobs"]
+    print(json.dumps({"cpu_count": cores, "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
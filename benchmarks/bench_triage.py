@@ -0,0 +1,97 @@
+"""Replay benchmark for rule-based triage in front of the LLM.
+
+Replays the mock detections plus variants carrying everyday YOLO classes
+(rated low/none by rules) through process_detections with and without triage,
+using the echo backend with a fixed per-call latency to stand in for the 70B model.
+
+    python benchmarks/bench_triage.py --detections 200 --llm-latency 0.05
+"""
+import io
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import contextlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "plan_creation"))
+
+import threat_response_creation as agent
+from llm_client import LlamaClient, EchoBackend
+from concurrent_pipeline import PipelineOptions
+from triage import Triage
+
+EVERYDAY_OBJECTS = ["person", "boat", "car", "truck", "bird"]
+
+
+def build_replay(count, seed=0):
+    rng = random.Random(seed)
+    with open(ROOT / "plan_creation" / "mock_detections.json") as f:
+        mock = json.load(f)
+
+    replay = []
+    for i in range(count):
+        detection = copy.deepcopy(mock[i % len(mock)])
+        if rng.random() < 0.7:
+            # Everyday traffic: no pre-assigned level, so rules rate it from the objects
+            detection.pop("threat_level", None)
+            detection["objects_detected"] = [
+                {"type": rng.choice(EVERYDAY_OBJECTS), "confidence": round(rng.uniform(0.3, 0.95), 2),
+                 "bbox": [0.0, 0.0, 10.0, 10.0]}
+                for _ in range(rng.randint(0, 3))
+            ]
+        detection["timestamp"] = time.time() + i
+        replay.append(detection)
+    return replay
+
+
+class CountingBackend(EchoBackend):
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        return super().generate(prompt)
+
+
+def run(replay, options, triage_stage, latency):
+    backend = CountingBackend(latency)
+    agent.set_client(LlamaClient(backend))
+    agent.set_triage(triage_stage)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        responses = agent.process_detections(replay, options)
+    elapsed = time.perf_counter() - start
+    return {
+        "llm_calls": backend.calls,
+        "wall_s": elapsed,
+        "responses": len(responses),
+        "triage": triage_stage.summary() if triage_stage else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark LLM calls avoided by triage')
+    parser.add_argument('--detections', type=int, default=200)
+    parser.add_argument('--llm-latency', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--threshold', default='medium')
+    parser.add_argument('--min-confidence', type=float, default=0.5)
+    args = parser.parse_args()
+
+    replay = build_replay(args.detections)
+    options = PipelineOptions(max_concurrency=args.concurrency)
+    report = {
+        "detections": len(replay),
+        "without_triage": run(replay, options, None, args.llm_latency),
+        "with_triage": run(replay, options, Triage(args.threshold, args.min_confidence), args.llm_latency),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
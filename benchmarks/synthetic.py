@@ -0,0 +1,217 @@
+"""Offline stand-ins for the inputs and models the pipeline normally needs.
+
+Camera frames are drawn (moving boxes on a sea-like gradient) and encoded as
+PNG with zlib, so generating them needs no imaging library. Sonar data comes
+as raw float32 beam buffers with planted chirp echoes (what /detect receives)
+or as labelled 60-feature CSVs jittered around the real sonar.csv rows (what
+process_sonar_data reads). StandInDetector replaces YOLOv5 with a small
+convolutional net that returns results in the same pandas().xyxy shape, and
+SyntheticLLMBackend answers prompts after a configurable, jittered latency.
+"""
+import sys
+import json
+import time
+import zlib
+import struct
+import random
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+for _dir in ("camera", "plan_creation"):
+    if str(ROOT / _dir) not in sys.path:
+        sys.path.insert(0, str(ROOT / _dir))
+
+
+# --- camera ---
+
+def synthetic_frames(count: int, width: int = 640, height: int = 480, objects: int = 3,
+                     seed: int = 0) -> Iterator[np.ndarray]:
+    """BGR uint8 frames with ``objects`` boxes drifting across a horizon gradient"""
+    rng = np.random.default_rng(seed)
+    sky = np.linspace(200, 120, height // 2)
+    sea = np.linspace(90, 40, height - height // 2)
+    background = np.empty((height, width, 3), np.uint8)
+    background[:, :, 0] = np.concatenate([sky, sea + 60])[:, None]
+    background[:, :, 1] = np.concatenate([sky, sea + 20])[:, None]
+    background[:, :, 2] = np.concatenate([sky - 40, sea])[:, None]
+    sizes = rng.integers(height // 16, height // 5, (objects, 2))
+    positions = rng.uniform(0, 1, (objects, 2)) * [width, height]
+    velocities = rng.normal(0, 3, (objects, 2))
+    colors = rng.integers(0, 248, (objects, 3))  # headroom for the noise below
+    for _ in range(count):
+        frame = background.copy()
+        for (w, h), (x, y), color in zip(sizes, positions, colors):
+            x0, y0 = int(x) % width, int(y) % height
+            frame[y0:y0 + h, x0:x0 + w] = color
+        frame += rng.integers(0, 8, frame.shape, dtype=np.uint8)
+        positions += velocities
+        yield frame
+
+
+def encode_png(frame: np.ndarray, level: int = 1) -> bytes:
+    """Encode an (h, w, 3) BGR frame as an RGB PNG, the way an upload would arrive"""
+    height, width = frame.shape[:2]
+    rows = np.ascontiguousarray(frame[:, :, ::-1]).reshape(height, width * 3)
+    raw = np.hstack([np.zeros((height, 1), np.uint8), rows]).tobytes()  # filter type 0 per row
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw, level))
+            + chunk(b"IEND", b""))
+
+
+class StandInResults:
+    """The subset of YOLOv5's Detections object detect_camera_batch reads"""
+
+    def __init__(self, frames: List[List[list]]):
+        self.frames = frames
+
+    def pandas(self):
+        import pandas as pd
+
+        columns = ["xmin", "ymin", "xmax", "ymax", "confidence", "class", "name"]
+        result = type("StandInPandas", (), {})()
+        result.xyxy = [pd.DataFrame(rows, columns=columns) for rows in self.frames]
+        return result
+
+
+class StandInDetector:
+    """YOLOv5-shaped stand-in: a small conv net whose strongest cells become boxes"""
+
+    NAMES = {0: "person", 2: "car", 8: "boat"}
+
+    def __init__(self, input_size: int = 320, max_objects: int = 5, seed: int = 0):
+        import torch
+
+        torch.manual_seed(seed)
+        self.input_size = input_size
+        self.max_objects = max_objects
+        self.classes = list(self.NAMES)
+        self.net = torch.nn.Sequential(
+            torch.nn.Conv2d(3, 16, 3, stride=2, padding=1), torch.nn.SiLU(),
+            torch.nn.Conv2d(16, 32, 3, stride=2, padding=1), torch.nn.SiLU(),
+            torch.nn.Conv2d(32, 64, 3, stride=2, padding=1), torch.nn.SiLU(),
+            torch.nn.Conv2d(64, 64, 3, stride=2, padding=1), torch.nn.SiLU(),
+            torch.nn.Conv2d(64, len(self.NAMES) + 1, 1),
+        ).eval()
+
+    def __call__(self, images: List[np.ndarray]) -> StandInResults:
+        import torch
+        import torch.nn.functional as F
+
+        scale = self.input_size
+        batch = torch.stack([
+            F.interpolate(torch.from_numpy(np.ascontiguousarray(image)).permute(2, 0, 1)[None].float(),
+                          size=(scale, scale), mode="bilinear", align_corners=False)[0]
+            for image in images
+        ]).div_(255)
+        with torch.inference_mode():
+            out = self.net(batch)
+        scores = out[:, 0].sigmoid()
+        labels = out[:, 1:].argmax(1)
+        cells = scores.shape[-1]
+        frames = []
+        for image, score, label in zip(images, scores, labels):
+            height, width = image.shape[:2]
+            top = torch.topk(score.flatten(), self.max_objects)
+            rows = []
+            for value, index in zip(top.values.tolist(), top.indices.tolist()):
+                cy, cx = divmod(index, cells)
+                x0, y0 = cx / cells * width, cy / cells * height
+                class_id = self.classes[int(label.flatten()[index])]
+                rows.append([x0, y0, x0 + width / cells * 2, y0 + height / cells * 2, value,
+                             class_id, self.NAMES[class_id]])
+            frames.append(rows)
+        return StandInResults(frames)
+
+
+# --- sonar ---
+
+def sonar_buffer(config, samples: int, targets: int, snr_db=(12.0, 30.0), seed: int = 0):
+    """Noise plus echoes at known (beam, sample); returns the raw bytes and the ground truth"""
+    rng = np.random.default_rng(seed)
+    data = rng.standard_normal((config.beams, samples), dtype=np.float32)
+    replica = config.replica()
+    # echoes at least four pulse lengths apart along each beam, so each one is resolvable
+    slots = (samples - len(replica)) // (4 * len(replica))
+    cells = rng.choice(config.beams * slots, min(targets, config.beams * slots), replace=False)
+    beams = cells // slots
+    starts = cells % slots * 4 * len(replica) + rng.integers(0, 2 * len(replica), len(cells))
+    targets = len(cells)
+    snrs = rng.uniform(snr_db[0], snr_db[1], targets)
+    for beam, start, snr in zip(beams, starts, snrs):
+        # unit-norm replica: the matched-filter peak power over unit noise is amplitude^2
+        data[beam, start:start + len(replica)] += 10 ** (snr / 20) * replica
+    return data.tobytes(), np.stack([beams, starts, snrs], axis=1)
+
+
+def sonar_pings(count: int, seed: int = 0, noise: float = 0.02):
+    """(count, 60) features and R/M labels drawn around the real sonar.csv rows"""
+    import pandas as pd
+
+    base = pd.read_csv(ROOT / "sonar" / "sonar.csv", header=None)
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(base), count)
+    features = np.clip(base.iloc[:, :60].to_numpy()[rows] + rng.normal(0, noise, (count, 60)), 0, 1)
+    return features, base.iloc[:, 60].to_numpy()[rows]
+
+
+def sonar_csv(path, rows: int, seed: int = 0) -> Path:
+    """Write a labelled sonar CSV in the sonar.csv layout"""
+    features, labels = sonar_pings(rows, seed)
+    with open(path, "w") as f:
+        for row, label in zip(features, labels):
+            f.write(",".join(f"{v:.4f}" for v in row) + f",{label}\n")
+    return Path(path)
+
+
+# --- agent ---
+
+def synthetic_detections(count: int, seed: int = 0) -> List[dict]:
+    """Detections shaped like mock_detections.json, with coordinates and confidences jittered"""
+    with open(ROOT / "plan_creation" / "mock_detections.json") as f:
+        templates = json.load(f)
+    rng = random.Random(seed)
+    detections = []
+    for i in range(count):
+        detection = json.loads(json.dumps(templates[i % len(templates)]))
+        detection["timestamp"] = time.time()
+        coordinates = detection.get("location", {}).get("coordinates")
+        if isinstance(coordinates, dict):
+            for key in coordinates:
+                coordinates[key] = round(coordinates[key] + rng.uniform(-0.05, 0.05), 5)
+        detections.append(detection)
+    return detections
+
+
+def synthetic_llm_backend(latency: float = 0.5, jitter: float = 0.3, failure_rate: float = 0.0,
+                          seed: int = 0):
+    """EchoBackend whose latency is lognormal around ``latency`` seconds (sigma ``jitter``)"""
+    from llm_client import EchoBackend
+
+    class SyntheticLLMBackend(EchoBackend):
+        name = "synthetic"
+
+        def __init__(self):
+            super().__init__()
+            self.rng = random.Random(seed)
+
+        def _delay(self) -> float:
+            return latency * self.rng.lognormvariate(0, jitter) if latency else 0.0
+
+        def generate(self, prompt: str) -> str:
+            time.sleep(self._delay())
+            if failure_rate and self.rng.random() < failure_rate:
+                raise RuntimeError("synthetic backend failure")
+            return self._respond(prompt)
+
+        def stream(self, prompt: str, prefix_name: Optional[str] = None, prefix: str = "") -> Iterator[str]:
+            self.latency = self._delay()
+            yield from super().stream(prompt, prefix_name, prefix)
+
+    return SyntheticLLMBackend()
@@ -0,0 +1,109 @@
+"""Push detection results to the threat response agent's queue socket.
+
+Results are sent as newline-delimited JSON over one persistent TCP
+connection to the agent daemon (``threat_response_creation.py --daemon
+--listen``). Sending happens on a background thread behind a bounded queue:
+a request never waits on the agent, and when the agent is down or slow,
+results are dropped and counted instead of piling up in memory.
+"""
+import os
+import json
+import queue
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class AgentPublisher:
+    def __init__(self, host: str, port: int, max_queue: int = 1024, connect_timeout: float = 1.0,
+                 reconnect_delay: float = 2.0):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.reconnect_delay = reconnect_delay
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(max_queue)
+        self._socket: Optional[socket.socket] = None
+        self._retry_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+        self.dropped = 0
+
+    def start(self) -> "AgentPublisher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="agent-publisher", daemon=True)
+            self._thread.start()
+        return self
+
+    def publish(self, record: Dict[str, Any]) -> bool:
+        """Queue a record for the agent; False if it was dropped because the queue is full"""
+        try:
+            self._queue.put_nowait((json.dumps(record, default=str) + "\n").encode("utf-8"))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def close(self, timeout: float = 1.0) -> None:
+        if self._thread is not None:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+        self._disconnect()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"address": f"{self.host}:{self.port}", "connected": self._socket is not None,
+                "queued": self._queue.qsize(), "sent": self.sent, "dropped": self.dropped}
+
+    def _run(self) -> None:
+        while True:
+            line = self._queue.get()
+            if line is None:
+                return
+            if not self._send(line):
+                self.dropped += 1
+
+    def _send(self, line: bytes) -> bool:
+        for _ in range(2):  # once on the current connection, once on a fresh one
+            if self._socket is None and not self._connect():
+                return False
+            try:
+                self._socket.sendall(line)
+                self.sent += 1
+                return True
+            except OSError:
+                self._disconnect()
+        return False
+
+    def _connect(self) -> bool:
+        # While the agent is unreachable, drop results instead of retrying per record
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            self._socket = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+            return True
+        except OSError as e:
+            print(f"Agent publisher: cannot reach {self.host}:{self.port} ({e}), "
+                  f"dropping results for {self.reconnect_delay:.0f}s")
+            self._retry_at = time.monotonic() + self.reconnect_delay
+            return False
+
+    def _disconnect(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+
+def publisher_from_env() -> Optional[AgentPublisher]:
+    """AgentPublisher for DETECT_AGENT_ADDRESS (host:port), or None when it is unset"""
+    address = os.environ.get("DETECT_AGENT_ADDRESS")
+    if not address:
+        return None
+    host, port = address.rsplit(":", 1)
+    return AgentPublisher(host, int(port), max_queue=int(os.environ.get("DETECT_AGENT_QUEUE", "1024")))
@@ -1,17 +1,160 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 import torch
 import cv2
 import numpy as np
 import io
+import os
+import sys
+import json
+import time
+from pathlib import Path
 from typing import List, Optional, Dict, Any
 
+from agent_publisher import publisher_from_env
+from frame_batcher import FrameBatcher
+from inference_executor import Overloaded, executor_from_env
+from model_loader import ModelNotReady, yolo_loader_from_env
+from sonar_processing import SonarConfig, detect_peaks
+from video_stream import stream_video
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # shared instrumentation.py, response_store.py
+from detection_records import HIGH_THREAT_OBJECTS, MEDIUM_THREAT_OBJECTS
+from instrumentation import REGISTRY, SamplingProfiler, timed
+from response_store import ResponseStore
+
 app = FastAPI(title="Maritime Threat Detection API")
 
-# Load YOLOv5 model with maritime object detection capabilities
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s')
-# Add custom classes for maritime objects if needed
-model.classes = [0, 1, 2, 3, 5, 7, 8]  # Person, bicycle, car, boat, airplane, truck, ship
+# YOLOv5 with maritime object classes, built from a local checkout and weights file
+# (YOLO_REPO / YOLO_WEIGHTS, see model_loader.py) so startup needs no network access.
+# With DETECT_PRELOAD=1 the weights load at import, which under gunicorn's preload_app
+# happens once in the master and is shared copy-on-write by every forked worker
+# (gunicorn.conf.py). Otherwise each process loads them in the background at startup.
+model_loader = yolo_loader_from_env()
+if os.environ.get("DETECT_PRELOAD", "0") == "1":
+    model_loader.load_weights()
+
+# Decoding and inference run on a bounded worker pool so the event loop keeps serving
+# other requests; DETECT_WORKERS / DETECT_QUEUE_SIZE / DETECT_POOL configure it
+executor = executor_from_env()
+if executor.workers > 1:
+    # Split CPU threads between concurrent forward passes instead of oversubscribing
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // executor.workers))
+
+def detect_camera_batch(contents_list):
+    """Decode uploaded images and run the YOLO model on all of them in one forward pass.
+
+    Blocking; runs on the executor. Items are encoded image bytes or already
+    decoded BGR arrays (video frames). Returns one object list per image, or an
+    HTTPException for an image that could not be decoded.
+    """
+    with timed("image_decode"):
+        images = [contents if isinstance(contents, np.ndarray)
+                  else cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+                  for contents in contents_list]
+    valid = [i for i, image in enumerate(images) if image is not None]
+    outputs = [HTTPException(status_code=400, detail="Could not decode image") for _ in images]
+    if not valid:
+        return outputs
+    # Process pool workers load their own copy on first use
+    model = model_loader.load_weights()
+    with timed("yolo_inference"):
+        results = model([images[i] for i in valid])
+    
+    # Extract detection results
+    with timed("yolo_postprocess"):
+        for i, detections in zip(valid, results.pandas().xyxy):
+            outputs[i] = [{"type": d["name"], "confidence": float(d["confidence"]), 
+                           "bbox": [float(d["xmin"]), float(d["ymin"]), float(d["xmax"]), float(d["ymax"])]} 
+                          for d in detections.to_dict(orient="records")]
+    return outputs
+
+# Frames from concurrent requests are merged into one forward pass of up to
+# DETECT_BATCH_SIZE images, waiting at most DETECT_BATCH_WAIT_MS for a batch to fill
+batcher = FrameBatcher(
+    detect_camera_batch,
+    executor,
+    max_batch_size=int(os.environ.get("DETECT_BATCH_SIZE", "8")),
+    max_wait=float(os.environ.get("DETECT_BATCH_WAIT_MS", "10")) / 1000,
+)
+
+# Stage timings are recorded in the process that runs the stage; with DETECT_POOL=process,
+# decode and inference timings stay in the pool processes and only request timings show here
+REGISTRY.gauge("model_ready", lambda: float(model_loader.ready), "1 once the model is loaded and warmed up")
+for _key in ("in_flight", "completed", "rejected"):
+    REGISTRY.gauge(f"executor_{_key}", lambda key=_key: executor.stats()[key], f"Inference executor {_key}")
+REGISTRY.gauge("batcher_mean_batch_size", lambda: batcher.stats()["mean_batch_size"], "Mean frames per forward pass")
+
+# With DETECT_AGENT_ADDRESS=host:port every result is also pushed to the threat response
+# agent daemon's queue socket, so it is analysed as soon as it is detected
+agent_publisher = publisher_from_env()
+
+# Threat responses and detections recorded by threat_response_creation.py, served read-only
+# by /responses and /detections; DETECT_RESPONSE_STORE overrides the agent's default path
+response_store = ResponseStore(os.environ.get(
+    "DETECT_RESPONSE_STORE", str(Path(__file__).resolve().parent.parent / "plan_creation" / "threat_store.db")))
+
+# Per-request sampling profiles: send "X-Profile: 1" and the folded stacks of every
+# thread during that request are written to DETECT_PROFILE_DIR
+PROFILE_DIR = os.environ.get("DETECT_PROFILE_DIR")
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    profiler = None
+    if PROFILE_DIR and request.headers.get("x-profile") == "1":
+        profiler = SamplingProfiler().start()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    except Exception:
+        status = 500
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        REGISTRY.histogram("http_request_duration_seconds", "Request latency by endpoint",
+                           method=request.method, path=getattr(route, "path", "unmatched"),
+                           status=status).observe(elapsed)
+        if profiler is not None:
+            profiler.stop()
+    if profiler is not None:
+        path = os.path.join(PROFILE_DIR, f"request_{int(time.time() * 1000)}_{request.url.path.strip('/').replace('/', '_')}.folded")
+        profiler.write(path)
+        response.headers["X-Profile-Path"] = path
+    return response
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format; each worker process reports its own metrics"""
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(max(1, round(exc.retry_after)))})
+
+@app.exception_handler(ModelNotReady)
+async def model_not_ready_handler(request, exc: ModelNotReady):
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(max(1, round(exc.retry_after)))})
+
+@app.on_event("startup")
+async def start_model_loader():
+    # Warmup runs in each worker process, after any fork, without blocking the event loop
+    model_loader.start_background()
+    if agent_publisher is not None:
+        agent_publisher.start()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    await batcher.close()
+    executor.shutdown(wait=False)
+    response_store.close()
+    if agent_publisher is not None:
+        agent_publisher.close()
 
 class DetectionResult(BaseModel):
     objects_detected: List[Dict[str, Any]]
@@ -20,36 +163,180 @@ class DetectionResult(BaseModel):
     environment_conditions: Dict[str, Any]
     raw_description: str
 
+@app.get("/health")
+async def health():
+    """Liveness: the process is serving requests, whatever the model state"""
+    return {"status": "ok", "model": model_loader.status(),
+            "executor": executor.stats(), "batcher": batcher.stats(),
+            "agent": agent_publisher.stats() if agent_publisher is not None else None}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once the model is loaded and warmed up in this worker, 503 before"""
+    status = model_loader.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status, headers={"Retry-After": "2"})
+    return status
+
 @app.post("/detect", response_model=DetectionResult)
 async def detect_threats(
     file: UploadFile = File(...),
     detection_type: str = Form(...),  # "camera" or "sonar"
-    location: Dict[str, float] = Form(...),
-    additional_data: Optional[Dict[str, Any]] = Form(None)
+    location: str = Form(...),  # JSON object, e.g. {"lat": 25.8, "lon": -97.4}
+    additional_data: Optional[str] = Form(None)  # JSON object
 ):
+    location = parse_json_form(location, "location", numeric=True)
+    additional_data = parse_json_form(additional_data, "additional_data")
+    
     # Read and process the input file
     contents = await file.read()
     
     if detection_type == "camera":
-        # Visual detection processing
-        image = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
-        results = model(image)
-        
-        # Extract detection results
-        detections = results.pandas().xyxy[0].to_dict(orient="records")
-        objects = [{"type": d["name"], "confidence": float(d["confidence"]), 
-                   "bbox": [float(d["xmin"]), float(d["ymin"]), float(d["xmax"]), float(d["ymax"])]} 
-                  for d in detections]
+        # Visual detection processing, batched with frames from other requests
+        model_loader.get()
+        objects = await batcher.submit(contents)
         
     elif detection_type == "sonar":
-        # Sonar data processing (simplified for this example)
-        # In a real implementation, this would use specialized sonar signal processing
-        sonar_data = np.frombuffer(contents, dtype=np.float32)
-        # Simplified sonar analysis
-        objects = analyze_sonar_data(sonar_data)
+        # Raw float32 ping samples, viewed in place (no copy of the upload);
+        # beam layout and pulse parameters can be given in additional_data
+        try:
+            config = SonarConfig.from_metadata(additional_data)
+            sonar_data = np.frombuffer(contents, dtype=np.float32)
+            objects = await executor.run(analyze_sonar_data, sonar_data, config)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid sonar data: {e}")
     else:
         raise HTTPException(status_code=400, detail="Unsupported detection type")
     
+    return publish_result(build_detection_result(objects, detection_type, location, additional_data),
+                          detection_type)
+
+@app.post("/detect/batch", response_model=List[DetectionResult])
+async def detect_threats_batch(
+    files: List[UploadFile] = File(...),
+    location: str = Form(...),
+    additional_data: Optional[str] = Form(None)
+):
+    """Camera detection for many images at once; results are returned in upload order"""
+    location = parse_json_form(location, "location", numeric=True)
+    additional_data = parse_json_form(additional_data, "additional_data")
+    model_loader.get()
+    contents = [await file.read() for file in files]
+    per_image = await batcher.submit_many(contents)
+    return [publish_result(build_detection_result(objects, "camera", location, additional_data), "camera")
+            for objects in per_image]
+
+@app.websocket("/detect/video")
+async def detect_video_stream(websocket: WebSocket):
+    """Streaming video detection with frame sampling and tracking (protocol in video_stream.py)"""
+    await websocket.accept()
+    try:
+        summary = await stream_video(websocket, detect_video_frame)
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
+    
+    # Optionally keep the summary in the *_detections.json format threat_response_creation.py reads
+    if not summary["video_info"]["total_frames"]:
+        return
+    record = {"unique_objects": summary["unique_objects"], "video_info": summary["video_info"]}
+    if agent_publisher is not None:
+        agent_publisher.publish(record)
+    summary_dir = os.environ.get("DETECT_VIDEO_SUMMARY_DIR")
+    if summary_dir:
+        path = os.path.join(summary_dir, f"stream_{int(time.time() * 1000)}_detections.json")
+        with open(path, "w") as f:
+            json.dump(record, f, indent=2)
+
+async def detect_video_frame(frame):
+    """Run one sampled video frame through the shared batcher"""
+    try:
+        model_loader.get()
+        return await batcher.submit(frame)
+    except (HTTPException, ModelNotReady) as e:
+        raise ValueError(getattr(e, "detail", str(e)))
+
+def query_store(table, severity, min_severity, sensor, type, since, until, lat, lon, radius_m, cursor, limit,
+                include_superseded=False):
+    if (lat is None) != (lon is None):
+        raise HTTPException(status_code=400, detail="lat and lon must be given together")
+    near = (lat, lon, radius_m) if lat is not None else None
+    try:
+        return response_store.query(table, severity=severity, min_severity=min_severity, sensor=sensor, type=type,
+                                    since=since, until=until, near=near, cursor=cursor, limit=limit,
+                                    include_superseded=include_superseded)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Store queries are blocking SQLite reads, so these are plain functions run on FastAPI's threadpool
+@app.get("/responses")
+def list_responses(severity: Optional[str] = None, min_severity: Optional[str] = None,
+                   sensor: Optional[str] = None, type: Optional[str] = None,
+                   since: Optional[float] = None, until: Optional[float] = None,
+                   lat: Optional[float] = None, lon: Optional[float] = None,
+                   radius_m: float = Query(5000.0, gt=0), cursor: Optional[str] = None,
+                   limit: int = Query(50, ge=1, le=500), include_superseded: bool = False):
+    """Threat responses, newest first; pass next_cursor back as cursor for the next page.
+
+    A triaged response replaced by its escalated LLM analysis is left out unless include_superseded is set.
+    """
+    return query_store("responses", severity, min_severity, sensor, type, since, until, lat, lon, radius_m,
+                       cursor, limit, include_superseded)
+
+@app.get("/responses/{record_id}")
+def get_response(record_id: int):
+    item = response_store.get("responses", record_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Response not found")
+    return item
+
+@app.get("/detections")
+def list_detections(severity: Optional[str] = None, min_severity: Optional[str] = None,
+                    sensor: Optional[str] = None, type: Optional[str] = None,
+                    since: Optional[float] = None, until: Optional[float] = None,
+                    lat: Optional[float] = None, lon: Optional[float] = None,
+                    radius_m: float = Query(5000.0, gt=0), cursor: Optional[str] = None,
+                    limit: int = Query(50, ge=1, le=500)):
+    """Raw detections as the agent received them, newest first, with the same filters as /responses"""
+    return query_store("detections", severity, min_severity, sensor, type, since, until, lat, lon, radius_m,
+                       cursor, limit)
+
+@app.get("/detections/{record_id}")
+def get_detection(record_id: int):
+    item = response_store.get("detections", record_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Detection not found")
+    return item
+
+def parse_json_form(value, field, numeric=False):
+    """Multipart form fields arrive as text; object-valued ones are sent as JSON.
+
+    With ``numeric`` every value must be a finite number, as for location
+    (DetectionResult.coordinates), and is returned as a float.
+    """
+    if value is None:
+        return None
+    try:
+        parsed = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"{field} must be a JSON object: {e}")
+    if not isinstance(parsed, dict):
+        raise HTTPException(status_code=400, detail=f"{field} must be a JSON object")
+    if numeric:
+        for key, item in parsed.items():
+            if isinstance(item, bool) or not isinstance(item, (int, float)) or not np.isfinite(item):
+                raise HTTPException(status_code=400, detail=f"{field}.{key} must be a number, got {item!r}")
+        parsed = {key: float(item) for key, item in parsed.items()}
+    return parsed
+
+def publish_result(result, detection_type):
+    """Queue a result for the agent daemon, if one is configured, and return it unchanged"""
+    if agent_publisher is not None:
+        agent_publisher.publish({**jsonable_encoder(result), "type": f"{detection_type}_detection",
+                                 "timestamp": time.time(), "metadata": {"detection_method": detection_type}})
+    return result
+
+def build_detection_result(objects, detection_type, location, additional_data):
     # Generate a text description of what was detected
     description = generate_detection_description(objects, detection_type, location)
     
@@ -64,36 +351,32 @@ async def detect_threats(
         raw_description=description
     )
 
-def analyze_sonar_data(sonar_data):
-    # Simplified sonar analysis logic
-    # In reality, this would use sophisticated signal processing algorithms
-    objects = []
-    # Example logic - detect anomalies in sonar data
-    peaks = find_peaks_in_sonar(sonar_data)
-    for peak in peaks:
-        object_type = classify_sonar_object(peak)
-        objects.append({
+@timed("sonar_analysis")
+def analyze_sonar_data(sonar_data, config=None):
+    """Detect echoes in a raw ping buffer and describe each as an object"""
+    peaks = find_peaks_in_sonar(sonar_data, config)
+    types = classify_sonar_objects(peaks.strength)
+    return [
+        {
             "type": object_type,
-            "confidence": peak["strength"],
-            "distance": peak["distance"],
-            "direction": peak["direction"]
-        })
-    return objects
-
-def find_peaks_in_sonar(sonar_data):
-    # Simplified peak detection in sonar data
-    # Would be replaced with actual sonar processing algorithms
-    return [{"strength": 0.85, "distance": 120.5, "direction": "north-east"}]
-
-def classify_sonar_object(peak_data):
-    # Simplified classification of sonar objects
+            "confidence": record["strength"],
+            "distance": record["distance"],
+            "direction": record["direction"],
+            "bearing": record["bearing"],
+            "snr_db": record["snr_db"]
+        }
+        for object_type, record in zip(types, peaks.to_records())
+    ]
+
+def find_peaks_in_sonar(sonar_data, config=None):
+    """Matched-filter + CFAR peak detection (see sonar_processing.py)"""
+    return detect_peaks(sonar_data, config or SonarConfig())
+
+def classify_sonar_objects(strength):
+    """Classify echoes by strength (SNR scaled to [0, 1])"""
     # Would be replaced with ML-based classification
-    if peak_data["strength"] > 0.8:
-        return "potential_submarine"
-    elif peak_data["strength"] > 0.6:
-        return "marine_life"
-    else:
-        return "unknown_object"
+    return np.select([strength > 0.8, strength > 0.6],
+                     ["potential_submarine", "marine_life"], "unknown_object").tolist()
 
 def generate_detection_description(objects, detection_type, location):
     """Generate a human-readable description of the detection"""
@@ -109,14 +392,11 @@ def generate_detection_description(objects, detection_type, location):
 def assess_threat_level(objects, location, additional_data):
     """Assess the threat level based on detected objects and context"""
     # This would be more sophisticated in a real implementation
-    high_threat_objects = ["submarine", "potential_submarine", "military_vessel", "armed_person"]
-    medium_threat_objects = ["unidentified_vessel", "unauthorized_vessel", "diver"]
-    
     detected_types = [obj["type"] for obj in objects]
     
-    if any(threat in detected_types for threat in high_threat_objects):
+    if any(threat in detected_types for threat in HIGH_THREAT_OBJECTS):
         return "high"
-    elif any(threat in detected_types for threat in medium_threat_objects):
+    elif any(threat in detected_types for threat in MEDIUM_THREAT_OBJECTS):
         return "medium"
     elif objects:
         return "low"
@@ -0,0 +1,115 @@
+"""Cross-request micro-batching of frames for the detection model.
+
+Concurrent /detect and /detect/batch calls submit frames to one FrameBatcher.
+A collector task on the event loop takes the first waiting frame, keeps
+collecting until ``max_batch_size`` frames are queued or ``max_wait`` seconds
+have passed, and hands the batch to the InferenceExecutor as a single forward
+pass. Results are fanned back to each caller's future. Up to one batch per
+executor worker is in flight at a time; frames arriving meanwhile wait in the
+queue and go into the next batch instead of being rejected by the executor.
+"""
+import asyncio
+from typing import Any, Callable, List, Optional, Sequence
+
+from inference_executor import InferenceExecutor, Overloaded
+
+
+class FrameBatcher:
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], executor: InferenceExecutor,
+                 max_batch_size: int = 8, max_wait: float = 0.01, max_pending: Optional[int] = None):
+        """``batch_fn`` maps a list of frames to a list of results; a result that is an
+        Exception is raised to that frame's caller only"""
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        # Frames waiting or running; beyond this, submissions are rejected like a full executor
+        self.max_pending = max_pending or max_batch_size * executor.capacity
+        self.batches_run = 0
+        self.frames_run = 0
+        self._pending = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batches: set = set()
+
+    def _ensure_started(self) -> None:
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.executor.workers)
+            self._collector = asyncio.get_running_loop().create_task(self._collect_forever())
+
+    async def submit(self, frame: Any) -> Any:
+        return (await self.submit_many([frame]))[0]
+
+    async def submit_many(self, frames: Sequence[Any]) -> List[Any]:
+        """Queue frames for batching and wait for all of their results, in order"""
+        if self._pending + len(frames) > self.max_pending:
+            self.executor.rejected += 1
+            raise Overloaded(self.executor.retry_after)
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in frames]
+        self._pending += len(frames)
+        for frame, future in zip(frames, futures):
+            self._queue.put_nowait((frame, future))
+        return list(await asyncio.gather(*futures))
+
+    async def _collect_forever(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = loop.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch) -> None:
+        frames = [frame for frame, _ in batch]
+        try:
+            results = list(await self.executor.run(self.batch_fn, frames))
+            if len(results) != len(batch):
+                raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} frames")
+        except Exception as e:
+            results = [e] * len(batch)
+        else:
+            self.batches_run += 1
+            self.frames_run += len(batch)
+        finally:
+            self._pending -= len(batch)
+            self._slots.release()
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches_run": self.batches_run,
+            "frames_run": self.frames_run,
+            "mean_batch_size": self.frames_run / self.batches_run if self.batches_run else 0.0,
+            "pending": self._pending,
+        }
+
+    async def close(self) -> None:
+        if self._collector is not None:
+            self._collector.cancel()
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
@@ -0,0 +1,33 @@
+"""gunicorn config for detection_service: load the model once, fork workers that share it.
+
+    cd camera && gunicorn -c gunicorn.conf.py detection_service:app
+
+With preload_app the master imports detection_service, and with it the YOLO
+weights (DETECT_PRELOAD=1), before forking. Workers then share the weight
+pages copy-on-write instead of each holding a private copy, as they would
+under ``uvicorn --workers``, which starts every worker from a fresh
+interpreter. Each worker warms the model up in its own startup event and
+reports ready on /ready afterwards.
+"""
+import gc
+import os
+
+os.environ.setdefault("DETECT_PRELOAD", "1")
+
+bind = os.environ.get("DETECT_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("DETECT_PROCESSES", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's generations, so collections
+    # in the workers do not write to (and un-share) the preloaded objects' pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Split the CPU between worker processes instead of every worker using all cores
+    import torch
+    torch.set_num_threads(max(1, torch.get_num_threads() // workers))
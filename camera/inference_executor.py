@@ -0,0 +1,93 @@
+"""Bounded worker pool that keeps blocking inference off the event loop.
+
+Requests are admitted only while fewer than ``workers + max_queue`` jobs are
+running or waiting; past that, ``run`` raises ``Overloaded`` immediately so
+the endpoint can answer 503 instead of letting queueing delay grow without
+bound. Workers are threads by default: OpenCV and PyTorch release the GIL
+in decode and forward passes, and threads share the loaded model.
+"""
+import os
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class Overloaded(Exception):
+    """Raised when the admission queue is full"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Inference queue is full, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    def __init__(self, workers: int = 1, max_queue: int = 8, kind: str = "thread",
+                 retry_after: float = 1.0, initializer: Optional[Callable] = None):
+        if workers < 1 or max_queue < 0:
+            raise ValueError("workers must be >= 1 and max_queue >= 0")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        pool_cls = ProcessPoolExecutor if kind == "process" else ThreadPoolExecutor
+        self._pool: Executor = pool_cls(max_workers=workers, initializer=initializer)
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        return self._admitted
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self.rejected += 1
+                raise Overloaded(self.retry_after)
+            self._admitted += 1
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._admitted -= 1
+            self.completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn`` on a worker and await its result; raises Overloaded when the queue is full"""
+        self._admit()
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._admitted -= 1
+            raise
+        # Release on completion, not on await: a cancelled request still occupies its worker
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self._admitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+def executor_from_env(prefix: str = "DETECT", **overrides) -> InferenceExecutor:
+    """Build an executor from <prefix>_WORKERS, <prefix>_QUEUE_SIZE and <prefix>_POOL (thread|process)"""
+    options = {
+        "workers": int(os.environ.get(f"{prefix}_WORKERS", "1")),
+        "max_queue": int(os.environ.get(f"{prefix}_QUEUE_SIZE", "8")),
+        "kind": os.environ.get(f"{prefix}_POOL", "thread"),
+    }
+    options.update(overrides)
+    return InferenceExecutor(**options)
@@ -0,0 +1,159 @@
+"""Offline, lazy or preloaded model loading with warmup and readiness.
+
+The YOLOv5 model is built from a local checkout of the ultralytics/yolov5
+repository and a local weights file, so startup never touches torch.hub's
+network path:
+
+    YOLO_REPO     local yolov5 checkout (default: torch.hub's cached copy)
+    YOLO_WEIGHTS  weights file (default: $YOLO_MODEL_DIR/yolov5s.pt)
+
+Loading is split in two stages so weights can be shared between worker
+processes. ``load_weights`` reads the model into memory; run it before
+forking (gunicorn ``preload_app``) and every worker shares those pages
+copy-on-write. ``warm_up`` runs a first inference to initialize kernels and
+allocator pools; run it in each worker after the fork, because thread pools
+started before fork() are not safe to use in the child. The model reports
+ready only after warmup.
+"""
+import os
+import time
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_CLASSES = [0, 1, 2, 3, 5, 7, 8]  # Person, bicycle, car, boat, airplane, truck, ship
+
+
+class ModelNotReady(Exception):
+    """Raised when inference is requested before the model has loaded and warmed up"""
+
+    def __init__(self, state: str, retry_after: float = 2.0):
+        super().__init__(f"Model is not ready ({state})")
+        self.state = state
+        self.retry_after = retry_after
+
+
+class ModelLoader:
+    def __init__(self, load: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None,
+                 name: str = "model"):
+        self._load = load
+        self._warmup = warmup
+        self.name = name
+        self.state = "not_loaded"  # not_loaded -> loading -> loaded -> warming -> ready | failed
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self.loaded_pid: Optional[int] = None
+        self._model: Any = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def load_weights(self) -> Any:
+        """Load the model into memory once (safe to call before fork)"""
+        with self._lock:
+            if self._model is None:
+                self.state = "loading"
+                start = time.perf_counter()
+                try:
+                    self._model = self._load()
+                except Exception as e:
+                    self.state, self.error = "failed", f"{type(e).__name__}: {e}"
+                    raise
+                self.timings["load_s"] = time.perf_counter() - start
+                self.loaded_pid = os.getpid()
+                self.state = "loaded"
+            return self._model
+
+    def warm_up(self) -> None:
+        """Load if needed, run the warmup inference in this process and mark the model ready"""
+        model = self.load_weights()
+        with self._lock:
+            if self._ready.is_set():
+                return
+            self.state = "warming"
+            start = time.perf_counter()
+            try:
+                if self._warmup is not None:
+                    self._warmup(model)
+            except Exception as e:
+                self.state, self.error = "failed", f"{type(e).__name__}: {e}"
+                raise
+            self.timings["warmup_s"] = time.perf_counter() - start
+            self.state = "ready"
+            self._ready.set()
+
+    def start_background(self) -> threading.Thread:
+        """Load and warm up on a background thread so the server can accept connections meanwhile"""
+        def run():
+            try:
+                self.warm_up()
+            except Exception as e:
+                print(f"Failed to load {self.name}: {e}")
+
+        thread = threading.Thread(target=run, name=f"{self.name}-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def get(self) -> Any:
+        """The ready model; raises ModelNotReady while it is still loading or if loading failed"""
+        if not self._ready.is_set():
+            raise ModelNotReady(self.state if self.error is None else f"failed: {self.error}")
+        return self._model
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state,
+            "ready": self.ready,
+            "error": self.error,
+            "timings": dict(self.timings),
+            "shared_from_parent": self.loaded_pid is not None and self.loaded_pid != os.getpid(),
+        }
+
+
+def load_local_yolo(repo: str, weights: str, classes: Optional[List[int]] = None,
+                    device: Optional[str] = None):
+    """Build YOLOv5 from a local repository checkout and weights file, without network access"""
+    import torch
+
+    # Keep yolov5 from pip-installing missing requirements or checking for updates at load time
+    os.environ.setdefault("YOLOv5_AUTOINSTALL", "False")
+    os.environ.setdefault("YOLOv5_VERBOSE", "False")
+    if not Path(repo, "hubconf.py").exists():
+        raise FileNotFoundError(f"No yolov5 checkout at {repo} (set YOLO_REPO)")
+    if not Path(weights).exists():
+        raise FileNotFoundError(f"No weights at {weights} (set YOLO_WEIGHTS or YOLO_MODEL_DIR)")
+    model = torch.hub.load(repo, "custom", path=weights, source="local", device=device, _verbose=False)
+    model.eval()
+    model.classes = classes if classes is not None else DEFAULT_CLASSES
+    return model
+
+
+def warm_up_yolo(model, size: int = 640, batch: int = 1) -> None:
+    """First inference on blank frames: initializes kernels, workspace and allocator pools"""
+    import numpy as np
+
+    frames = [np.zeros((size, size, 3), dtype=np.uint8) for _ in range(batch)]
+    model(frames)
+
+
+def yolo_loader_from_env(warmup_batch: int = 1) -> ModelLoader:
+    import torch
+
+    hub_cache = Path(torch.hub.get_dir()) / "ultralytics_yolov5_master"
+    model_dir = Path(os.environ.get("YOLO_MODEL_DIR", "models"))
+    repo = os.environ.get("YOLO_REPO", str(hub_cache))
+    weights = os.environ.get("YOLO_WEIGHTS", str(model_dir / "yolov5s.pt"))
+    device = os.environ.get("YOLO_DEVICE") or None
+    warmup_size = int(os.environ.get("YOLO_WARMUP_SIZE", "640"))
+    return ModelLoader(
+        lambda: load_local_yolo(repo, weights, device=device),
+        lambda model: warm_up_yolo(model, warmup_size, warmup_batch),
+        name="yolov5s",
+    )
@@ -0,0 +1,239 @@
+"""Vectorized active-sonar echo detection for raw float32 ping buffers.
+
+An uploaded buffer holds ``beams`` consecutive receive channels of equal
+length (a single beam if not told otherwise). Each beam is pulse-compressed
+against the transmitted chirp with an FFT-based matched filter. A cell-averaging
+CFAR (constant false alarm rate) detector then thresholds the envelope power
+against the local noise estimate. Detections are the local maxima over range
+and bearing, reported as range / bearing / strength arrays. Every stage works
+on whole (beams, samples) arrays; the only Python loop is over blocks of beams
+that bound peak memory on multi-megabyte uploads.
+"""
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy import fft as sp_fft
+
+COMPASS_POINTS = ["north", "north-east", "east", "south-east", "south", "south-west", "west", "north-west"]
+BLOCK_SAMPLES = 1 << 22  # beams are processed in blocks of about this many samples
+# Fields that divide or size arrays, so they must be strictly positive
+POSITIVE_FIELDS = ("beams", "sample_rate", "sound_speed", "pulse_length", "training_cells",
+                   "full_scale_snr_db", "max_peaks")
+
+
+def _parse_number(name: str, kind: type, value: Any):
+    """Convert a metadata value to ``kind`` without silently truncating it"""
+    try:
+        if isinstance(value, bool):
+            raise TypeError
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if kind is int:
+        if not number.is_integer():
+            raise ValueError(f"{name} must be an integer, got {value!r}")
+        return int(number)
+    return number
+
+
+@dataclass
+class SonarConfig:
+    """Acquisition and detection parameters; any field can be overridden from request metadata"""
+    beams: int = 1
+    sample_rate: float = 100_000.0  # Hz
+    sound_speed: float = 1500.0  # m/s
+    pulse_length: float = 0.001  # s
+    chirp_start: float = 20_000.0  # Hz
+    chirp_end: float = 30_000.0  # Hz
+    bearing_start: float = -60.0  # degrees relative to heading, first beam
+    bearing_end: float = 60.0  # degrees relative to heading, last beam
+    heading: float = 0.0  # degrees true
+    guard_cells: int = 0  # 0: sized from the compressed pulse width
+    training_cells: int = 256
+    false_alarm_rate: float = 1e-6
+    full_scale_snr_db: float = 40.0  # SNR mapped to strength 1.0
+    max_peaks: int = 256
+
+    def __post_init__(self):
+        for name in POSITIVE_FIELDS:
+            value = getattr(self, name)
+            if not (np.isfinite(value) and value > 0):
+                raise ValueError(f"{name} must be positive, got {value!r}")
+        if self.guard_cells < 0:
+            raise ValueError(f"guard_cells must not be negative, got {self.guard_cells!r}")
+        if not 0 < self.false_alarm_rate < 1:
+            raise ValueError(f"false_alarm_rate must be between 0 and 1, got {self.false_alarm_rate!r}")
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[Dict[str, Any]]) -> "SonarConfig":
+        """Build a config from request metadata, ignoring unrelated keys; bad values raise ValueError"""
+        metadata = metadata or {}
+        overrides = {}
+        for f in fields(cls):
+            if f.name in metadata:
+                overrides[f.name] = _parse_number(f.name, type(f.default), metadata[f.name])
+        return cls(**overrides)
+
+    def guard(self) -> int:
+        """CFAR guard cells: explicit, or enough resolution cells that the echo's own
+        mainlobe does not leak into its noise estimate"""
+        if self.guard_cells > 0:
+            return self.guard_cells
+        return int(np.ceil(1.5 * self.resolution_cells()))
+
+    def resolution_cells(self) -> float:
+        """Samples per range resolution cell after pulse compression; the Hann taper roughly
+        doubles the fs / bandwidth width of an untapered chirp"""
+        bandwidth = abs(self.chirp_end - self.chirp_start) or self.sample_rate / 2
+        return max(1.0, 2 * self.sample_rate / bandwidth)
+
+    def replica(self) -> np.ndarray:
+        """Hann-windowed linear FM chirp matching the transmitted pulse"""
+        n = max(1, int(round(self.pulse_length * self.sample_rate)))
+        t = np.arange(n) / self.sample_rate
+        sweep = (self.chirp_end - self.chirp_start) / self.pulse_length
+        pulse = np.sin(2 * np.pi * (self.chirp_start * t + 0.5 * sweep * t ** 2)) * np.hanning(n)
+        return (pulse / np.linalg.norm(pulse)).astype(np.float32)
+
+
+@dataclass
+class SonarPeaks:
+    """Detected echoes as parallel arrays, strongest first"""
+    beam: np.ndarray
+    sample: np.ndarray
+    range_m: np.ndarray
+    bearing_deg: np.ndarray  # true bearing
+    snr_db: np.ndarray
+    strength: np.ndarray  # SNR scaled to [0, 1]
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.sample)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        directions = compass_direction(self.bearing_deg)
+        return [
+            {"strength": s, "distance": r, "bearing": b, "direction": d, "snr_db": snr}
+            for s, r, b, d, snr in zip(self.strength.tolist(), self.range_m.tolist(),
+                                       self.bearing_deg.tolist(), directions, self.snr_db.tolist())
+        ]
+
+
+def compass_direction(bearing_deg: np.ndarray) -> List[str]:
+    """Eight-point compass name for each true bearing"""
+    index = np.round(np.mod(bearing_deg, 360.0) / 45.0).astype(int) % 8
+    return [COMPASS_POINTS[i] for i in index]
+
+
+def as_beams(buffer, beams: int = 1) -> np.ndarray:
+    """View a raw float32 buffer (bytes, memoryview or array) as (beams, samples) without copying"""
+    data = buffer if isinstance(buffer, np.ndarray) else np.frombuffer(buffer, dtype=np.float32)
+    if data.ndim == 2:
+        return data
+    if beams < 1 or data.size % beams:
+        raise ValueError(f"Buffer of {data.size} samples does not split into {beams} beams")
+    return data.reshape(beams, data.size // beams)
+
+
+def matched_filter_envelope(beams: np.ndarray, replica: np.ndarray) -> np.ndarray:
+    """Matched-filter envelope power per beam, indexed by echo delay in samples.
+
+    Correlation with the replica is a product in the frequency domain; keeping
+    only positive frequencies before the inverse transform yields the analytic
+    signal, whose magnitude is the envelope without a separate Hilbert pass.
+    """
+    samples = beams.shape[1]
+    n = sp_fft.next_fast_len(samples + len(replica) - 1, real=True)
+    spectrum = sp_fft.rfft(beams, n, axis=1, workers=-1)
+    spectrum *= np.conj(sp_fft.rfft(replica, n))
+    analytic = np.zeros((beams.shape[0], n), dtype=spectrum.dtype)
+    half = spectrum.shape[1]
+    analytic[:, :half] = spectrum
+    analytic[:, 1:(n + 1) // 2] *= 2
+    correlation = sp_fft.ifft(analytic, axis=1, workers=-1)[:, :samples]
+    return correlation.real ** 2 + correlation.imag ** 2
+
+
+def ca_cfar(power: np.ndarray, guard_cells: int, training_cells: int, false_alarm_rate: float,
+            correlation_cells: float = 1.0):
+    """Cell-averaging CFAR along range: returns (noise estimate, threshold) per cell.
+
+    Training windows on both sides of each cell are summed from one cumulative
+    sum; windows are truncated at the ends of the beam. The threshold factor
+    follows the number of independent training samples actually available:
+    after pulse compression, neighbouring cells are correlated over about
+    ``correlation_cells`` samples.
+    """
+    samples = power.shape[1]
+    pad = guard_cells + training_cells + 1
+    # cumulative[:, pad + k] = sum of power[:, :k], with k clamped to [0, samples], so every
+    # window edge below is a plain slice rather than a gather
+    cumulative = np.zeros((power.shape[0], samples + 1 + 2 * pad), dtype=np.float64)
+    np.cumsum(power, axis=1, out=cumulative[:, pad + 1:pad + 1 + samples])
+    cumulative[:, pad + 1 + samples:] = cumulative[:, pad + samples:pad + samples + 1]
+
+    def edge(offset):
+        return cumulative[:, pad + offset:pad + offset + samples]
+
+    total = edge(-guard_cells) - edge(-guard_cells - training_cells)
+    total += edge(guard_cells + 1 + training_cells)
+    total -= edge(guard_cells + 1)
+
+    cells = np.arange(samples)
+    count = (np.clip(cells - guard_cells, 0, samples) - np.clip(cells - guard_cells - training_cells, 0, samples)
+             + np.clip(cells + guard_cells + 1 + training_cells, 0, samples) - np.clip(cells + guard_cells + 1, 0, samples))
+    count = np.maximum(count, 1)
+    noise = total / count
+    independent = np.maximum(count / correlation_cells, 1.0)
+    alpha = independent * (false_alarm_rate ** (-1.0 / independent) - 1.0)
+    return noise, noise * alpha
+
+
+def local_maxima(power: np.ndarray) -> np.ndarray:
+    """Cells that are at least as strong as their eight neighbours in (beam, range)"""
+    padded = np.pad(power, 1, mode="constant", constant_values=-np.inf)
+    centre = padded[1:-1, 1:-1]
+    mask = np.ones(power.shape, dtype=bool)
+    rows, cols = power.shape
+    for db in (-1, 0, 1):
+        for ds in (-1, 0, 1):
+            if db or ds:
+                mask &= centre >= padded[1 + db:1 + db + rows, 1 + ds:1 + ds + cols]
+    return mask
+
+
+def detect_peaks(buffer, config: Optional[SonarConfig] = None) -> SonarPeaks:
+    """Detect echoes in a raw ping buffer and return them with range, bearing and strength"""
+    config = config or SonarConfig()
+    beams = as_beams(buffer, config.beams)
+    replica = config.replica()
+    n_beams, samples = beams.shape
+
+    power = np.empty((n_beams, samples), dtype=np.float32)
+    snr = np.empty((n_beams, samples), dtype=np.float32)
+    block = max(1, BLOCK_SAMPLES // max(samples, 1))
+    for start in range(0, n_beams, block):
+        envelope = matched_filter_envelope(beams[start:start + block], replica)
+        noise, threshold = ca_cfar(envelope, config.guard(), config.training_cells,
+                                  config.false_alarm_rate, config.resolution_cells())
+        power[start:start + block] = envelope
+        snr[start:start + block] = np.where(envelope > threshold, envelope / np.maximum(noise, 1e-30), 0)
+
+    detected = (snr > 0) & local_maxima(power)
+    beam_idx, sample_idx = np.nonzero(detected)
+    snr_db = 10 * np.log10(snr[beam_idx, sample_idx])
+    order = np.argsort(-snr_db, kind="stable")[:config.max_peaks]
+    beam_idx, sample_idx, snr_db = beam_idx[order], sample_idx[order], snr_db[order]
+
+    beam_bearings = np.linspace(config.bearing_start, config.bearing_end, n_beams) if n_beams > 1 \
+        else np.array([(config.bearing_start + config.bearing_end) / 2])
+    return SonarPeaks(
+        beam=beam_idx,
+        sample=sample_idx,
+        range_m=sample_idx * config.sound_speed / (2 * config.sample_rate),
+        bearing_deg=np.mod(config.heading + beam_bearings[beam_idx], 360.0),
+        snr_db=snr_db,
+        strength=np.clip(snr_db / config.full_scale_snr_db, 0.0, 1.0),
+        stats={"beams": n_beams, "samples": samples, "detections": int(detected.sum())},
+    )
@@ -0,0 +1,143 @@
+"""Lightweight IoU tracker for detections on sampled video frames.
+
+The detector only runs on every few frames (or keyframes). Between those,
+each track's box is carried forward with its constant-velocity estimate, so
+callers still get a box per track per frame without running the model. On
+a detection frame, detections are matched to the predicted boxes of the same
+class by greedy IoU and unmatched detections start new tracks. Tracks count
+as real objects once they have been matched ``min_hits`` times; they end
+after ``max_missed`` detection rounds without a match. Events are emitted per
+track (started / ended) instead of per frame, and ``unique_objects`` counts
+confirmed tracks by class.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (n, 4) and (m, 4) arrays of x1, y1, x2, y2 boxes"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+@dataclass
+class Track:
+    track_id: int
+    label: str
+    box: np.ndarray  # x1, y1, x2, y2 at last_frame
+    first_frame: int
+    last_frame: int  # last frame the detector matched this track
+    velocity: np.ndarray = field(default_factory=lambda: np.zeros(4))  # box change per frame
+    hits: int = 1
+    missed: int = 0
+    max_confidence: float = 0.0
+    confirmed: bool = False
+
+    def predict(self, frame: int) -> np.ndarray:
+        return self.box + self.velocity * (frame - self.last_frame)
+
+    def to_dict(self, frame: Optional[int] = None) -> Dict[str, Any]:
+        box = self.box if frame is None else self.predict(frame)
+        return {
+            "track_id": self.track_id,
+            "type": self.label,
+            "bbox": [float(v) for v in box],
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "hits": self.hits,
+            "confidence": self.max_confidence,
+        }
+
+
+class IoUTracker:
+    def __init__(self, iou_threshold: float = 0.3, min_hits: int = 2, max_missed: int = 3,
+                 velocity_smoothing: float = 0.5):
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_missed = max_missed
+        self.velocity_smoothing = velocity_smoothing
+        self.tracks: List[Track] = []
+        self.unique_objects: Dict[str, int] = {}
+        self._next_id = 1
+
+    def boxes(self, frame: int) -> List[Dict[str, Any]]:
+        """Confirmed tracks with their boxes carried forward to ``frame`` (no detector call)"""
+        return [track.to_dict(frame) for track in self.tracks if track.confirmed]
+
+    def update(self, frame: int, detections: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Match one detection frame's objects ({type, confidence, bbox}) to tracks; returns events"""
+        events: List[Dict[str, Any]] = []
+        labels = np.array([d["type"] for d in detections], dtype=object)
+        det_boxes = np.array([d["bbox"] for d in detections], dtype=np.float64).reshape(-1, 4)
+        confidences = np.array([d.get("confidence", 0.0) for d in detections], dtype=np.float64)
+
+        predicted = np.array([t.predict(frame) for t in self.tracks]).reshape(-1, 4)
+        iou = iou_matrix(predicted, det_boxes)
+        if iou.size:
+            track_labels = np.array([t.label for t in self.tracks], dtype=object)
+            iou[track_labels[:, None] != labels[None, :]] = 0.0
+
+        matched_tracks, matched_dets = set(), set()
+        # Greedy assignment, best overlap first
+        for flat in np.argsort(-iou, axis=None):
+            ti, di = np.unravel_index(flat, iou.shape)
+            if iou[ti, di] < self.iou_threshold:
+                break
+            if ti in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            track = self.tracks[ti]
+            elapsed = max(frame - track.last_frame, 1)
+            observed = (det_boxes[di] - track.box) / elapsed
+            a = self.velocity_smoothing
+            track.velocity = a * observed + (1 - a) * track.velocity if track.hits > 1 else observed
+            track.box = det_boxes[di]
+            track.last_frame = frame
+            track.hits += 1
+            track.missed = 0
+            track.max_confidence = max(track.max_confidence, float(confidences[di]))
+            if not track.confirmed and track.hits >= self.min_hits:
+                track.confirmed = True
+                self.unique_objects[track.label] = self.unique_objects.get(track.label, 0) + 1
+                events.append({"event": "track_started", "frame": frame, "track": track.to_dict()})
+
+        survivors = []
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    if track.confirmed:
+                        events.append({"event": "track_ended", "frame": frame, "track": track.to_dict()})
+                    continue
+            survivors.append(track)
+        self.tracks = survivors
+
+        for di in range(len(det_boxes)):
+            if di in matched_dets:
+                continue
+            track = Track(self._next_id, labels[di], det_boxes[di], frame, frame,
+                          max_confidence=float(confidences[di]))
+            self._next_id += 1
+            if self.min_hits <= 1:
+                track.confirmed = True
+                self.unique_objects[track.label] = self.unique_objects.get(track.label, 0) + 1
+                events.append({"event": "track_started", "frame": frame, "track": track.to_dict()})
+            self.tracks.append(track)
+        return events
+
+    def finish(self, frame: int) -> List[Dict[str, Any]]:
+        """End every open confirmed track, e.g. when the stream closes"""
+        events = [{"event": "track_ended", "frame": frame, "track": t.to_dict()} for t in self.tracks if t.confirmed]
+        self.tracks = []
+        return events
@@ -0,0 +1,235 @@
+"""Streaming video detection: sample frames, detect, track, emit per-track events.
+
+A client opens the /detect/video WebSocket and first sends a JSON config:
+
+    {"source": "frames" | "container", "fps": 24, "detect_every": 6,
+     "width": 1280, "height": 720, "summary_every": 48}
+
+In ``frames`` mode every binary message is one encoded image (JPEG/PNG).
+Only every ``detect_every``-th frame is decoded and sent to the detector;
+the others are just counted, because the tracker carries boxes across them.
+In ``container`` mode binary messages are consecutive chunks of a video file
+or stream (MP4, MPEG-TS, ...). They are piped through ffmpeg, which decodes
+incrementally and only outputs the sampled frames, scaled to width x height.
+A text message {"type": "end"} (or disconnecting) ends the stream. If ffmpeg
+fails on the input, the server sends {"type": "error", "detail": ...} with the
+tail of ffmpeg's stderr before the final summary.
+
+The server sends JSON messages: {"type": "track", "event": "track_started" |
+"track_ended", "frame": n, "track": {track_id, type, bbox, ...}} once per
+object rather than once per frame. Every
+``summary_every`` frames, and at the end, it sends {"type": "summary",
+"unique_objects": {...}, "video_info": {...}}, which has the same shape as the
+offline *_detections.json files threat_response_creation.py reads.
+"""
+import json
+import shutil
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from inference_executor import Overloaded
+from tracker import IoUTracker
+
+Detect = Callable[[Any], Awaitable[List[Dict[str, Any]]]]
+
+
+class VideoSession:
+    """Frame counting, sampling and tracking state for one stream"""
+
+    def __init__(self, detect: Detect, fps: float = 24.0, detect_every: int = 6,
+                 summary_every: int = 48, tracker: Optional[IoUTracker] = None,
+                 resolution: Optional[str] = None):
+        self.detect = detect
+        self.fps = fps
+        self.detect_every = max(1, detect_every)
+        self.summary_every = summary_every
+        self.tracker = tracker or IoUTracker()
+        self.resolution = resolution
+        self.frames = 0
+        self.detected_frames = 0
+        self.dropped_detections = 0  # sampled frames skipped (inference overloaded or undecodable)
+
+    def is_sampled(self, index: int) -> bool:
+        return index % self.detect_every == 0
+
+    async def on_frame(self, index: int, frame: Any) -> List[Dict[str, Any]]:
+        """Detect on a sampled frame (encoded bytes or a decoded array) and return track events"""
+        self.frames = max(self.frames, index + 1)
+        try:
+            objects = await self.detect(frame)
+        except (Overloaded, ValueError):
+            # Inference shed load or the frame did not decode; the tracker coasts over it
+            self.dropped_detections += 1
+            return []
+        self.detected_frames += 1
+        return [{"type": "track", **event} for event in self.tracker.update(index, objects)]
+
+    def summary(self, final: bool = False) -> Dict[str, Any]:
+        return {
+            "type": "summary",
+            "final": final,
+            "unique_objects": dict(self.tracker.unique_objects),
+            "active_tracks": self.tracker.boxes(self.frames - 1) if not final else [],
+            "video_info": {
+                "total_frames": self.frames,
+                "detected_frames": self.detected_frames,
+                "dropped_detections": self.dropped_detections,
+                "fps": self.fps,
+                "resolution": self.resolution,
+            },
+        }
+
+
+class FFmpegDecoder:
+    """Incremental decoder: container bytes in, sampled BGR frames out (needs ffmpeg on PATH)"""
+
+    def __init__(self, width: int, height: int, detect_every: int):
+        self.width, self.height, self.detect_every = width, height, detect_every
+        self.frame_bytes = width * height * 3
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.stderr_tail: deque = deque(maxlen=20)
+        self._stderr_reader: Optional[asyncio.Task] = None
+
+    def command(self) -> List[str]:
+        return [
+            "ffmpeg", "-loglevel", "error", "-i", "pipe:0",
+            "-vf", f"select=not(mod(n\\,{self.detect_every})),scale={self.width}:{self.height}",
+            "-vsync", "0", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+        ]
+
+    async def start(self) -> None:
+        command = self.command()
+        if shutil.which(command[0]) is None:
+            raise RuntimeError(f"{command[0]} is required for container streams")
+        self.proc = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        # Drained continuously so a chatty decoder cannot block on a full pipe
+        self._stderr_reader = asyncio.create_task(self._read_stderr())
+
+    async def _read_stderr(self) -> None:
+        async for line in self.proc.stderr:
+            self.stderr_tail.append(line.decode(errors="replace").rstrip())
+
+    async def write(self, chunk: bytes) -> None:
+        self.proc.stdin.write(chunk)
+        await self.proc.stdin.drain()
+
+    async def close_input(self) -> None:
+        self.proc.stdin.close()
+
+    async def frames(self):
+        """Yield (source frame index, frame) for each sampled frame until the input ends"""
+        k = 0
+        while True:
+            try:
+                data = await self.proc.stdout.readexactly(self.frame_bytes)
+            except asyncio.IncompleteReadError:
+                break
+            yield k * self.detect_every, np.frombuffer(data, np.uint8).reshape(self.height, self.width, 3)
+            k += 1
+        await self.proc.wait()
+
+    async def close(self) -> Optional[int]:
+        """Stop the decoder if it is still running and return its exit code"""
+        if self.proc is None:
+            return None
+        if self.proc.returncode is None:
+            self.proc.kill()
+        await self.proc.wait()
+        if self._stderr_reader is not None:
+            await self._stderr_reader
+        return self.proc.returncode
+
+
+async def stream_video(websocket, detect: Detect) -> Dict[str, Any]:
+    """Run one /detect/video session over an accepted WebSocket; returns the final summary"""
+    config = await websocket.receive_json()
+    source = config.get("source", "frames")
+    width, height = config.get("width"), config.get("height")
+    session = VideoSession(
+        detect,
+        fps=float(config.get("fps", 24)),
+        detect_every=int(config.get("detect_every", 6)),
+        summary_every=int(config.get("summary_every", 48)),
+        resolution=f"{width}x{height}" if width and height else None,
+    )
+
+    disconnected = False
+
+    async def send_all(messages):
+        for message in messages:
+            await websocket.send_json(message)
+
+    async def receive_chunks():
+        nonlocal disconnected
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                disconnected = True
+                return
+            if message.get("bytes") is not None:
+                yield message["bytes"]
+            elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                return
+
+    if source == "frames":
+        last_summary = 0
+        async for chunk in receive_chunks():
+            index = session.frames
+            session.frames += 1
+            if session.is_sampled(index):
+                await send_all(await session.on_frame(index, chunk))
+            if session.summary_every and session.frames - last_summary >= session.summary_every:
+                last_summary = session.frames
+                await websocket.send_json(session.summary())
+    elif source == "container":
+        if not (width and height):
+            await websocket.send_json({"type": "error", "detail": "container streams need width and height"})
+            return session.summary(final=True)
+        decoder = FFmpegDecoder(int(width), int(height), session.detect_every)
+        try:
+            await decoder.start()
+        except RuntimeError as e:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            return session.summary(final=True)
+
+        async def pump():
+            try:
+                async for chunk in receive_chunks():
+                    await decoder.write(chunk)
+                await decoder.close_input()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # ffmpeg exited early; its exit code is reported below
+
+        feeder = asyncio.create_task(pump())
+        try:
+            next_summary = session.summary_every
+            async for index, frame in decoder.frames():
+                await send_all(await session.on_frame(index, frame))
+                if session.summary_every and session.frames >= next_summary:
+                    next_summary += session.summary_every
+                    await websocket.send_json(session.summary())
+            if decoder.proc.returncode == 0:
+                await feeder  # on failure the client may still be mid-upload; the feeder is cancelled
+        finally:
+            if not feeder.done():
+                feeder.cancel()
+                await asyncio.gather(feeder, return_exceptions=True)
+            returncode = await decoder.close()
+        if returncode and not disconnected:
+            detail = "\n".join(decoder.stderr_tail) or "no output"
+            await websocket.send_json({"type": "error", "detail": f"ffmpeg exited with code {returncode}: {detail}"})
+    else:
+        await websocket.send_json({"type": "error", "detail": f"Unknown source {source!r}"})
+
+    end_events = [{"type": "track", **event} for event in session.tracker.finish(session.frames - 1)]
+    summary = session.summary(final=True)
+    if not disconnected:
+        await send_all(end_events)
+        await websocket.send_json(summary)
+    return summary
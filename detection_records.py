@@ -0,0 +1,56 @@
+"""Fields of detection records, shared by the agent and the detection service.
+
+Detections arrive from the camera service, the video pipeline and the sonar
+detector in slightly different shapes. These accessors read position, time,
+sensor and severity the same way wherever the records are fused, triaged or
+stored.
+"""
+import math
+import time
+from typing import Any, Dict, Optional, Tuple
+
+SEVERITY_LEVELS = ["none", "low", "medium", "high"]
+
+# Object classes the detection service rates high or medium (assess_threat_level)
+HIGH_THREAT_OBJECTS = {"submarine", "potential_submarine", "military_vessel", "armed_person"}
+MEDIUM_THREAT_OBJECTS = {"unidentified_vessel", "unauthorized_vessel", "diver"}
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def detection_position(detection: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """(lat, lon) from a detection's coordinates or location.coordinates, if it has any"""
+    for coordinates in (detection.get("coordinates"), (detection.get("location") or {}).get("coordinates")):
+        if not isinstance(coordinates, dict):
+            continue
+        lat = coordinates.get("lat", coordinates.get("latitude"))
+        lon = coordinates.get("lon", coordinates.get("longitude"))
+        if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+            return float(lat), float(lon)
+    return None
+
+
+def detection_time(detection: Dict[str, Any], default: Optional[float] = None) -> float:
+    timestamp = detection.get("timestamp")
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return time.time() if default is None else default
+
+
+def detection_sensor(detection: Dict[str, Any]) -> str:
+    method = (detection.get("metadata") or {}).get("detection_method")
+    if method:
+        return method
+    if detection.get("type") == "video_surveillance":
+        return "video"
+    if "objects_detected" in detection:
+        return "camera"
+    return detection.get("type") or "unknown"
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Equirectangular distance; accurate to well under 1% at fusion distances"""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS_M * math.hypot(x, y)
@@ -14,3 +14,15 @@ export const analyzeThreat = async (sonarData, cameraData) => {
     throw error;
   }
 };
+
+// Stored threat responses, newest first. filters: severity, min_severity, sensor,
+// type, since, until, lat/lon/radius_m, limit; pass next_cursor back as cursor.
+export const fetchThreatResponses = async (filters = {}) => {
+  try {
+    const response = await axios.get(`${API_BASE_URL}/responses`, { params: filters });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching threat responses:', error);
+    throw error;
+  }
+};
@@ -0,0 +1,386 @@
+"""Lightweight in-process metrics shared by the detection service and the agent.
+
+Counters, gauges and fixed-bucket histograms live in a process-wide REGISTRY.
+Observing is a bisect plus a lock (a timed block costs a few microseconds),
+and nothing leaves the process unless asked:
+
+    with timed("yolo_inference"):
+        results = model(images)
+
+records into the stage_duration_seconds{stage="yolo_inference"} histogram.
+``REGISTRY.render_prometheus()`` produces the Prometheus text format for a
+/metrics endpoint. ``REGISTRY.summary()`` gives count, mean and p50/p95/p99 per
+series for logs, and MetricsReporter prints that summary periodically.
+
+Histograms keep fine buckets (quarter octaves, about 19% wide) so the logged
+quantiles are accurate to within one bucket. Prometheus only gets every
+fourth boundary (powers of two), which keeps the scrape small.
+
+SamplingProfiler is an optional, dependency-free stack sampler. Turn it on
+around a single request or detection to see where its time went; it writes
+folded stacks that flamegraph.pl and speedscope read.
+"""
+import sys
+import json
+import time
+import bisect
+import functools
+import threading
+from collections import Counter as _Tally
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 0.1 ms .. ~105 s in quarter-octave steps
+LATENCY_BUCKETS = [1e-4 * 2 ** (k / 4) for k in range(81)]
+STAGE_METRIC = "stage_duration_seconds"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self.value = 0.0
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS, export_every: int = 4):
+        self.bounds = list(buckets)
+        self.export_every = export_every
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * len(self.counts)
+            self.count, self.sum, self.max = 0, 0.0, 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate from the buckets, interpolating linearly inside the one holding the quantile"""
+        with self._lock:
+            counts, total, largest = list(self.counts), self.count, self.max
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else largest
+                return min(lower + (upper - lower) * (rank - seen) / n, largest)
+            seen += n
+        return largest
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+    def exported_buckets(self) -> List[Tuple[float, int]]:
+        """Cumulative (upper bound, count) at every ``export_every``-th bound, plus +Inf"""
+        with self._lock:
+            counts = list(self.counts)
+        cumulative, running = [], 0
+        for index, bound in enumerate(self.bounds):
+            running += counts[index]
+            if index % self.export_every == 0:
+                cumulative.append((bound, running))
+        cumulative.append((float("inf"), running + counts[-1]))
+        return cumulative
+
+
+class Timer:
+    """Context manager and decorator that observes elapsed seconds into a histogram.
+
+    Each ``with`` needs its own Timer (``timed()`` returns a new one), so timers
+    are safe across threads and across awaits; as a decorator every call gets a
+    fresh one.
+    """
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+    def __call__(self, fn: Callable) -> Callable:
+        histogram = self.histogram
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Timer(histogram):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class Registry:
+    def __init__(self):
+        self._families: Dict[str, Dict[str, Any]] = {}
+        self._timed: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _series(self, kind: str, name: str, help: str, labels: Dict[str, Any], factory: Callable[[], Any]):
+        key = _label_key(labels)
+        family = self._families.get(name)
+        if family is not None:
+            series = family["series"].get(key)
+            if series is not None:
+                return series
+        with self._lock:
+            family = self._families.setdefault(name, {"type": kind, "help": help, "series": {}})
+            if family["type"] != kind:
+                raise ValueError(f"Metric {name} is a {family['type']}, not a {kind}")
+            if help and not family["help"]:
+                family["help"] = help
+            return family["series"].setdefault(key, factory())
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._series("counter", name, help, labels, Counter)
+
+    def histogram(self, name: str, help: str = "", buckets: Sequence[float] = LATENCY_BUCKETS,
+                  **labels) -> Histogram:
+        return self._series("histogram", name, help, labels, lambda: Histogram(buckets))
+
+    def gauge(self, name: str, fn: Callable[[], float], help: str = "", **labels) -> None:
+        """Register a gauge whose value is read from ``fn`` whenever metrics are rendered"""
+        with self._lock:
+            family = self._families.setdefault(name, {"type": "gauge", "help": help, "series": {}})
+            family["series"][_label_key(labels)] = fn
+
+    def timer(self, name: str, help: str = "", **labels) -> Timer:
+        key = (name, _label_key(labels))
+        histogram = self._timed.get(key)
+        if histogram is None:
+            histogram = self._timed.setdefault(key, self.histogram(name, help, **labels))
+        return Timer(histogram)
+
+    def timed(self, stage: str) -> Timer:
+        return self.timer(STAGE_METRIC, "Time spent per pipeline stage", stage=stage)
+
+    def _items(self) -> List[Tuple[str, Dict[str, Any], List[Tuple[LabelKey, Any]]]]:
+        with self._lock:
+            return [(name, family, list(family["series"].items())) for name, family in sorted(self._families.items())]
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for name, family, series in self._items():
+            if family["help"]:
+                lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for key, metric in series:
+                if family["type"] == "histogram":
+                    for bound, count in metric.exported_buckets():
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(metric.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {metric.count}")
+                elif family["type"] == "counter":
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(metric.value)}")
+                else:
+                    try:
+                        value = float(metric())
+                    except Exception:
+                        continue
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters, gauges and histogram quantiles keyed by ``name{labels}``"""
+        result = {}
+        for name, family, series in self._items():
+            for key, metric in series:
+                label = name + _format_labels(key)
+                if family["type"] == "histogram":
+                    if metric.count:
+                        result[label] = metric.snapshot()
+                elif family["type"] == "counter":
+                    result[label] = metric.value
+                else:
+                    try:
+                        result[label] = float(metric())
+                    except Exception:
+                        continue
+        return result
+
+    def reset(self) -> None:
+        """Zero every counter and histogram in place (decorated functions keep their series)"""
+        for _, family, series in self._items():
+            if family["type"] != "gauge":
+                for _, metric in series:
+                    metric.reset()
+
+
+REGISTRY = Registry()
+
+
+def timed(stage: str) -> Timer:
+    """Time a pipeline stage: ``with timed("prompt_build"): ...`` or ``@timed("json_parse")``"""
+    return REGISTRY.timed(stage)
+
+
+def counter(name: str, help: str = "", **labels) -> Counter:
+    return REGISTRY.counter(name, help, **labels)
+
+
+def histogram(name: str, help: str = "", **labels) -> Histogram:
+    return REGISTRY.histogram(name, help, **labels)
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Human-readable lines for a Registry.summary(); durations are in milliseconds"""
+    lines = []
+    for label, value in summary.items():
+        if isinstance(value, dict):
+            lines.append(f"  {label}: n={value['count']} mean={value['mean'] * 1000:.1f}ms "
+                         f"p50={value['p50'] * 1000:.1f}ms p95={value['p95'] * 1000:.1f}ms "
+                         f"p99={value['p99'] * 1000:.1f}ms")
+        else:
+            lines.append(f"  {label}: {value:g}")
+    return "\n".join(lines)
+
+
+class MetricsReporter:
+    """Prints (and optionally writes as JSON) the registry summary every ``interval`` seconds"""
+
+    def __init__(self, interval: float, registry: Registry = REGISTRY, path: Optional[str] = None):
+        self.interval = interval
+        self.registry = registry
+        self.path = path
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def report(self, final: bool = False) -> Dict[str, Any]:
+        summary = self.registry.summary()
+        if summary:
+            print(f"{'Final metrics' if final else 'Metrics'}:\n{format_summary(summary)}")
+        if self.path:
+            with open(self.path, "w") as f:
+                json.dump({"time": time.time(), "final": final, "metrics": summary}, f, indent=2)
+        return summary
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def start(self) -> "MetricsReporter":
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop reporting and emit the final summary"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.report(final=True)
+
+
+class SamplingProfiler:
+    """Samples Python stacks every ``interval`` seconds from a background thread.
+
+    ``thread_ids`` limits sampling to those threads (e.g. the one handling a
+    detection); by default every thread except the sampler is sampled, which
+    covers work a request hands to executor threads.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[Iterable[int]] = None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.samples = 0
+        self.stacks: _Tally = _Tally()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.thread_ids is not None and ident not in self.thread_ids):
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def folded(self) -> str:
+        """Folded stacks, one ``thread;outer;...;inner count`` line each"""
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            f.write(self.folded())
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
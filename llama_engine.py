@@ -0,0 +1,391 @@
+"""Text generation engine used by llama_modal.Model.
+
+Kept free of any Modal imports so it can be exercised on CPU with a small local
+causal LM (see benchmarks/).
+"""
+import copy
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+class JSONCloseTracker:
+    """Follows brace depth in streamed text to spot where the first top-level JSON object ends"""
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.closed = False
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> bool:
+        for char in text:
+            if self.closed:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self.started:
+                self._in_string = True
+            elif char == "{":
+                self.depth += 1
+                self.started = True
+            elif char == "}" and self.started:
+                self.depth -= 1
+                self.closed = self.depth == 0
+        return self.closed
+
+
+def _json_stopping_criteria(tokenizer, prompt_length: int):
+    """Stopping criterion for single-row generation that ends once the JSON object closes"""
+    import torch
+    from transformers import StoppingCriteria
+
+    class StopAtJSONClose(StoppingCriteria):
+        def __init__(self):
+            self.tracker = JSONCloseTracker()
+            self.seen = 0
+
+        def __call__(self, input_ids, scores, **kwargs):
+            text = tokenizer.decode(input_ids[0, prompt_length:], skip_special_tokens=True)
+            closed = self.tracker.feed(text[self.seen:])
+            self.seen = len(text)
+            return torch.full((input_ids.shape[0],), closed, dtype=torch.bool, device=input_ids.device)
+
+    return StopAtJSONClose()
+
+
+def _event_stopping_criteria(event: threading.Event):
+    """Stopping criterion that ends generation once ``event`` is set, e.g. when the reader goes away"""
+    import torch
+    from transformers import StoppingCriteria
+
+    class StopOnEvent(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+    return StopOnEvent()
+
+
+@dataclass
+class CachedPrefix:
+    """A registered prompt prefix with its tokenization and KV state"""
+    name: str
+    text: str
+    rendered: str
+    input_ids: Any  # (1, prefix_len) tensor on the model device
+    past_key_values: Any
+
+    @property
+    def num_tokens(self) -> int:
+        return self.input_ids.shape[1]
+
+
+class GenerationEngine:
+    """Wraps a causal LM and tokenizer and generates chat completions in padded batches"""
+
+    def __init__(self, model, tokenizer, system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+                 max_new_tokens: int = 256, generation_kwargs: Optional[Dict[str, Any]] = None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.system_prompt = system_prompt
+        self.max_new_tokens = max_new_tokens
+        self.generation_kwargs = generation_kwargs or {}
+
+        # Decoder-only models must be left padded so every row ends at the generation point
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token_id is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        self.prefixes: Dict[str, CachedPrefix] = {}
+        self._prefix_lock = threading.Lock()
+
+    def render_chat(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """Render a prompt with the model's chat template"""
+        messages = [
+            {"role": "system", "content": system_prompt or self.system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+        if getattr(self.tokenizer, "chat_template", None):
+            return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        # Small test models often ship without a chat template
+        return f"{messages[0]['content']}\n\n{prompt}\n\n"
+
+    def render_shared(self, prefix: str) -> str:
+        """The part of render_chat(prefix + prompt) before the prompt: chat header and ``prefix``"""
+        marker = "\x00prompt\x00"
+        rendered = self.render_chat(prefix + marker)
+        if marker not in rendered:
+            raise ValueError("Chat template does not keep the user message verbatim")
+        return rendered[:rendered.index(marker)]
+
+    def generate_batch(self, prompts: List[str], max_new_tokens: Optional[int] = None,
+                       system_prompt: Optional[str] = None) -> List[str]:
+        """Generate completions for several prompts in one padded forward pass"""
+        if not prompts:
+            return []
+        texts = [self.render_chat(prompt, system_prompt) for prompt in prompts]
+        encoded = self.tokenizer(texts, return_tensors="pt", padding=True, add_special_tokens=False)
+        encoded = encoded.to(self.model.device)
+        return self._generate(encoded["input_ids"], encoded["attention_mask"], max_new_tokens)
+
+    def generate(self, prompt: str, max_new_tokens: Optional[int] = None) -> str:
+        return self.generate_batch([prompt], max_new_tokens)[0]
+
+    def _generate(self, input_ids, attention_mask, max_new_tokens: Optional[int],
+                  past_key_values=None) -> List[str]:
+        import torch
+
+        extra = {} if past_key_values is None else {"past_key_values": past_key_values}
+        with torch.inference_mode():
+            output = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                max_new_tokens=max_new_tokens or self.max_new_tokens,
+                pad_token_id=self.tokenizer.pad_token_id,
+                **extra,
+                **self.generation_kwargs,
+            )
+
+        new_tokens = output[:, input_ids.shape[1]:]
+        return [text.strip() for text in self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)]
+
+    def stream(self, prompt: str, prefix_name: Optional[str] = None, max_new_tokens: Optional[int] = None,
+               stop_at_json_end: bool = True) -> Iterator[str]:
+        """Yield the completion for one prompt as text pieces while it is generated.
+
+        With ``stop_at_json_end`` generation stops as soon as the first top-level
+        JSON object in the completion is closed. Streams run unbatched. Closing
+        the iterator early stops generation at the next token.
+        """
+        from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+        past_key_values = None
+        if prefix_name is not None:
+            input_ids, attention_mask = self.prefix_inputs(prefix_name, [prompt])
+            past_key_values = copy.deepcopy(self.prefixes[prefix_name].past_key_values)
+        else:
+            encoded = self.tokenizer([self.render_chat(prompt)], return_tensors="pt", add_special_tokens=False)
+            encoded = encoded.to(self.model.device)
+            input_ids, attention_mask = encoded["input_ids"], encoded["attention_mask"]
+
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        kwargs = dict(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            max_new_tokens=max_new_tokens or self.max_new_tokens,
+            pad_token_id=self.tokenizer.pad_token_id,
+            streamer=streamer,
+            **self.generation_kwargs,
+        )
+        if past_key_values is not None:
+            kwargs["past_key_values"] = past_key_values
+        stop = threading.Event()
+        criteria = [_event_stopping_criteria(stop)]
+        if stop_at_json_end:
+            criteria.append(_json_stopping_criteria(self.tokenizer, input_ids.shape[1]))
+        kwargs["stopping_criteria"] = StoppingCriteriaList(criteria)
+
+        errors: List[BaseException] = []
+
+        def run():
+            import torch
+
+            try:
+                with torch.inference_mode():
+                    self.model.generate(**kwargs)
+            except BaseException as e:
+                errors.append(e)
+                streamer.end()
+
+        worker = threading.Thread(target=run, name="generation-stream", daemon=True)
+        worker.start()
+        try:
+            for text in streamer:
+                if text:
+                    yield text
+        finally:
+            # Also reached when the consumer stops reading, e.g. a client disconnect
+            stop.set()
+            worker.join()
+        if errors:
+            raise errors[0]
+
+    def register_prefix(self, name: str, text: str) -> CachedPrefix:
+        """Prefill the chat header and a shared prompt prefix once and keep the KV cache for
+        generate_with_prefix; prompts are rendered exactly as render_chat(text + prompt)"""
+        import torch
+
+        with self._prefix_lock:
+            cached = self.prefixes.get(name)
+            if cached is not None and cached.text == text:
+                return cached
+
+            rendered = self.render_shared(text)
+            input_ids = self.tokenizer(rendered, return_tensors="pt", add_special_tokens=False)["input_ids"]
+            input_ids = input_ids.to(self.model.device)
+            with torch.inference_mode():
+                output = self.model(input_ids=input_ids, use_cache=True)
+
+            cached = CachedPrefix(name, text, rendered, input_ids, output.past_key_values)
+            self.prefixes[name] = cached
+            return cached
+
+    def prefix_inputs(self, name: str, prompts: List[str]) -> Tuple[Any, Any]:
+        """Build (input_ids, attention_mask) of the full prefix + prompt sequence.
+
+        The prefix is tokenized on its own and prompts are left padded after it,
+        so rows share the cached prefix positions and padding sits between the
+        prefix and each prompt where the attention mask hides it.
+        """
+        import torch
+
+        cached = self.prefixes[name]
+        suffixes = []
+        for prompt in prompts:
+            full = self.render_chat(cached.text + prompt)
+            if not full.startswith(cached.rendered):
+                raise ValueError(f"Chat template does not render prefix '{name}' as a shared prefix")
+            suffixes.append(full[len(cached.rendered):])
+
+        encoded = self.tokenizer(suffixes, return_tensors="pt", padding=True, add_special_tokens=False)
+        encoded = encoded.to(self.model.device)
+        batch = len(prompts)
+        input_ids = torch.cat([cached.input_ids.expand(batch, -1), encoded["input_ids"]], dim=1)
+        attention_mask = torch.cat([
+            torch.ones((batch, cached.num_tokens), dtype=encoded["attention_mask"].dtype,
+                       device=encoded["attention_mask"].device),
+            encoded["attention_mask"],
+        ], dim=1)
+        return input_ids, attention_mask
+
+    def generate_with_prefix(self, name: str, prompts: List[str], max_new_tokens: Optional[int] = None,
+                             use_cache: bool = True) -> List[str]:
+        """Generate for prompts that follow a registered prefix, prefilling only the prompt tokens.
+
+        The model sees the same prompt as generate(prefix + prompt). With
+        ``use_cache=False`` the identical token sequence is prefilled from
+        scratch, which is the reference the cached path must match.
+        """
+        if not prompts:
+            return []
+        input_ids, attention_mask = self.prefix_inputs(name, prompts)
+        if not use_cache:
+            return self._generate(input_ids, attention_mask, max_new_tokens)
+
+        # generate() appends to the cache in place, so each call works on a copy
+        past_key_values = copy.deepcopy(self.prefixes[name].past_key_values)
+        if len(prompts) > 1:
+            past_key_values.batch_repeat_interleave(len(prompts))
+        return self._generate(input_ids, attention_mask, max_new_tokens, past_key_values)
+
+    def generate_prefixed_batch(self, requests: List[Tuple[str, str]]) -> List[str]:
+        """MicroBatcher entry point for (prefix_name, prompt) requests, batched per prefix"""
+        groups: Dict[str, List[int]] = {}
+        for index, (name, _) in enumerate(requests):
+            groups.setdefault(name, []).append(index)
+
+        results: List[Optional[str]] = [None] * len(requests)
+        for name, indices in groups.items():
+            outputs = self.generate_with_prefix(name, [requests[i][1] for i in indices])
+            for index, output in zip(indices, outputs):
+                results[index] = output
+        return results
+
+
+class MicroBatcher:
+    """Merges concurrent single-item calls into batches for a batch function.
+
+    A background thread takes the first waiting request, then keeps collecting
+    until ``max_batch_size`` requests are queued or ``max_wait`` seconds have
+    passed since that first request, and runs them as one batch. Each caller
+    blocks only until its own result is ready.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 max_wait: float = 0.02):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches_run = 0
+        self.items_run = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()  # nothing is queued behind the close sentinel
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        return self.submit(item).result(timeout)
+
+    def close(self) -> None:
+        """Run what was submitted before closing, then fail anything the worker did not reach"""
+        with self._lock:
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join()
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not None:
+                entry[1].set_exception(RuntimeError("MicroBatcher is closed"))
+
+    def _collect(self) -> List:
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                # Re-queue the sentinel so the loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.batch_fn(items))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch_fn returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches_run += 1
+            self.items_run += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
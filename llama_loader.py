@@ -0,0 +1,96 @@
+"""Load the causal LM for llama_modal.Model, reading the cached snapshot once.
+
+The snapshot, pinned to a revision, comes from the first of these that has it:
+
+1. a preloaded directory (LLAMA_MODEL_PATH, e.g. a volume filled by
+   ``modal run llama_modal.py::download_model``), used as is with no hub calls
+2. a warm hub cache that already holds the revision, resolved with
+   local_files_only and no network round-trips
+3. a download of only what loading needs (configs, tokenizer and safetensors
+   shards, not the duplicate original/*.pth checkpoint)
+
+The weights are then loaded from that local path with the target dtype and
+device placement passed to from_pretrained. Safetensors shards are
+memory-mapped and each tensor is copied once, straight into its final dtype
+and device. Nothing is materialized in fp32 on CPU first. Every stage is
+timed, and the report includes peak RSS.
+"""
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Files from_pretrained and the tokenizer need; everything else in the repo is skipped
+ALLOW_PATTERNS = ["*.json", "*.safetensors", "tokenizer*", "*.model", "*.tiktoken"]
+
+
+def peak_rss_mb() -> float:
+    """High-water mark of this process's resident memory (VmHWM)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def resolve_snapshot(model_id: str, revision: Optional[str] = None, cache_dir: Optional[str] = None,
+                     local_path: Optional[str] = None) -> Tuple[str, str]:
+    """Local directory holding the model, and where it came from: preloaded, cache or download"""
+    if local_path:
+        if not os.path.isfile(os.path.join(local_path, "config.json")):
+            raise FileNotFoundError(f"No config.json in preloaded model directory {local_path}")
+        return local_path, "preloaded"
+
+    from huggingface_hub import snapshot_download
+    from huggingface_hub.errors import LocalEntryNotFoundError
+
+    try:
+        path = snapshot_download(model_id, revision=revision, cache_dir=cache_dir,
+                                 allow_patterns=ALLOW_PATTERNS, local_files_only=True)
+        return path, "cache"
+    except LocalEntryNotFoundError:
+        pass
+    path = snapshot_download(model_id, revision=revision, cache_dir=cache_dir, allow_patterns=ALLOW_PATTERNS)
+    return path, "download"
+
+
+def load_pretrained(model_id: str, revision: Optional[str] = None, cache_dir: Optional[str] = None,
+                    local_path: Optional[str] = None, dtype: str = "bfloat16",
+                    device_map: Optional[str] = "auto") -> Tuple[Any, Any, Dict[str, Any]]:
+    """(model, tokenizer, report) with per-stage timings in seconds and peak RSS in MB"""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    timings = {}
+    start = stage = time.perf_counter()
+    path, source = resolve_snapshot(model_id, revision, cache_dir, local_path)
+    timings["resolve_s"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    model = AutoModelForCausalLM.from_pretrained(
+        path,
+        dtype=getattr(torch, dtype),
+        device_map=device_map,
+        low_cpu_mem_usage=True,
+        use_safetensors=True,
+    ).eval()
+    timings["weights_s"] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    timings["tokenizer_s"] = time.perf_counter() - stage
+    timings["total_s"] = time.perf_counter() - start
+
+    report = {
+        "source": source,
+        "path": path,
+        "dtype": str(next(model.parameters()).dtype),
+        "devices": sorted({str(p.device) for p in model.parameters()}),
+        **{name: round(seconds, 3) for name, seconds in timings.items()},
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    return model, tokenizer, report
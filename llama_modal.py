@@ -1,72 +1,120 @@
+import os
+
 import modal
 
 MODEL_ID = "NousResearch/Meta-Llama-3.1-70B-Instruct"
 MODEL_REVISION = "d50656ee28e2c2906d317cbbb6fcb55eb4055a84"
 
-image = modal.Image.debian_slim().pip_install("transformers", "torch", "accelerate")
+image = (
+    modal.Image.debian_slim()
+    .pip_install("transformers>=4.56", "torch", "accelerate", "safetensors")
+    .add_local_python_source("llama_engine", "llama_loader")
+)
 app = modal.App("llama-inference", image=image)
 
 GPU_CONFIG = "H100:2"
+MAX_CONCURRENT_INPUTS = 15
+
+# Concurrent generate() calls are merged into batches of up to this size
+MAX_BATCH_SIZE = MAX_CONCURRENT_INPUTS
+MAX_BATCH_WAIT = 0.05  # seconds to wait for more requests before running a partial batch
 
 CACHE_DIR = "/cache"
 cache_vol = modal.Volume.from_name("hf-hub-cache", create_if_missing=True)
 
+# A directory with the model already in it (config.json, tokenizer, safetensors), e.g. on a
+# mounted volume; when set, containers load from it without touching the hub cache
+MODEL_PATH = os.environ.get("LLAMA_MODEL_PATH")
+
 
 @app.cls(
     gpu=GPU_CONFIG,
     volumes={CACHE_DIR: cache_vol},
-    allow_concurrent_inputs=15,
+    allow_concurrent_inputs=MAX_CONCURRENT_INPUTS,
     scaledown_window=60 * 10,
     timeout=60 * 60,
 )
 class Model:
     @modal.enter()
     def setup(self):
-        import torch
-
-        from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
-
-        from huggingface_hub import snapshot_download
+        from llama_engine import GenerationEngine, MicroBatcher
+        from llama_loader import load_pretrained
 
-        # Download the model to the cache directory
-        model_path = snapshot_download(repo_id=MODEL_ID, cache_dir=CACHE_DIR)
-
-        print(f"Model downloaded to: {model_path}")
-
-        # Specify cache directory if needed
-        model = AutoModelForCausalLM.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR)
-        tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, cache_dir=CACHE_DIR)
-
-        self.pipeline = pipeline(
-            "text-generation",
-            model=model,
+        # One read of the pinned snapshot, straight into bf16 spread over the GPUs
+        model, tokenizer, report = load_pretrained(
+            MODEL_ID,
             revision=MODEL_REVISION,
-            tokenizer=tokenizer,
-            model_kwargs={"torch_dtype": torch.bfloat16},
+            cache_dir=CACHE_DIR,
+            local_path=MODEL_PATH,
+            dtype="bfloat16",
             device_map="auto",
         )
+        print(f"Model loaded: {report}")
+        if report["source"] == "download":
+            cache_vol.commit()  # later containers start from the warm cache
+
+        self.engine = GenerationEngine(model, tokenizer, max_new_tokens=256)
+        self.batcher = MicroBatcher(
+            self.engine.generate_batch,
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait=MAX_BATCH_WAIT,
+        )
+        self.prefix_batcher = MicroBatcher(
+            self.engine.generate_prefixed_batch,
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait=MAX_BATCH_WAIT,
+        )
+
+    @modal.exit()
+    def shutdown(self):
+        self.batcher.close()
+        self.prefix_batcher.close()
 
     @modal.method()
     def generate(self, input: str):
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a helpful assistant.",
-            },
-            {"role": "user", "content": input},
-        ]
-
-        outputs = self.pipeline(
-            messages,
-            max_new_tokens=256,
-        )
+        # Queued with other in-flight calls and run as part of a padded batch
+        return self.batcher(input)
+
+    @modal.method()
+    def register_prefix(self, name: str, text: str):
+        """Prefill a shared prompt prefix once; returns its length in tokens"""
+        return self.engine.register_prefix(name, text).num_tokens
+
+    @modal.method()
+    def generate_with_prefix(self, prefix_name: str, input: str, prefix_text: str = None):
+        # Containers scale independently, so callers may pass the prefix text to
+        # register it lazily on a container that has not seen it yet
+        if prefix_text is not None:
+            self.engine.register_prefix(prefix_name, prefix_text)
+        elif prefix_name not in self.engine.prefixes:
+            raise KeyError(f"Unknown prompt prefix '{prefix_name}'")
+        return self.prefix_batcher((prefix_name, input))
+
+    @modal.method(is_generator=True)
+    def generate_stream(self, input: str, prefix_name: str = None, prefix_text: str = None):
+        """Stream completion text as it is generated, stopping once the JSON answer closes"""
+        if prefix_text is not None:
+            self.engine.register_prefix(prefix_name, prefix_text)
+        elif prefix_name is not None and prefix_name not in self.engine.prefixes:
+            raise KeyError(f"Unknown prompt prefix '{prefix_name}'")
+        yield from self.engine.stream(input, prefix_name=prefix_name)
+
+    @modal.method()
+    def generate_batch(self, inputs: list[str]):
+        # Through the batcher, so only its worker thread runs the model; the inputs are
+        # batched with each other and with concurrent generate() calls
+        futures = [self.batcher.submit(input) for input in inputs]
+        return [future.result() for future in futures]
+
+
+@app.function(volumes={CACHE_DIR: cache_vol}, timeout=60 * 60)
+def download_model():
+    """Fill the cache volume once, so GPU containers never download on cold start"""
+    from llama_loader import resolve_snapshot
 
-        # Extract the assistant's response
-        try:
-            return outputs[0]["generated_text"][-1]["content"]
-        except (KeyError, IndexError, TypeError):
-            # Fallback extraction in case the output format is different
-            return str(outputs[0]["generated_text"])
+    path, source = resolve_snapshot(MODEL_ID, revision=MODEL_REVISION, cache_dir=CACHE_DIR)
+    cache_vol.commit()
+    print(f"Model snapshot at {path} ({source})")
 
 
 # For testing and deployment
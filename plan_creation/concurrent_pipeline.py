@@ -0,0 +1,79 @@
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence
+
+
+@dataclass
+class PipelineOptions:
+    """Execution settings for analysing many detections at once"""
+    max_concurrency: int = 1
+    # Seconds per attempt, None waits forever. A timed-out call is abandoned, not interrupted,
+    # so a retry can run alongside it (see run_concurrently)
+    timeout: Optional[float] = None
+    retries: int = 2
+    backoff: float = 0.5  # first retry delay in seconds, doubled on each attempt
+    max_backoff: float = 8.0
+    jitter: float = 0.1
+
+
+async def _run_one(index: int, item: Any, fn: Callable[[Any], Any], semaphore: asyncio.Semaphore,
+                   pool: ThreadPoolExecutor, options: PipelineOptions,
+                   on_failure: Optional[Callable[[Any, Exception], Any]]) -> Any:
+    loop = asyncio.get_running_loop()
+    async with semaphore:
+        attempt = 0
+        while True:
+            try:
+                future = loop.run_in_executor(pool, fn, item)
+                return await asyncio.wait_for(future, options.timeout)
+            except Exception as e:
+                if attempt >= options.retries:
+                    if on_failure is None:
+                        raise
+                    print(f"Detection {index} failed after {attempt + 1} attempts: {e!r}")
+                    return on_failure(item, e)
+                delay = min(options.max_backoff, options.backoff * (2 ** attempt))
+                delay *= 1 + random.uniform(0, options.jitter)
+                attempt += 1
+                print(f"Detection {index} attempt {attempt} failed ({e!r}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+
+async def _run_all(items: Sequence[Any], fn: Callable[[Any], Any], options: PipelineOptions,
+                   on_failure: Optional[Callable[[Any, Exception], Any]]) -> List[Any]:
+    semaphore = asyncio.Semaphore(max(1, options.max_concurrency))
+    # A timed-out attempt keeps its worker thread until the blocking call returns,
+    # so leave room for retries to start instead of queueing behind stragglers.
+    workers = max(1, options.max_concurrency) * (options.retries + 1)
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="threat-analysis")
+    try:
+        tasks = [
+            _run_one(index, item, fn, semaphore, pool, options, on_failure)
+            for index, item in enumerate(items)
+        ]
+        # gather preserves input order regardless of completion order
+        return await asyncio.gather(*tasks)
+    finally:
+        # Don't wait for abandoned attempts: the timeout is what bounds the batch
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_concurrently(items: Sequence[Any], fn: Callable[[Any], Any],
+                     options: Optional[PipelineOptions] = None,
+                     on_failure: Optional[Callable[[Any, Exception], Any]] = None) -> List[Any]:
+    """Apply a blocking function to every item with bounded parallelism, timeouts and retries.
+
+    Results are returned in the same order as ``items``. If ``on_failure`` is given it
+    produces the result for an item whose attempts were all exhausted; otherwise the
+    last exception is raised.
+
+    With a timeout, this returns once every item has a result, even if timed-out
+    calls are still running; they finish in the background and their results are
+    discarded, so up to ``max_concurrency * (retries + 1)`` calls can be in flight.
+    """
+    options = options or PipelineOptions()
+    if not items:
+        return []
+    return asyncio.run(_run_all(list(items), fn, options, on_failure))
@@ -0,0 +1,409 @@
+"""Long-running agent mode: analyse detections as they arrive instead of once per batch.
+
+Each input is read from a checkpointed position:
+
+- NDJSON files (the sonar stream output, the queue spool) resume from a byte
+  offset. A file whose inode changes or that shrinks below the offset was
+  rotated or truncated and is read from the start.
+- JSON files that are rewritten whole (sonar_detections.json, video
+  summaries, mock data) resume from a record count plus a digest of the
+  records already processed, so a file rewritten with new content is
+  processed from the start and an untouched one is never processed twice.
+
+Producers can also push NDJSON lines to a local TCP queue (``--listen``).
+Received lines are appended to a spool file that is read like any other
+NDJSON input, so queued detections survive a restart too.
+
+Whatever is available is analysed in batches of at most ``batch_size``. Each
+response is appended to an NDJSON file and flushed before the checkpoint
+advances, so a crash replays at most the batch in flight (at-least-once).
+Files are polled every ``poll_interval`` seconds; records arriving on the
+queue wake the loop at once. When nothing is waiting, the optional ``idle``
+hook runs (closing idle fused incidents) and any records it returns are
+appended to the responses file too.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import hashlib
+import threading
+import socketserver
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # shared instrumentation.py
+from instrumentation import counter, histogram
+
+Record = Dict[str, Any]
+Converter = Callable[[Record], Record]
+
+# A drained spool larger than this is truncated so it does not grow without bound
+SPOOL_COMPACT_BYTES = 16 * 1024 * 1024
+
+
+def parse_line(line: bytes) -> Optional[Record]:
+    try:
+        record = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def json_records(data: Any) -> List[Any]:
+    """Records in a detections file: a list, {"detections": [...]} or a single record"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and isinstance(data.get("detections"), list):
+        return data["detections"]
+    return [data]
+
+
+class NDJSONSource:
+    """Appended-to file of one JSON record per line, read from a byte offset"""
+
+    kind = "ndjson"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self.skipped = 0
+
+    @property
+    def position(self) -> int:
+        return self.offset
+
+    def state(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "inode": self.inode, "offset": self.offset}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self.inode, self.offset = state.get("inode"), state.get("offset", 0)
+
+    def read(self, limit: int) -> Tuple[List[Record], int]:
+        """Up to ``limit`` new records and the offset just past them; a partial last line waits"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return [], self.offset
+        if (self.inode is not None and stat.st_ino != self.inode) or stat.st_size < self.offset:
+            print(f"Daemon: {self.path.name} was replaced or truncated, reading it from the start")
+            self.offset = 0
+        self.inode = stat.st_ino
+        if stat.st_size == self.offset:
+            return [], self.offset
+
+        records = []
+        position = self.offset
+        with open(self.path, "rb") as f:
+            f.seek(position)
+            while len(records) < limit:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                position += len(line)
+                record = parse_line(line)
+                if record is not None:
+                    records.append(record)
+                elif line.strip():
+                    self.skipped += 1
+                    print(f"Daemon: skipping malformed line in {self.path.name}")
+        return records, position
+
+    def commit(self, position: int) -> None:
+        self.offset = position
+
+
+class JSONFileSource:
+    """JSON file rewritten whole, read from a record count checked against a prefix digest"""
+
+    kind = "json"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.count = 0
+        self.digest = hashlib.sha1().hexdigest()
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._records: List[Any] = []
+        self._hasher = hashlib.sha1()
+
+    @property
+    def position(self) -> int:
+        return self.count
+
+    def state(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "count": self.count, "digest": self.digest}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self.count, self.digest = state.get("count", 0), state.get("digest", self.digest)
+
+    @staticmethod
+    def _encode(record: Any) -> bytes:
+        return json.dumps(record, sort_keys=True).encode("utf-8")
+
+    def _reload(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if signature == self._signature:
+            return True
+        try:
+            with open(self.path, "r") as f:
+                records = json_records(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            return False  # missing or half-written; try again on the next poll
+        self._signature = signature
+        self._records = records
+
+        # Keep the position only if the records already processed are still the file's prefix
+        hasher = hashlib.sha1()
+        for record in records[:self.count]:
+            hasher.update(self._encode(record))
+        if self.count > len(records) or hasher.hexdigest() != self.digest:
+            if self.count:
+                print(f"Daemon: {self.path.name} was rewritten, reading it from the start")
+            self.count = 0
+            hasher = hashlib.sha1()
+            self.digest = hasher.hexdigest()
+        self._hasher = hasher
+        return True
+
+    def read(self, limit: int) -> Tuple[List[Record], int]:
+        if not self._reload():
+            return [], self.count
+        records = [r for r in self._records[self.count:self.count + limit] if isinstance(r, dict)]
+        return records, min(self.count + limit, len(self._records))
+
+    def commit(self, position: int) -> None:
+        for record in self._records[self.count:position]:
+            self._hasher.update(self._encode(record))
+        self.count = position
+        self.digest = self._hasher.hexdigest()
+
+
+def open_input(path: str):
+    """NDJSON source for .ndjson/.jsonl paths, whole-file JSON source otherwise"""
+    return NDJSONSource(path) if Path(path).suffix in (".ndjson", ".jsonl") else JSONFileSource(path)
+
+
+class Checkpoint:
+    """Source positions in a JSON file, replaced atomically on every save"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f).get("sources", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError, AttributeError) as e:
+            print(f"Daemon: ignoring unreadable checkpoint {self.path} ({e})")
+            return {}
+
+    def save(self, sources: List[Any]) -> None:
+        state = {"updated": time.time(), "sources": {str(s.path): s.state() for s in sources}}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+class QueueServer:
+    """Local TCP queue: appends each received JSON line to a spool file and wakes the daemon"""
+
+    def __init__(self, host: str, port: int, spool: str, on_record: Callable[[], None]):
+        self.spool = Path(spool)
+        self.spool.parent.mkdir(parents=True, exist_ok=True)
+        self.on_record = on_record
+        self.received = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+        self._file = open(self.spool, "ab")
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    server.append(line)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self._server.daemon_threads = True
+        self._server.allow_reuse_address = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self.address = self._server.server_address
+        self._thread: Optional[threading.Thread] = None
+
+    def append(self, line: bytes) -> None:
+        if parse_line(line) is None:
+            if line.strip():
+                self.rejected += 1
+            return
+        with self.lock:
+            self._file.write(line if line.endswith(b"\n") else line + b"\n")
+            self._file.flush()
+            self.received += 1
+        self.on_record()
+
+    def compact(self, source: NDJSONSource) -> bool:
+        """Truncate the spool once the daemon has processed everything in it"""
+        with self.lock:
+            if source.offset < SPOOL_COMPACT_BYTES or os.path.getsize(self.spool) != source.offset:
+                return False
+            self._file.truncate(0)
+            source.commit(0)
+            return True
+
+    def start(self) -> "QueueServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="agent-queue", daemon=True)
+        self._thread.start()
+        print(f"Daemon: listening for detections on {self.address[0]}:{self.address[1]}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        with self.lock:
+            self._file.close()
+
+
+class DetectionDaemon:
+    def __init__(self, sources: List[Any], process: Callable[[List[Record]], List[Record]],
+                 checkpoint_path: str, responses_path: str, batch_size: int = 1,
+                 poll_interval: float = 0.5, convert: Optional[Converter] = None,
+                 escalate: Optional[Callable[[], List[Record]]] = None,
+                 idle: Optional[Callable[[], List[Record]]] = None,
+                 listen: Optional[Tuple[str, int]] = None, spool_path: Optional[str] = None):
+        self.sources = list(sources)
+        self.process = process
+        self.escalate = escalate
+        self.idle = idle
+        self.convert = convert
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.responses_path = Path(responses_path)
+        self.queue: Optional[QueueServer] = None
+        self.spool: Optional[NDJSONSource] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        if listen is not None:
+            self.queue = QueueServer(listen[0], listen[1], spool_path, self._wake.set)
+            self.spool = NDJSONSource(spool_path)
+            self.sources.append(self.spool)
+        self.detections = 0
+        self.responses = 0
+        self.batches = 0
+        self._detections_total = counter("daemon_detections_total", "Detections read by the daemon")
+        self._lag = histogram("daemon_detection_lag_seconds", "From reading a detection to writing its response")
+        self._age = histogram("daemon_detection_age_seconds", "From a detection's timestamp to its response")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def collect(self) -> Tuple[List[Record], List[Tuple[Any, int]]]:
+        """Available records across sources, up to batch_size, and the positions they end at"""
+        records: List[Record] = []
+        positions = []
+        for source in self.sources:
+            room = self.batch_size - len(records)
+            if room <= 0:
+                break
+            found, position = source.read(room)
+            if position != source.position:
+                positions.append((source, position))
+            records.extend(found)
+        if self.convert is not None:
+            records = [self.convert(record) for record in records]
+        return records, positions
+
+    def write(self, responses: List[Record]) -> None:
+        with open(self.responses_path, "a") as f:
+            for response in responses:
+                f.write(json.dumps(response) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def step(self) -> int:
+        """Process one batch of available records; returns how many were read"""
+        detections, positions = self.collect()
+        if not positions:
+            return 0
+        read_at = time.time()
+        responses = self.process(detections) if detections else []
+        self.write(responses)
+        for source, position in positions:
+            source.commit(position)
+        self.checkpoint.save(self.sources)
+        if self.queue is not None and self.queue.compact(self.spool):
+            self.checkpoint.save(self.sources)
+
+        done = time.time()
+        for detection in detections:
+            self._lag.observe(done - read_at)
+            timestamp = detection.get("timestamp")
+            if isinstance(timestamp, (int, float)) and timestamp <= done:
+                self._age.observe(done - timestamp)
+        self._detections_total.inc(len(detections))
+        self.detections += len(detections)
+        self.responses += len(responses)
+        self.batches += 1
+        if detections:
+            print(f"Daemon: {len(detections)} detections -> {len(responses)} responses "
+                  f"in {done - read_at:.2f}s")
+        return max(len(detections), 1)
+
+    def run(self, until_idle: bool = False) -> Dict[str, Any]:
+        """Process detections until stopped (SIGINT/SIGTERM), or until no input is left"""
+        self.responses_path.parent.mkdir(parents=True, exist_ok=True)
+        saved = self.checkpoint.load()
+        for source in self.sources:
+            if str(source.path) in saved and saved[str(source.path)].get("kind") == source.kind:
+                source.restore(saved[str(source.path)])
+        if self.queue is not None:
+            self.queue.start()
+
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            # Finish the batch in flight and checkpoint it instead of dying mid-batch
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                handlers[sig] = signal.signal(sig, lambda *_: self.stop())
+        print(f"Daemon: watching {', '.join(s.path.name for s in self.sources)}")
+        try:
+            while not self._stop.is_set():
+                if self.step():
+                    continue
+                if self.escalate is not None:
+                    escalated = self.escalate()
+                    if escalated:
+                        self.write(escalated)  # a later line supersedes the triaged response
+                        continue
+                if self.idle is not None:
+                    closed = self.idle()
+                    if closed:
+                        self.write(closed)
+                if until_idle:
+                    break
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+            if self.queue is not None:
+                self.queue.stop()
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        result = {"detections": self.detections, "responses": self.responses, "batches": self.batches,
+                  "lag_p50_s": round(self._lag.quantile(0.5), 4), "lag_p99_s": round(self._lag.quantile(0.99), 4)}
+        if self.queue is not None:
+            result["queue"] = {"received": self.queue.received, "rejected": self.queue.rejected}
+        return result
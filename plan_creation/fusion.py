@@ -0,0 +1,273 @@
+"""Spatio-temporal fusion of camera, video and sonar detections into incidents.
+
+Records that land within ``distance_m`` of an open incident and within
+``window_s`` seconds of its last update are merged into it. That covers one
+contact seen by several sensors, or in consecutive frames and pings. Only
+the fused incident goes on to triage and the LLM, carrying the combined
+evidence instead of one call per record. An incident is handed on again only
+when its severity or its set of object types changes, so a contact reported
+every second costs one analysis per change, not one per record or batch.
+
+Open incidents are indexed in a lat/lon grid whose cells are at least
+``distance_m`` wide, so a lookup only checks the 3x3 block of cells around a
+record. Expiry pops incidents idle for longer than the window from a heap keyed
+on their last-seen time, so records arriving out of timestamp order expire
+correctly. Both operations cost the same however many contacts are open.
+Incidents close as new records arrive and whenever ``expire`` is called (the
+daemon calls it when idle); ``expire`` returns every incident closed since
+its last call, however it was closed.
+"""
+import sys
+import math
+import time
+import heapq
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # shared detection_records.py
+from detection_records import (METERS_PER_DEGREE, SEVERITY_LEVELS, detection_position, detection_sensor,
+                               detection_time, distance_m)
+
+
+def typed_confidences(detection: Dict[str, Any]) -> List[Tuple[str, Optional[float]]]:
+    """(object type, confidence) for camera objects and the sonar contact"""
+    pairs = [(obj.get("type"), obj.get("confidence")) for obj in detection.get("objects_detected", [])]
+    sonar = detection.get("detection")
+    if isinstance(sonar, dict):
+        pairs.append((sonar.get("type"), sonar.get("confidence")))
+    return [(t, float(c) if isinstance(c, (int, float)) else None) for t, c in pairs if t]
+
+
+@dataclass
+class Incident:
+    incident_id: int
+    first_seen: float
+    last_seen: float
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    weight: float = 0.0
+    records: int = 0
+    updates: int = 0  # times the incident was handed on for analysis
+    analyzed: Optional[Tuple[Optional[str], Tuple[str, ...]]] = None  # signature() when last handed on
+    max_confidence: float = 0.0
+    threat_level: Optional[str] = None
+    sensors: Dict[str, int] = field(default_factory=dict)
+    objects: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # type -> count, max confidence
+    spread_m: float = 0.0  # farthest merged record from the centroid when it was merged
+    evidence: List[Tuple[float, int, Dict[str, Any]]] = field(default_factory=list)  # min-heap on confidence
+    cell: Optional[Tuple[int, int]] = None
+
+    def signature(self) -> Tuple[Optional[str], Tuple[str, ...]]:
+        """What the analysis depends on: severity and the object types seen"""
+        return self.threat_level, tuple(sorted(self.objects))
+
+    def to_detection(self, max_evidence: int) -> Dict[str, Any]:
+        """The fused record sent to triage and the LLM in place of the individual detections"""
+        objects_detected = [{"type": t, **seen} for t, seen in sorted(self.objects.items())]
+        evidence = [item for _, _, item in sorted(self.evidence, key=lambda e: (-e[0], e[1]))[:max_evidence]]
+        record = {
+            "type": "fused_incident",
+            "incident_id": self.incident_id,
+            "timestamp": self.last_seen,
+            "first_seen": self.first_seen,
+            "duration_s": round(self.last_seen - self.first_seen, 3),
+            "detection_count": self.records,
+            "sensors": dict(self.sensors),
+            "objects_detected": objects_detected,
+            "max_confidence": self.max_confidence,
+            "evidence": evidence,
+        }
+        if self.lat is not None:
+            record["location"] = {"coordinates": {"lat": round(self.lat, 6), "lon": round(self.lon, 6)},
+                                  "spread_m": round(self.spread_m, 1)}
+        if self.threat_level is not None:
+            record["threat_level"] = self.threat_level
+        return record
+
+
+class FusionIndex:
+    def __init__(self, distance_m: float = 200.0, window_s: float = 60.0, max_evidence: int = 8):
+        self.distance_m = distance_m
+        self.window_s = window_s
+        self.max_evidence = max_evidence
+        self.cell_deg = distance_m / METERS_PER_DEGREE
+        self.incidents: Dict[int, Incident] = {}
+        # (last_seen, incident id) min-heap; entries superseded by a later update are skipped
+        self._expiry: List[Tuple[float, int]] = []
+        self._closed: List[Incident] = []  # closed since the last expire() call
+        self.cells: Dict[Tuple[int, int], Dict[int, Incident]] = {}
+        self.records_seen = 0
+        self.incidents_created = 0
+        self.incidents_closed = 0
+        self.analyses = 0
+        self._next_id = 1
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        row = math.floor(lat / self.cell_deg)
+        return row, math.floor(lon / self._row_width(row))
+
+    def _row_width(self, row: int) -> float:
+        # Longitude span of a cell in this row, sized at the row's poleward edge so no
+        # cell is narrower than distance_m anywhere in it
+        edge = max(abs(row * self.cell_deg), abs((row + 1) * self.cell_deg))
+        return self.cell_deg / max(math.cos(math.radians(min(edge, 89.9))), 1e-6)
+
+    def _nearby(self, lat: float, lon: float):
+        row = math.floor(lat / self.cell_deg)
+        for r in (row - 1, row, row + 1):
+            column = math.floor(lon / self._row_width(r))
+            for c in (column - 1, column, column + 1):
+                cell = self.cells.get((r, c))
+                if cell:
+                    yield from cell.values()
+
+    def _index(self, incident: Incident) -> None:
+        cell = self._cell(incident.lat, incident.lon)
+        if cell == incident.cell:
+            return
+        self._unindex(incident)
+        self.cells.setdefault(cell, {})[incident.incident_id] = incident
+        incident.cell = cell
+
+    def _unindex(self, incident: Incident) -> None:
+        if incident.cell is None:
+            return
+        members = self.cells.get(incident.cell)
+        if members is not None:
+            members.pop(incident.incident_id, None)
+            if not members:
+                del self.cells[incident.cell]
+        incident.cell = None
+
+    def _expire(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] < now - self.window_s:
+            last_seen, incident_id = heapq.heappop(self._expiry)
+            incident = self.incidents.get(incident_id)
+            if incident is None or incident.last_seen != last_seen:
+                continue
+            del self.incidents[incident_id]
+            self._unindex(incident)
+            self._closed.append(incident)
+            self.incidents_closed += 1
+
+    def expire(self, now: Optional[float] = None) -> List[Incident]:
+        """Close incidents idle for longer than the window; returns every incident closed since
+        the last call, including those closed while adding records"""
+        with self._lock:
+            self._expire(time.time() if now is None else now)
+            closed, self._closed = self._closed, []
+        return closed
+
+    def match(self, lat: float, lon: float, at: float) -> Optional[Incident]:
+        """Nearest open incident within distance_m updated within window_s of ``at``"""
+        best, best_distance = None, self.distance_m
+        for incident in self._nearby(lat, lon):
+            if abs(at - incident.last_seen) > self.window_s:
+                continue
+            d = distance_m(lat, lon, incident.lat, incident.lon)
+            if d <= best_distance:
+                best, best_distance = incident, d
+        return best
+
+    def add(self, detection: Dict[str, Any], now: Optional[float] = None) -> Tuple[Incident, bool]:
+        """Merge a detection into the matching incident or open a new one; returns (incident, created)"""
+        at = detection_time(detection, now)
+        position = detection_position(detection)
+        with self._lock:
+            self.records_seen += 1
+            self._expire(at)
+            incident = self.match(*position, at) if position is not None else None
+            created = incident is None
+            if created:
+                incident = Incident(self._next_id, at, at)
+                self._next_id += 1
+                self.incidents_created += 1
+                self.incidents[incident.incident_id] = incident
+            last_seen = None if created else incident.last_seen
+            self._merge(incident, detection, at, position)
+            if incident.last_seen != last_seen:
+                heapq.heappush(self._expiry, (incident.last_seen, incident.incident_id))
+            if incident.lat is not None:
+                self._index(incident)
+        return incident, created
+
+    def _merge(self, incident: Incident, detection: Dict[str, Any], at: float,
+               position: Optional[Tuple[float, float]]) -> None:
+        sensor = detection_sensor(detection)
+        pairs = typed_confidences(detection)
+        confidence = max((c for _, c in pairs if c is not None), default=0.0)
+        incident.records += 1
+        incident.first_seen = min(incident.first_seen, at)
+        incident.last_seen = max(incident.last_seen, at)
+        incident.max_confidence = max(incident.max_confidence, confidence)
+        incident.sensors[sensor] = incident.sensors.get(sensor, 0) + 1
+        for t, c in pairs:
+            seen = incident.objects.setdefault(t, {"count": 0, "confidence": 0.0})
+            seen["count"] += 1
+            if c is not None:
+                seen["confidence"] = max(seen["confidence"], c)
+        level = detection.get("threat_level")
+        if level in SEVERITY_LEVELS and (incident.threat_level is None or
+                                         SEVERITY_LEVELS.index(level) > SEVERITY_LEVELS.index(incident.threat_level)):
+            incident.threat_level = level
+
+        if position is not None:
+            # Confidence-weighted centroid; a zero-confidence record still counts a little
+            weight = max(confidence, 0.05)
+            if incident.lat is None:
+                incident.lat, incident.lon = position
+            else:
+                total = incident.weight + weight
+                incident.lat += (position[0] - incident.lat) * weight / total
+                incident.lon += (position[1] - incident.lon) * weight / total
+                incident.spread_m = max(incident.spread_m, distance_m(*position, incident.lat, incident.lon))
+            incident.weight += weight
+
+        item = {"sensor": sensor, "time": at, "types": [t for t, _ in pairs], "confidence": confidence}
+        if position is not None:
+            item["lat"], item["lon"] = round(position[0], 6), round(position[1], 6)
+        description = detection.get("raw_description")
+        if description:
+            item["description"] = description[:200]
+        self._seq += 1
+        heapq.heappush(incident.evidence, (confidence, self._seq, item))
+        if len(incident.evidence) > self.max_evidence:
+            heapq.heappop(incident.evidence)
+
+    def fuse(self, detections: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Add a batch and return a fused record for each incident it touched that needs analysis.
+
+        That is a new incident, or one whose severity or object types changed since
+        it was last returned; records that only add evidence are merged and held.
+        Records come back in first-seen order.
+        """
+        touched: "OrderedDict[int, Incident]" = OrderedDict()
+        for detection in detections:
+            incident, _ = self.add(detection, now)
+            touched.setdefault(incident.incident_id, incident)
+        records = []
+        with self._lock:
+            for incident in touched.values():
+                signature = incident.signature()
+                if signature == incident.analyzed:
+                    continue
+                incident.analyzed = signature
+                incident.updates += 1
+                self.analyses += 1
+                records.append(incident.to_detection(self.max_evidence))
+        return records
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "records": self.records_seen,
+            "incidents": self.incidents_created,
+            "open_incidents": len(self.incidents),
+            "closed_incidents": self.incidents_closed,
+            "analyses": self.analyses,
+            "records_per_incident": round(self.records_seen / self.incidents_created, 2) if self.incidents_created else 0.0,
+        }
@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+MODAL_APP_NAME = "llama-inference"
+MODAL_CLASS_NAME = "Model"
+
+
+class LLMError(Exception):
+    """Raised when a backend fails to produce a completion"""
+
+
+@dataclass
+class LLMResult:
+    """A single completion returned by an LLM backend"""
+    text: str
+    latency: float
+    backend: str
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def raise_for_error(self) -> None:
+        if self.error is not None:
+            raise LLMError(f"{self.backend} backend failed: {self.error}")
+
+
+class LLMBackend:
+    """Base class for anything that can turn a prompt into a completion"""
+    name = "base"
+
+    @property
+    def model_id(self) -> str:
+        """Identifies the model behind the backend; cached analyses are keyed on it"""
+        return self.name
+
+    def connect(self) -> None:
+        """Acquire any long-lived resources; called once by the client"""
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def generate_with_prefix(self, prefix_name: str, prefix: str, prompt: str) -> str:
+        """Generate for a prompt that follows a shared, cacheable prefix"""
+        return self.generate(prefix + prompt)
+
+    def stream(self, prompt: str, prefix_name: Optional[str] = None, prefix: str = "") -> Iterator[str]:
+        """Yield the completion in pieces as it is produced; by default as a single piece"""
+        if prefix_name:
+            yield self.generate_with_prefix(prefix_name, prefix, prompt)
+        else:
+            yield self.generate(prompt)
+
+    def close(self) -> None:
+        """Release resources acquired in connect()"""
+
+
+class ModalBackend(LLMBackend):
+    """Calls the deployed `Model` class from llama_modal.py over a single Modal handle"""
+    name = "modal"
+
+    def __init__(self, app_name: str = MODAL_APP_NAME, class_name: str = MODAL_CLASS_NAME):
+        self.app_name = app_name
+        self.class_name = class_name
+        self._model = None
+
+    @property
+    def model_id(self) -> str:
+        # LLAMA_MODEL_ID names the deployed checkpoint when it changes under the same app
+        return os.environ.get("LLAMA_MODEL_ID", f"{self.name}:{self.app_name}/{self.class_name}")
+
+    def connect(self) -> None:
+        import modal
+
+        model_cls = modal.Cls.from_name(self.app_name, self.class_name)
+        self._model = model_cls()
+
+    def generate(self, prompt: str) -> str:
+        return self._model.generate.remote(prompt)
+
+    def generate_with_prefix(self, prefix_name: str, prefix: str, prompt: str) -> str:
+        # The model service keeps the prefix's KV cache and only prefills `prompt`
+        return self._model.generate_with_prefix.remote(prefix_name, prompt, prefix)
+
+    def stream(self, prompt: str, prefix_name: Optional[str] = None, prefix: str = "") -> Iterator[str]:
+        # The model service stops generating once the JSON answer closes
+        yield from self._model.generate_stream.remote_gen(prompt, prefix_name, prefix or None)
+
+    def close(self) -> None:
+        self._model = None
+
+
+class EchoBackend(LLMBackend):
+    """Offline backend that answers every prompt with a fixed, schema-valid response"""
+    name = "echo"
+
+    def __init__(self, latency: float = 0.0, response: Optional[str] = None, chunk_size: int = 8):
+        self.latency = latency
+        self.response = response
+        self.chunk_size = chunk_size
+
+    def generate(self, prompt: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt)
+
+    def stream(self, prompt: str, prefix_name: Optional[str] = None, prefix: str = "") -> Iterator[str]:
+        # Spread the configured latency over the pieces, like tokens arriving from a model
+        text = self._respond(prefix + prompt)
+        pieces = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for piece in pieces:
+            if self.latency:
+                time.sleep(self.latency / len(pieces))
+            yield piece
+
+    def _respond(self, prompt: str) -> str:
+        if self.response is not None:
+            return self.response
+        return json.dumps({
+            "threat_analysis": {
+                "type": "echo",
+                "severity": "low",
+                "confidence": 0.0,
+                "details": f"Echo backend received a {len(prompt)} character prompt"
+            },
+            "agency_actions": {
+                "border_patrol": [],
+                "coast_guard": [],
+                "law_enforcement": [],
+                "emergency_response": []
+            }
+        })
+
+
+class SubprocessBackend(LLMBackend):
+    """Legacy path: start a new interpreter per prompt and scrape its `Response:` line"""
+    name = "subprocess"
+
+    def __init__(self, command: Optional[List[str]] = None):
+        self.command = command or [
+            sys.executable, str(Path(__file__).parent.parent / "llama_modal.py")
+        ]
+
+    def generate(self, prompt: str) -> str:
+        result = subprocess.run(
+            self.command + ["--prompt", prompt],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        for line in result.stdout.strip().split('\n'):
+            if line.startswith("Response:"):
+                return line[len("Response:"):].strip()
+        return ""
+
+
+BACKENDS = {
+    ModalBackend.name: ModalBackend,
+    EchoBackend.name: EchoBackend,
+    SubprocessBackend.name: SubprocessBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """Create a backend by name, defaulting to the LLAMA_BACKEND environment variable"""
+    name = name or os.environ.get("LLAMA_BACKEND", ModalBackend.name)
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown LLM backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+
+
+class LlamaClient:
+    """Long-lived client that connects to its backend once and reuses it for every prompt"""
+
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        self.backend = backend or create_backend()
+        self._connected = False
+        self._lock = threading.Lock()
+
+    def connect(self) -> None:
+        with self._lock:
+            if not self._connected:
+                self.backend.connect()
+                self._connected = True
+
+    def generate(self, prompt: str, prefix_name: Optional[str] = None, prefix: str = "") -> LLMResult:
+        """Run a prompt through the backend, returning errors as part of the result.
+
+        When ``prefix_name`` is given, ``prefix`` is sent as a named shared prefix
+        that backends can cache instead of re-encoding it on every call.
+        """
+        start = time.perf_counter()
+        try:
+            self.connect()
+            if prefix_name:
+                text = self.backend.generate_with_prefix(prefix_name, prefix, prompt)
+            else:
+                text = self.backend.generate(prompt)
+        except Exception as e:
+            return LLMResult(text="", latency=time.perf_counter() - start,
+                             backend=self.backend.name, error=str(e))
+        return LLMResult(text=text, latency=time.perf_counter() - start, backend=self.backend.name)
+
+    def stream(self, prompt: str, prefix_name: Optional[str] = None, prefix: str = "") -> Iterator[str]:
+        """Yield completion text as the backend produces it; errors are raised to the caller"""
+        self.connect()
+        yield from self.backend.stream(prompt, prefix_name, prefix)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connected:
+                self.backend.close()
+                self._connected = False
+
+    def __enter__(self) -> "LlamaClient":
+        self.connect()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_default_client: Optional[LlamaClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> LlamaClient:
+    """Return the process-wide client, creating it on first use"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = LlamaClient()
+        return _default_client
+
+
+def set_client(client: Optional[LlamaClient]) -> None:
+    """Replace the process-wide client, closing the previous one"""
+    global _default_client
+    with _default_lock:
+        if _default_client is not None and _default_client is not client:
+            _default_client.close()
+        _default_client = client
+
+
+if __name__ == "__main__":
+    # Mirrors the `Response:` output of llama_modal.py so the subprocess path can be benchmarked offline
+    parser = argparse.ArgumentParser(description='Send a single prompt through an LLM backend')
+    parser.add_argument('--prompt', required=True)
+    parser.add_argument('--backend', default=None, choices=list(BACKENDS))
+    args = parser.parse_args()
+
+    result = LlamaClient(create_backend(args.backend)).generate(args.prompt)
+    if not result.ok:
+        print(f"Error: {result.error}")
+        sys.exit(1)
+    print("Response:", result.text)
@@ -0,0 +1,166 @@
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Fields that carry no signal for the model (bookkeeping, file paths, duplicate clocks)
+DROP_FIELDS = {
+    "processing_timestamp",
+    "input_path",
+    "output_path",
+    "raw_description_html",
+}
+
+# Dropped only when the full encoding does not fit the budget, in this order
+OPTIONAL_FIELDS = [
+    "bbox",
+    "environment_conditions.camera_id",
+    "video_metadata",
+    "metadata",
+]
+
+# Numeric lists at least this long are summarised instead of listed
+SIGNATURE_MIN_LENGTH = 16
+SIGNATURE_BANDS = 6
+MAX_LIST_ITEMS = 12
+MAX_STRING_CHARS = 240
+
+# Coordinates keep 5 decimals (~1 m); other floats are cut to 3 significant digits
+COORDINATE_KEYS = {"lat", "lon", "latitude", "longitude"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Llama-style token count: ~4 characters per token, digits and punctuation cost more"""
+    if not text:
+        return 0
+    symbols = sum(1 for c in text if not c.isalpha() and not c.isspace())
+    return math.ceil((len(text) - symbols) / 4 + symbols / 1.5)
+
+
+def tokenizer_counter(tokenizer) -> Callable[[str], int]:
+    """Exact token counter backed by a Hugging Face tokenizer"""
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def summarize_signature(values: Sequence[float], bands: int = SIGNATURE_BANDS) -> Dict[str, Any]:
+    """Reduce a raw sonar signature to summary statistics and per-band energies"""
+    n = len(values)
+    mean = sum(values) / n
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / n)
+    peak = max(range(n), key=lambda i: values[i])
+    band_size = math.ceil(n / bands)
+    energies = [
+        sum(v * v for v in values[i:i + band_size]) for i in range(0, n, band_size)
+    ]
+    return {
+        "n": n,
+        "mean": mean,
+        "std": std,
+        "max": values[peak],
+        "peak_bin": peak,
+        "band_energy": energies,
+    }
+
+
+def _format_number(value: float, key: str = "") -> str:
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, int):
+        return str(value)
+    if value == 0 or not math.isfinite(value):
+        return str(value)
+    if key in COORDINATE_KEYS:
+        return f"{value:.5f}".rstrip("0").rstrip(".")
+    return f"{value:.3g}"
+
+
+def _format_scalar(value: Any, key: str = "") -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (int, float)):
+        return _format_number(value, key)
+    text = str(value).replace("\n", " ")
+    if len(text) > MAX_STRING_CHARS:
+        text = text[:MAX_STRING_CHARS - 3] + "..."
+    return text
+
+
+def _is_numeric_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(
+        isinstance(v, (int, float)) and not isinstance(v, bool) for v in value
+    )
+
+
+def _flatten(value: Any, path: str, drop: set, lines: List[Tuple[str, str]]) -> None:
+    key = path.rsplit(".", 1)[-1]
+    if key in drop or path in drop:
+        return
+
+    if isinstance(value, dict):
+        for child_key, child in value.items():
+            _flatten(child, f"{path}.{child_key}" if path else str(child_key), drop, lines)
+    elif _is_numeric_list(value) and len(value) >= SIGNATURE_MIN_LENGTH:
+        summary = summarize_signature(value)
+        summary["band_energy"] = "/".join(_format_number(e) for e in summary["band_energy"])
+        lines.append((f"{path}_summary", " ".join(f"{k}:{_format_scalar(v)}" for k, v in summary.items())))
+    elif _is_numeric_list(value):
+        lines.append((path, ",".join(_format_number(v) for v in value)))
+    elif isinstance(value, list):
+        for index, item in enumerate(value[:MAX_LIST_ITEMS]):
+            _flatten(item, f"{path}[{index}]", drop, lines)
+        if len(value) > MAX_LIST_ITEMS:
+            lines.append((f"{path}.omitted", str(len(value) - MAX_LIST_ITEMS)))
+    elif key == "timestamp" and isinstance(value, (int, float)):
+        lines.append((path, time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(value))))
+    else:
+        lines.append((path, _format_scalar(value, key)))
+
+
+def compact_encode(detection: Dict[str, Any], drop: Optional[set] = None) -> str:
+    """Serialise a detection as one `dotted.key=value` line per leaf"""
+    lines: List[Tuple[str, str]] = []
+    _flatten(detection, "", DROP_FIELDS | (drop or set()), lines)
+    return "\n".join(f"{key}={value}" for key, value in lines)
+
+
+@dataclass
+class EncodedDetection:
+    """A detection rendered for the prompt along with its token accounting"""
+    text: str
+    tokens_before: int
+    tokens_after: int
+    dropped: List[str]
+    truncated: bool = False
+
+
+class DetectionEncoder:
+    """Encodes detections for LLM prompts within a per-prompt token budget"""
+
+    def __init__(self, token_budget: int = 256, counter: Optional[Callable[[str], int]] = None):
+        self.token_budget = token_budget
+        self.count = counter or estimate_tokens
+
+    def encode(self, detection: Dict[str, Any]) -> EncodedDetection:
+        tokens_before = self.count(json.dumps(detection, indent=2))
+
+        dropped: List[str] = []
+        text = compact_encode(detection)
+        for field in OPTIONAL_FIELDS:
+            if self.count(text) <= self.token_budget:
+                break
+            dropped.append(field)
+            text = compact_encode(detection, set(dropped))
+
+        truncated = False
+        if self.count(text) > self.token_budget:
+            # Keep whole lines from the top; identity and location come first in every detection
+            kept: List[str] = []
+            for line in text.split("\n"):
+                if self.count("\n".join(kept + [line])) > self.token_budget:
+                    break
+                kept.append(line)
+            text = "\n".join(kept)
+            truncated = True
+
+        return EncodedDetection(text, tokens_before, self.count(text), dropped, truncated)
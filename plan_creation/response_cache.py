@@ -0,0 +1,181 @@
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from prompt_encoding import COORDINATE_KEYS
+
+# Fields that change on every report of the same sighting
+VOLATILE_FIELDS = {"timestamp", "processing_timestamp"}
+CONFIDENCE_KEYS = {"confidence"}
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+    coalesced: int = 0  # requests that waited on an identical in-flight call
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _canonicalize(value: Any, key: str, coord_decimals: Optional[int], confidence_step: Optional[float]) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: _canonicalize(v, k, coord_decimals, confidence_step)
+            for k, v in value.items() if k not in VOLATILE_FIELDS
+        }
+    if isinstance(value, list):
+        return [_canonicalize(v, key, coord_decimals, confidence_step) for v in value]
+    if isinstance(value, float):
+        if key in COORDINATE_KEYS and coord_decimals is not None:
+            return round(value, coord_decimals)
+        if key in CONFIDENCE_KEYS and confidence_step:
+            return round(round(value / confidence_step) * confidence_step, 6)
+    return value
+
+
+def detection_key(detection: Dict[str, Any], coord_decimals: Optional[int] = None,
+                  confidence_step: Optional[float] = None, version: str = "") -> str:
+    """Content hash of a detection with volatile fields removed and optional quantization.
+
+    ``version`` names whatever else shapes the analysis (prompt, encoding,
+    model), so analyses made under a different one are not reused.
+    """
+    canonical = _canonicalize(detection, "", coord_decimals, confidence_step)
+    encoded = json.dumps([version, canonical], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM analyses keyed on canonicalized detections.
+
+    With ``path`` set, entries are also written to a SQLite file so they
+    survive restarts; memory misses fall back to it. Callers get their own
+    copy of an analysis, so changing a response never changes the cache.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600.0, path: Optional[str] = None,
+                 coord_decimals: Optional[int] = None, confidence_step: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.coord_decimals = coord_decimals
+        self.confidence_step = confidence_step
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, stored_at REAL, analysis TEXT)"
+            )
+            self._db.commit()
+
+    def key(self, detection: Dict[str, Any], version: str = "") -> str:
+        return detection_key(detection, self.coord_decimals, self.confidence_step, version)
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.ttl is None or time.time() - stored_at < self.ttl
+
+    def _remember(self, key: str, stored_at: float, analysis: Dict[str, Any]) -> None:
+        self._entries[key] = (stored_at, analysis)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry[0]):
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return copy.deepcopy(entry[1])
+                del self._entries[key]
+                self.stats.expired += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT stored_at, analysis FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._fresh(row[0]):
+                    analysis = json.loads(row[1])
+                    self._remember(key, row[0], analysis)
+                    self.stats.hits += 1
+                    self.stats.disk_hits += 1
+                    return copy.deepcopy(analysis)
+
+            self.stats.misses += 1
+            return None
+
+    def put(self, key: str, analysis: Dict[str, Any]) -> None:
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, stored_at, copy.deepcopy(analysis))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, stored_at, analysis) VALUES (?, ?, ?)",
+                    (key, stored_at, json.dumps(analysis))
+                )
+                self._db.commit()
+
+    def get_or_compute(self, detection: Dict[str, Any],
+                       compute: Callable[[], Dict[str, Any]],
+                       cacheable: Callable[[Dict[str, Any]], bool] = lambda analysis: True,
+                       version: str = "") -> Dict[str, Any]:
+        """Return the cached analysis for a detection, or compute and store it.
+
+        Concurrent calls for the same key wait for the first one instead of
+        issuing duplicate LLM requests.
+        """
+        key = self.key(detection, version)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                owner = True
+            else:
+                self.stats.coalesced += 1
+                owner = False
+        if not owner:
+            return copy.deepcopy(pending.result())
+
+        try:
+            analysis = compute()
+            if cacheable(analysis):
+                self.put(key, analysis)
+            pending.set_result(copy.deepcopy(analysis))
+            return analysis
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def summary(self) -> Dict[str, Any]:
+        return {**asdict(self.stats), "hit_rate": self.stats.hit_rate, "entries": len(self._entries)}
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,133 @@
+import json
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+WHITESPACE = " \t\r\n"
+SCALAR_END = ",}]" + WHITESPACE
+
+# (dotted path, value); array elements use their index as the path segment
+FieldEvent = Tuple[str, Any]
+
+
+class _Frame:
+    __slots__ = ("container", "key", "expect_key")
+
+    def __init__(self, container):
+        self.container = container
+        self.key = None  # current key while inside an object
+        self.expect_key = isinstance(container, dict)
+
+
+class IncrementalJSONParser:
+    """Parses a JSON object from text chunks, reporting each field as soon as it is complete.
+
+    Text before the first ``{`` (e.g. "Here is the analysis:") is skipped and
+    everything after the top-level object closes is ignored. ``feed`` returns
+    the fields completed by that chunk: every scalar at its own path, and every
+    object or array once it closes.
+    """
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None):
+        self.on_field = on_field
+        self.result: Optional[dict] = None
+        self.done = False
+        self.consumed = 0  # characters fed before the object closed
+        self._stack: List[_Frame] = []
+        self._token: Optional[List[str]] = None  # raw characters of the current string/scalar
+        self._in_string = False
+        self._escape = False
+        self._events: List[FieldEvent] = []
+
+    def _emit(self, path: str, value: Any) -> None:
+        self._events.append((path, value))
+        if self.on_field is not None:
+            self.on_field(path, value)
+
+    @staticmethod
+    def _key(frame: _Frame):
+        return len(frame.container) if isinstance(frame.container, list) else frame.key
+
+    def _add_value(self, value: Any) -> None:
+        """Attach a completed value to the innermost open container and report it"""
+        path = ".".join(str(self._key(frame)) for frame in self._stack)
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+            frame.key = None
+        else:
+            frame.container.append(value)
+        self._emit(path, value)
+
+    def _close(self) -> None:
+        frame = self._stack.pop()
+        if not self._stack:
+            self.result = frame.container
+            self.done = True
+            return
+        self._add_value(frame.container)
+
+    def _finish_scalar(self) -> None:
+        raw = "".join(self._token)
+        self._token = None
+        self._add_value(json.loads(raw))
+
+    def feed(self, chunk: str) -> List[FieldEvent]:
+        self._events = []
+        for char in chunk:
+            if self.done:
+                break
+            self.consumed += 1
+
+            if self._in_string:
+                self._token.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    text = json.loads("".join(self._token))
+                    self._token = None
+                    frame = self._stack[-1]
+                    if frame.expect_key:
+                        frame.key = text
+                        frame.expect_key = False
+                    else:
+                        self._add_value(text)
+                continue
+
+            if self._token is not None:
+                if char not in SCALAR_END:
+                    self._token.append(char)
+                    continue
+                self._finish_scalar()
+
+            if not self._stack:
+                if char == "{":
+                    self._stack.append(_Frame({}))
+                continue
+
+            if char in WHITESPACE or char == ":":
+                continue
+            if char == ",":
+                if isinstance(self._stack[-1].container, dict):
+                    self._stack[-1].expect_key = True
+            elif char == '"':
+                self._in_string = True
+                self._token = [char]
+            elif char == "{":
+                self._stack.append(_Frame({}))
+            elif char == "[":
+                self._stack.append(_Frame([]))
+            elif char in "}]":
+                self._close()
+            else:
+                self._token = [char]
+        return self._events
+
+    def feed_all(self, chunks: Iterable[str]) -> Optional[dict]:
+        """Consume chunks until the top-level object closes, returning it"""
+        for chunk in chunks:
+            self.feed(chunk)
+            if self.done:
+                break
+        return self.result
@@ -1,65 +1,203 @@
 import json
 import os
+import sys
 import time
 import argparse
+import threading
+from contextlib import closing
 from dotenv import load_dotenv
-from typing import Dict, List, Any
-import subprocess
+from typing import Callable, Dict, List, Any, Optional
 from pathlib import Path
 
-def call_llama_model(prompt: str) -> str:
-    """Call the Llama model using the main function from llama_modal.py"""
+from llm_client import LlamaClient, create_backend, get_client, set_client, BACKENDS
+from concurrent_pipeline import PipelineOptions, run_concurrently
+from prompt_encoding import DetectionEncoder, EncodedDetection, estimate_tokens
+from response_cache import ResponseCache
+from triage import Triage, SEVERITY_LEVELS
+from fusion import FusionIndex
+from stream_parser import IncrementalJSONParser
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # shared instrumentation.py, response_store.py
+from instrumentation import MetricsReporter, SamplingProfiler, counter, timed
+from response_store import ResponseStore
+
+# Compact, token-budgeted encoding of the detection data (opt in with set_prompt_token_budget);
+# None sends the raw JSON, so the LLM sees every field unless a budget is chosen
+detection_encoder: Optional[DetectionEncoder] = None
+
+# Analyses of previously seen detections; None sends every detection to the LLM
+response_cache: Optional[ResponseCache] = None
+
+# Persistent, queryable record of detections and responses; None keeps only the JSON output
+response_store: Optional[ResponseStore] = None
+
+# Rule-based routing of low-severity detections; None sends everything to the LLM
+triage: Optional[Triage] = None
+
+# Merges detections of the same contact into incidents; None analyses every record
+fusion: Optional[FusionIndex] = None
+
+# Stream completions and raise alerts as soon as the severity field is generated
+stream_responses = False
+
+# Directory for per-detection sampling profiles; None disables profiling
+profile_dir: Optional[str] = None
+
+def call_llama_model(prompt: str, client: Optional[LlamaClient] = None, raise_errors: bool = False,
+                     prefix_name: Optional[str] = None, prefix: str = "") -> str:
+    """Call the Llama model through the shared long-lived client"""
     print(f"Calling Llama model with prompt...")
-    try:
-        # Call the main function from llama_modal.py with the prompt
-        result = subprocess.run(
-            ["python", str(Path(__file__).parent.parent / "llama_modal.py"), "--prompt", prompt],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        
-        # Extract the response from the output
-        output_lines = result.stdout.strip().split('\n')
-        response_line = ""
-        for line in output_lines:
-            if line.startswith("Response:"):
-                response_line = line[len("Response:"):].strip()
-                break
-        
-        print(f"Received response from Llama model")
-        return response_line
-    except subprocess.CalledProcessError as e:
-        print(f"Error calling Llama model: {e}")
-        print(f"Stdout: {e.stdout}")
-        print(f"Stderr: {e.stderr}")
-        return f"Error: {e}"
+    with timed("llama_call"):
+        result = (client or get_client()).generate(prompt, prefix_name=prefix_name, prefix=prefix)
+    if raise_errors:
+        result.raise_for_error()
+    if not result.ok:
+        counter("llm_errors_total", "Failed LLM calls").inc()
+        print(f"Error calling Llama model: {result.error}")
+        return f"Error: {result.error}"
 
-def format_threat_prompt(detection_data: Dict[str, Any]) -> str:
-    """Format detection data into a prompt for the Llama model"""
-    prompt = f"""You are a naval defense threat analysis system. Format your response as JSON with the following structure:
-{{
-    "threat_analysis": {{
+    print(f"Received response from Llama model ({result.backend}, {result.latency:.2f}s)")
+    return result.text
+
+# Shared instructions and schema; identical for every detection so the model
+# service can cache its KV state under THREAT_PROMPT_PREFIX_NAME
+THREAT_PROMPT_PREFIX_NAME = "threat_analysis_v1"
+THREAT_PROMPT_PREFIX = """You are a naval defense threat analysis system. Format your response as JSON with the following structure:
+{
+    "threat_analysis": {
         "type": "string",
         "severity": "low|medium|high",
         "confidence": "float between 0-1",
         "details": "string"
-    }},
-    "agency_actions": {{
+    },
+    "agency_actions": {
         "border_patrol": ["action1", "action2"],
         "coast_guard": ["action1", "action2"],
         "law_enforcement": ["action1", "action2"],
         "emergency_response": ["action1", "action2"]
-    }}
-}}
+    }
+}
+
+"""
+
+def set_prompt_token_budget(budget: Optional[int]) -> None:
+    """Change the per-prompt detection token budget; None or 0 disables compact encoding"""
+    global detection_encoder
+    detection_encoder = DetectionEncoder(budget) if budget else None
+
+def analysis_version(client: Optional[LlamaClient] = None) -> str:
+    """Prompt, encoding and model an analysis depends on; part of every cache key"""
+    budget = detection_encoder.token_budget if detection_encoder is not None else None
+    model = (client or get_client()).backend.model_id
+    return f"{THREAT_PROMPT_PREFIX_NAME}|budget={budget}|model={model}"
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """Install the cache consulted before every LLM call, closing the previous one"""
+    global response_cache
+    if response_cache is not None and response_cache is not cache:
+        response_cache.close()
+    response_cache = cache
+
+def set_response_store(store: Optional[ResponseStore]) -> None:
+    """Append every detection and threat response to this store, closing the previous one"""
+    global response_store
+    if response_store is not None and response_store is not store:
+        response_store.close()
+    response_store = store
+
+def set_triage(new_triage: Optional[Triage]) -> None:
+    """Install the triage stage used by process_detections"""
+    global triage
+    triage = new_triage
 
-DETECTION DATA:
-{json.dumps(detection_data, indent=2)}
+def set_fusion(index: Optional[FusionIndex]) -> None:
+    """Install the fusion stage that runs before triage in process_detections"""
+    global fusion
+    fusion = index
+
+def encode_detection(detection_data: Dict[str, Any]) -> EncodedDetection:
+    """Render detection data for the prompt with the configured encoder"""
+    if detection_encoder is None:
+        text = json.dumps(detection_data, indent=2)
+        tokens = estimate_tokens(text)
+        return EncodedDetection(text, tokens, tokens, [])
+    return detection_encoder.encode(detection_data)
+
+def format_detection_section(detection_data: Dict[str, Any], encoded: Optional[EncodedDetection] = None) -> str:
+    """Format the detection-specific part of the prompt that follows THREAT_PROMPT_PREFIX"""
+    encoded = encoded or encode_detection(detection_data)
+    return f"""DETECTION DATA:
+{encoded.text}
 
 Based on this information, analyze the threat and propose immediate actions for each agency."""
+
+def raise_alert(detection_data: Dict[str, Any], severity: str, elapsed: float) -> None:
+    """Report a threat's severity as soon as the model has produced it"""
+    print(f"ALERT: {severity} severity {detection_data.get('type', 'detection')} after {elapsed:.2f}s")
+
+# Called with (detection, severity, seconds since the LLM call started)
+alert_handler: Callable[[Dict[str, Any], str, float], None] = raise_alert
+
+def set_profiling(directory: Optional[str]) -> None:
+    """Write a sampling profile of every analysed detection to ``directory`` (None disables it)"""
+    global profile_dir
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    profile_dir = directory or None
+
+def set_streaming(enabled: bool, handler: Optional[Callable[[Dict[str, Any], str, float], None]] = None) -> None:
+    """Switch streamed analysis on or off, optionally replacing the alert handler"""
+    global stream_responses, alert_handler
+    stream_responses = enabled
+    if handler is not None:
+        alert_handler = handler
+
+def stream_llama_model(prompt: str, on_severity: Callable[[str, float], None],
+                       client: Optional[LlamaClient] = None, raise_errors: bool = False,
+                       prefix_name: Optional[str] = None, prefix: str = "") -> str:
+    """Stream a completion, reporting threat_analysis.severity as soon as it is complete"""
+    print(f"Streaming Llama model response...")
+    parser = IncrementalJSONParser()
+    chunks = []
+    with timed("llama_call") as timer:
+        try:
+            # Closed explicitly on every exit, so a remote generator stops generating
+            # now rather than whenever it is garbage collected
+            with closing((client or get_client()).stream(prompt, prefix_name=prefix_name, prefix=prefix)) as stream:
+                for chunk in stream:
+                    chunks.append(chunk)
+                    if parser is None:
+                        continue
+                    try:
+                        events = parser.feed(chunk)
+                    except json.JSONDecodeError:
+                        # Not well-formed JSON; collect the rest and let parse_llm_response recover
+                        parser = None
+                        continue
+                    for path, value in events:
+                        if path == "threat_analysis.severity":
+                            on_severity(value, time.perf_counter() - timer.start)
+                    if parser.done:
+                        break
+        except Exception as e:
+            counter("llm_errors_total", "Failed LLM calls").inc()
+            if raise_errors:
+                raise
+            print(f"Error streaming from Llama model: {e}")
+            return f"Error: {e}"
+
+    print(f"Received streamed response from Llama model ({time.perf_counter() - timer.start:.2f}s)")
+    if parser is not None and parser.done:
+        return json.dumps(parser.result)
+    return "".join(chunks)
+
+def format_threat_prompt(detection_data: Dict[str, Any]) -> str:
+    """Format detection data into a prompt for the Llama model"""
+    prompt = THREAT_PROMPT_PREFIX + format_detection_section(detection_data)
     
     return prompt
 
+@timed("json_parse")
 def parse_llm_response(response: str) -> Dict[str, Any]:
     """Parse the response from the Llama model"""
     try:
@@ -78,34 +216,26 @@ def parse_llm_response(response: str) -> Dict[str, Any]:
                 print("Failed to extract valid JSON")
         
         # Return a structured error response
-        return {
-            "threat_analysis": {
-                "type": "error",
-                "severity": "unknown",
-                "confidence": 0,
-                "details": "Failed to parse response"
-            },
-            "agency_actions": {}
-        }
+        return error_analysis("Failed to parse response")
 
-def process_threat_detection(detection_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Process a detection and generate a threat response"""
-    print("\nAnalyzing threat...")
-    
-    # Format the prompt
-    prompt = format_threat_prompt(detection_data)
-    
-    # Call the Llama model
-    response = call_llama_model(prompt)
-    
-    # Parse the response
-    analysis = parse_llm_response(response)
-    
+def error_analysis(details: str) -> Dict[str, Any]:
+    """Build the analysis used when no usable model response is available"""
+    return {
+        "threat_analysis": {
+            "type": "error",
+            "severity": "unknown",
+            "confidence": 0,
+            "details": details
+        },
+        "agency_actions": {}
+    }
+
+def build_threat_response(detection_data: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine a detection with its analysis into the threat_responses.json record"""
     # Extract threat level
     threat_level = analysis.get("threat_analysis", {}).get("severity", "low")
     
-    # Format the response
-    result = {
+    return {
         "threat_level": threat_level,
         "detection": {
             "type": detection_data.get("type", "Unknown"),
@@ -114,12 +244,172 @@ def process_threat_detection(detection_data: Dict[str, Any]) -> Dict[str, Any]:
         },
         "analysis": analysis
     }
+
+def process_threat_detection(detection_data: Dict[str, Any], client: Optional[LlamaClient] = None,
+                             raise_errors: bool = False) -> Dict[str, Any]:
+    """Process a detection and generate a threat response"""
+    print("\nAnalyzing threat...")
+    
+    def analyze() -> Dict[str, Any]:
+        # Format the detection-specific part of the prompt
+        with timed("prompt_build"):
+            encoded = encode_detection(detection_data)
+            prompt = format_detection_section(detection_data, encoded)
+        print(f"Detection data: {encoded.tokens_before} -> {encoded.tokens_after} prompt tokens")
+        
+        # Call the Llama model, reusing the cached instructions prefix
+        if stream_responses:
+            response = stream_llama_model(
+                prompt, lambda severity, elapsed: alert_handler(detection_data, severity, elapsed),
+                client, raise_errors=raise_errors,
+                prefix_name=THREAT_PROMPT_PREFIX_NAME, prefix=THREAT_PROMPT_PREFIX
+            )
+        else:
+            response = call_llama_model(prompt, client, raise_errors=raise_errors,
+                                        prefix_name=THREAT_PROMPT_PREFIX_NAME, prefix=THREAT_PROMPT_PREFIX)
+        
+        # Parse the response
+        return parse_llm_response(response)
+    
+    profiler = None
+    if profile_dir is not None:
+        profiler = SamplingProfiler(thread_ids=[threading.get_ident()]).start()
+    try:
+        with timed("detection_total"):
+            if response_cache is not None:
+                # Failed or unparseable responses are retried next time rather than cached
+                analysis = response_cache.get_or_compute(
+                    detection_data, analyze,
+                    cacheable=lambda a: a.get("threat_analysis", {}).get("type") != "error",
+                    version=analysis_version(client)
+                )
+            else:
+                analysis = analyze()
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            path = os.path.join(profile_dir, f"detection_{time.time_ns()}_{threading.get_ident()}.folded")
+            profiler.write(path)
+            print(f"Wrote profile to {path}")
+    
+    # Format the response
+    result = build_threat_response(detection_data, analysis)
     
     print("\nThreat Response Summary:")
     print(json.dumps(result, indent=2))
     return result
 
-def poll_detection_service(mock_mode: bool) -> List[Dict[str, Any]]:
+def analyze_detections(detections: List[Dict[str, Any]],
+                       options: Optional[PipelineOptions] = None) -> List[Dict[str, Any]]:
+    """Send detections to the LLM with bounded parallelism, keeping the input order"""
+    options = options or PipelineOptions()
+    if options.max_concurrency > 1:
+        print(f"Processing {len(detections)} detections with concurrency {options.max_concurrency}")
+
+    def on_failure(detection: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return build_threat_response(detection, error_analysis(f"LLM call failed: {error!r}"))
+
+    return run_concurrently(
+        detections,
+        lambda detection: process_threat_detection(detection, raise_errors=True),
+        options,
+        on_failure=on_failure
+    )
+
+def process_detections(detections: List[Dict[str, Any]],
+                       options: Optional[PipelineOptions] = None) -> List[Dict[str, Any]]:
+    """Process many detections, answering low-severity ones from rules when triage is enabled"""
+    if response_store is not None:
+        response_store.add_detections(detections)
+    if fusion is not None:
+        # Only new or changed incidents are analysed, each carrying its merged evidence
+        count = len(detections)
+        detections = fusion.fuse(detections)
+        print(f"Fusion: {count} detections, {len(detections)} new or changed incidents to analyse")
+    if triage is None:
+        results = analyze_detections(detections, options)
+    else:
+        results = triage_detections(detections, options)
+    if response_store is not None:
+        record_responses(results, detections)
+    return results
+
+def record_responses(responses: List[Dict[str, Any]], detections: List[Dict[str, Any]]) -> None:
+    """Store responses, each replacing the earlier row named by its record_id, and stamp their new ids"""
+    supersedes = [response.get("record_id") for response in responses]
+    ids = response_store.add_responses(responses, detections, supersedes=supersedes)
+    for response, record_id in zip(responses, ids):
+        response["record_id"] = record_id
+
+def triage_detections(detections: List[Dict[str, Any]],
+                      options: Optional[PipelineOptions] = None) -> List[Dict[str, Any]]:
+    """Answer detections below the triage threshold from rules and send the rest to the LLM"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(detections)
+    llm_indices = []
+    for index, detection in enumerate(detections):
+        decision = triage.decide(detection)
+        if decision.use_llm:
+            llm_indices.append(index)
+            continue
+        result = build_threat_response(detection, triage.templated_analysis(detection, decision))
+        result["triage"] = {"level": decision.level, "method": "rules", "reason": decision.reason}
+        triage.queue_escalation(detection, result)
+        results[index] = result
+
+    print(f"Triage: {len(llm_indices)} of {len(detections)} detections sent to the LLM")
+    analyzed = analyze_detections([detections[i] for i in llm_indices], options)
+    for index, result in zip(llm_indices, analyzed):
+        results[index] = result
+    return results
+
+def process_escalations(options: Optional[PipelineOptions] = None) -> List[Dict[str, Any]]:
+    """Re-analyse triaged-out detections with the LLM, updating their responses in place"""
+    if triage is None:
+        return []
+    pending = triage.pending_escalations()
+    if not pending:
+        return []
+
+    print(f"Escalating {len(pending)} triaged detections to the LLM...")
+    analyzed = analyze_detections([detection for detection, _ in pending], options)
+    for (_, response), result in zip(pending, analyzed):
+        response.update(result)
+        response["triage"]["method"] = "escalated"
+    escalated = [response for _, response in pending]
+    if response_store is not None:
+        # Each escalated response supersedes its rules row, so queries return one answer per detection
+        record_responses(escalated, [detection for detection, _ in pending])
+    return escalated
+
+def video_detection(video_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Video surveillance detection from a video summary, without a pre-defined threat assessment"""
+    unique_objects = video_data["unique_objects"]
+    return {
+        "type": "video_surveillance",
+        "timestamp": time.time(),
+        "location": {
+            "type": "border_zone",
+            "coordinates": {"lat": 25.8371, "lon": -97.4023},
+            "area": "Southern Border Maritime Zone"
+        },
+        "detections": {
+            "persons": unique_objects.get("person", 0),
+            "vehicles": {
+                "land": {
+                    "trucks": unique_objects.get("truck", 0),
+                    "cars": unique_objects.get("car", 0)
+                },
+                "water": {
+                    "boats": unique_objects.get("boat", 0)
+                }
+            },
+            "other": {k: v for k, v in unique_objects.items()
+                      if k not in ["person", "truck", "car", "boat"]}
+        },
+        "video_metadata": video_data["video_info"]
+    }
+
+def poll_detection_service(mock_mode: bool, options: Optional[PipelineOptions] = None) -> List[Dict[str, Any]]:
     """Poll for new threat detections"""
     if mock_mode:
         print("Running in mock mode. Loading data from mock_detections.json")
@@ -130,13 +420,8 @@ def poll_detection_service(mock_mode: bool) -> List[Dict[str, Any]]:
             print("Error: mock_detections.json not found")
             return []
         
-        responses = []
-        for detection in detections:
-            print(f"Processing detection: {detection.get('type', 'Unknown')}")
-            response = process_threat_detection(detection)
-            responses.append(response)
-            
-        return responses
+        print(f"Processing {len(detections)} mock detections")
+        return process_detections(detections, options)
     else:
         # Try to load video detection data
         try:
@@ -145,37 +430,11 @@ def poll_detection_service(mock_mode: bool) -> List[Dict[str, Any]]:
             
             with open(video_file, "r") as f:
                 video_data = json.load(f)
-                unique_objects = video_data["unique_objects"]
-                print(f"Found video data with objects: {unique_objects}")
+                print(f"Found video data with objects: {video_data['unique_objects']}")
                 
-                # Create video surveillance detection without pre-defined threat assessment
-                detection = {
-                    "type": "video_surveillance",
-                    "timestamp": time.time(),
-                    "location": {
-                        "type": "border_zone",
-                        "coordinates": {"lat": 25.8371, "lon": -97.4023},
-                        "area": "Southern Border Maritime Zone"
-                    },
-                    "detections": {
-                        "persons": unique_objects.get("person", 0),
-                        "vehicles": {
-                            "land": {
-                                "trucks": unique_objects.get("truck", 0),
-                                "cars": unique_objects.get("car", 0)
-                            },
-                            "water": {
-                                "boats": unique_objects.get("boat", 0)
-                            }
-                        },
-                        "other": {k: v for k, v in unique_objects.items() 
-                                if k not in ["person", "truck", "car", "boat"]}
-                    },
-                    "video_metadata": video_data["video_info"]
-                }
+                detection = video_detection(video_data)
                 print("Processing video surveillance data...")
-                response = process_threat_detection(detection)
-                return [response]
+                return process_detections([detection], options)
                 
         except FileNotFoundError as e:
             print(f"Error: Video detection file not found - {e}")
@@ -190,13 +449,8 @@ def poll_detection_service(mock_mode: bool) -> List[Dict[str, Any]]:
                 sonar_data = json.load(f)
                 detections = sonar_data.get("detections", [])
                 
-                responses = []
-                for detection in detections:
-                    print(f"Processing sonar detection...")
-                    response = process_threat_detection(detection)
-                    responses.append(response)
-                
-                return responses
+                print(f"Processing {len(detections)} sonar detections...")
+                return process_detections(detections, options)
                 
         except FileNotFoundError as e:
             print(f"Error: Sonar detection file not found - {e}")
@@ -206,13 +460,117 @@ def poll_detection_service(mock_mode: bool) -> List[Dict[str, Any]]:
         print("No detection data found.")
         return []
 
-def main(mock_mode: bool = False):
-    """Main function to run the threat response agent"""
+PLAN_DIR = Path(__file__).resolve().parent
+VIDEO_DETECTIONS_PATH = PLAN_DIR / "YouTube Video Qpfrs2kNbAE 720x1280_detections.json"
+DAEMON_CHECKPOINT_PATH = PLAN_DIR / "daemon_checkpoint.json"
+DAEMON_SPOOL_PATH = PLAN_DIR / "daemon_spool.ndjson"
+DAEMON_RESPONSES_PATH = PLAN_DIR / "threat_responses.ndjson"
+RESPONSE_STORE_PATH = PLAN_DIR / "threat_store.db"
+
+def daemon_inputs(mock_mode: bool) -> List[str]:
+    """Files the daemon watches by default: the same inputs poll_detection_service reads"""
+    if mock_mode:
+        return [str(PLAN_DIR / "mock_detections.json")]
+    return [str(VIDEO_DETECTIONS_PATH), str(PLAN_DIR / "sonar_detections.json"),
+            str(PLAN_DIR / "sonar_detections.ndjson")]
+
+def as_detection(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Daemon inputs are detections, except video summaries, which are converted"""
+    return video_detection(record) if "unique_objects" in record else record
+
+def close_incidents(now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Expire idle fused incidents; returns a closing record for each incident closed since the last call"""
+    if fusion is None:
+        return []
+    closed_at = time.time() if now is None else now
+    records = [{**incident.to_detection(fusion.max_evidence), "type": "incident_closed", "closed_at": closed_at}
+               for incident in fusion.expire(now)]
+    if records:
+        counter("incidents_closed_total", "Fused incidents closed after their window").inc(len(records))
+        print(f"Fusion: closed incidents {', '.join(str(r['incident_id']) for r in records)}")
+    return records
+
+def run_daemon(watch: List[str], options: Optional[PipelineOptions] = None,
+               listen: Optional[str] = None, checkpoint_path: str = str(DAEMON_CHECKPOINT_PATH),
+               responses_path: str = str(DAEMON_RESPONSES_PATH), spool_path: str = str(DAEMON_SPOOL_PATH),
+               batch_size: Optional[int] = None, poll_interval: float = 0.5) -> Dict[str, Any]:
+    """Analyse detections as they arrive on the watched files and queue socket, until stopped"""
+    from daemon import DetectionDaemon, open_input
+
+    options = options or PipelineOptions()
+    address = None
+    if listen:
+        host, port = listen.rsplit(":", 1)
+        address = (host, int(port))
+    daemon = DetectionDaemon(
+        [open_input(path) for path in watch],
+        lambda detections: process_detections(detections, options),
+        checkpoint_path=checkpoint_path,
+        responses_path=responses_path,
+        batch_size=batch_size or options.max_concurrency,
+        poll_interval=poll_interval,
+        convert=as_detection,
+        escalate=(lambda: process_escalations(options)) if triage is not None and triage.escalate else None,
+        idle=close_incidents if fusion is not None else None,
+        listen=address,
+        spool_path=spool_path
+    )
+    print(f"Appending threat responses to {responses_path}")
+    return daemon.run()
+
+def main(mock_mode: bool = False, llm_backend: Optional[str] = None,
+         options: Optional[PipelineOptions] = None,
+         prompt_token_budget: Optional[int] = None,
+         cache: Optional[ResponseCache] = None, triage_stage: Optional[Triage] = None,
+         stream: bool = False, metrics_interval: float = 30.0, metrics_path: Optional[str] = None,
+         profile: Optional[str] = None, fusion_index: Optional[FusionIndex] = None,
+         daemon: Optional[Dict[str, Any]] = None, store: Optional[ResponseStore] = None):
+    """Main function to run the threat response agent; ``daemon`` holds run_daemon arguments"""
+    if llm_backend:
+        set_client(LlamaClient(create_backend(llm_backend)))
+    set_prompt_token_budget(prompt_token_budget)
+    set_response_cache(cache)
+    set_triage(triage_stage)
+    set_streaming(stream)
+    set_profiling(profile)
+    set_fusion(fusion_index)
+    set_response_store(store)
+    reporter = MetricsReporter(metrics_interval, path=metrics_path).start()
+
+    if daemon is not None:
+        print("Starting Threat Response Agent in daemon mode...")
+        summary = run_daemon(options=options, **daemon)
+        print(f"Daemon: {summary}")
+        if triage is not None:
+            print(f"Triage: {triage.summary()}")
+        if response_cache is not None:
+            print(f"Response cache: {response_cache.summary()}")
+        if fusion is not None:
+            print(f"Fusion: {fusion.summary()}")
+        if response_store is not None:
+            print(f"Response store: {response_store.summary()}")
+        set_response_store(None)
+        reporter.stop()
+        return
+
     print("Starting Threat Response Agent...")
     print("Polling for new detections...")
     
     # Poll for detections
-    responses = poll_detection_service(mock_mode)
+    start = time.perf_counter()
+    responses = poll_detection_service(mock_mode, options)
+    print(f"Processed {len(responses)} detections in {time.perf_counter() - start:.2f}s")
+    if triage is not None:
+        process_escalations(options)
+        print(f"Triage: {triage.summary()}")
+    if response_cache is not None:
+        print(f"Response cache: {response_cache.summary()}")
+    if fusion is not None:
+        print(f"Fusion: {fusion.summary()}")
+    if response_store is not None:
+        print(f"Response store: {response_store.summary()}")
+    set_response_store(None)
+    reporter.stop()
     
     if not responses:
         print("No detections found.")
@@ -229,6 +587,105 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description='Run the threat response agent')
     parser.add_argument('--mock', action='store_true', help='Run with mock data')
+    parser.add_argument('--llm-backend', choices=list(BACKENDS), default=None,
+                        help='LLM backend to use (defaults to $LLAMA_BACKEND, then modal)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Maximum number of detections analysed at once')
+    parser.add_argument('--timeout', type=float, default=None, help='Per-call LLM timeout in seconds')
+    parser.add_argument('--retries', type=int, default=2, help='Retries per detection after a failed call')
+    parser.add_argument('--backoff', type=float, default=0.5, help='Initial retry delay in seconds')
+    parser.add_argument('--prompt-token-budget', type=int, default=None,
+                        help='Encode detection data compactly within this many tokens per prompt, e.g. 256 '
+                             '(default: send the raw JSON)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream LLM output and alert as soon as the severity is generated')
+    parser.add_argument('--triage', action='store_true',
+                        help='Answer detections below --triage-threshold from rules instead of the LLM')
+    parser.add_argument('--triage-threshold', choices=SEVERITY_LEVELS, default='medium',
+                        help='Lowest rated severity that is still sent to the LLM')
+    parser.add_argument('--triage-min-confidence', type=float, default=0.5,
+                        help='Detections with any confidence below this always go to the LLM')
+    parser.add_argument('--escalate', action='store_true',
+                        help='After the batch, send triaged detections to the LLM to refine their responses')
+    parser.add_argument('--metrics-interval', type=float, default=30.0,
+                        help='Seconds between stage timing summaries (0 prints only the final one)')
+    parser.add_argument('--metrics-file', default=None, help='Also write each timing summary to this JSON file')
+    parser.add_argument('--profile-dir', default=None,
+                        help='Write a sampling profile (folded stacks) of each analysed detection here')
+    parser.add_argument('--fuse', action='store_true',
+                        help='Merge detections of the same contact into one incident before analysis')
+    parser.add_argument('--fuse-distance', type=float, default=200.0,
+                        help='Meters within which detections belong to the same incident')
+    parser.add_argument('--fuse-window', type=float, default=60.0,
+                        help='Seconds an incident stays open after its last detection')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and analyse each detection as it arrives, appending responses as NDJSON')
+    parser.add_argument('--watch', action='append', default=None,
+                        help='Detection file the daemon follows; repeatable (default: the inputs of a normal run)')
+    parser.add_argument('--listen', default=None,
+                        help='host:port of a local queue socket producers push NDJSON detections to')
+    parser.add_argument('--spool', default=str(DAEMON_SPOOL_PATH),
+                        help='NDJSON file queued detections are kept in until the daemon has processed them')
+    parser.add_argument('--checkpoint', default=str(DAEMON_CHECKPOINT_PATH),
+                        help='File recording how far the daemon has read each input')
+    parser.add_argument('--responses', default=str(DAEMON_RESPONSES_PATH),
+                        help='NDJSON file the daemon appends threat responses to')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='Most detections the daemon analyses together (default: --concurrency)')
+    parser.add_argument('--poll-interval', type=float, default=0.5,
+                        help='Seconds between checks of the watched files')
+    parser.add_argument('--store', default=str(RESPONSE_STORE_PATH),
+                        help='SQLite file every detection and response is appended to, queried by the API')
+    parser.add_argument('--no-store', action='store_true', help='Only write the JSON/NDJSON output files')
+    parser.add_argument('--cache', action='store_true', help='Reuse analyses of repeated detections')
+    parser.add_argument('--cache-size', type=int, default=1024, help='Maximum cached analyses in memory')
+    parser.add_argument('--cache-ttl', type=float, default=3600.0, help='Seconds a cached analysis stays valid')
+    parser.add_argument('--cache-path', default=None, help='SQLite file that keeps the cache across restarts')
+    parser.add_argument('--cache-coord-decimals', type=int, default=None,
+                        help='Round coordinates to this many decimals when matching detections')
+    parser.add_argument('--cache-confidence-step', type=float, default=None,
+                        help='Quantize confidences to this step when matching detections')
     args = parser.parse_args()
     
-    main(mock_mode=args.mock)
\ No newline at end of file
+    options = PipelineOptions(
+        max_concurrency=args.concurrency,
+        timeout=args.timeout,
+        retries=args.retries,
+        backoff=args.backoff
+    )
+    cache = None
+    if args.cache or args.cache_path:
+        cache = ResponseCache(
+            max_entries=args.cache_size,
+            ttl=args.cache_ttl,
+            path=args.cache_path,
+            coord_decimals=args.cache_coord_decimals,
+            confidence_step=args.cache_confidence_step
+        )
+    fusion_index = None
+    if args.fuse:
+        fusion_index = FusionIndex(distance_m=args.fuse_distance, window_s=args.fuse_window)
+    triage_stage = None
+    if args.triage:
+        triage_stage = Triage(
+            threshold=args.triage_threshold,
+            min_confidence=args.triage_min_confidence,
+            escalate=args.escalate
+        )
+    store = None if args.no_store else ResponseStore(args.store)
+    daemon = None
+    if args.daemon:
+        daemon = {
+            "watch": args.watch or daemon_inputs(args.mock),
+            "listen": args.listen,
+            "spool_path": args.spool,
+            "checkpoint_path": args.checkpoint,
+            "responses_path": args.responses,
+            "batch_size": args.batch_size,
+            "poll_interval": args.poll_interval
+        }
+    main(mock_mode=args.mock, llm_backend=args.llm_backend, options=options,
+         prompt_token_budget=args.prompt_token_budget, cache=cache, triage_stage=triage_stage,
+         stream=args.stream, metrics_interval=args.metrics_interval, metrics_path=args.metrics_file,
+         profile=args.profile_dir, fusion_index=fusion_index, daemon=daemon,
+         store=store)
\ No newline at end of file
@@ -0,0 +1,151 @@
+import sys
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # shared detection_records.py
+from detection_records import HIGH_THREAT_OBJECTS, MEDIUM_THREAT_OBJECTS, SEVERITY_LEVELS
+
+# Sonar contacts rated high on top of the detection service's camera classes
+SONAR_HIGH_THREAT_OBJECTS = {"mine"}
+
+# Agency actions used instead of an LLM call for detections below the triage threshold
+RESPONSE_TEMPLATES = {
+    "none": {
+        "border_patrol": [],
+        "coast_guard": [],
+        "law_enforcement": [],
+        "emergency_response": []
+    },
+    "low": {
+        "border_patrol": ["Log sighting and continue routine patrol"],
+        "coast_guard": ["Monitor contact on next scheduled sweep"],
+        "law_enforcement": [],
+        "emergency_response": []
+    },
+    "medium": {
+        "border_patrol": ["Dispatch patrol unit to verify contact"],
+        "coast_guard": ["Increase surveillance of the sector"],
+        "law_enforcement": ["Notify local units of possible activity"],
+        "emergency_response": ["Place responders on standby"]
+    },
+}
+
+
+@dataclass
+class TriageDecision:
+    level: Optional[str]  # None when the detection cannot be rated by rules
+    use_llm: bool
+    reason: str
+
+
+@dataclass
+class TriageStats:
+    total: int = 0
+    sent_to_llm: int = 0
+    templated: int = 0
+    escalated: int = 0
+
+    @property
+    def llm_calls_avoided(self) -> int:
+        return self.templated - self.escalated
+
+
+def _object_types(detection: Dict[str, Any]) -> List[str]:
+    types = [obj.get("type") for obj in detection.get("objects_detected", [])]
+    sonar = detection.get("detection")
+    if isinstance(sonar, dict) and sonar.get("type"):
+        types.append(sonar["type"])
+    return [t for t in types if t]
+
+
+def _confidences(detection: Dict[str, Any]) -> List[float]:
+    values = [obj.get("confidence") for obj in detection.get("objects_detected", [])]
+    sonar = detection.get("detection")
+    if isinstance(sonar, dict):
+        values.append(sonar.get("confidence"))
+    return [float(v) for v in values if isinstance(v, (int, float))]
+
+
+def rate_detection(detection: Dict[str, Any]) -> Optional[str]:
+    """Cheap deterministic none/low/medium/high rating, or None if the record can't be rated"""
+    level = detection.get("threat_level")
+    if level in SEVERITY_LEVELS:
+        return level
+
+    types = _object_types(detection)
+    if "objects_detected" not in detection and not types:
+        return None
+    if any(t in HIGH_THREAT_OBJECTS or t in SONAR_HIGH_THREAT_OBJECTS for t in types):
+        return "high"
+    if any(t in MEDIUM_THREAT_OBJECTS for t in types):
+        return "medium"
+    return "low" if types else "none"
+
+
+class Triage:
+    """Routes detections either to the LLM or to templated rule-based responses"""
+
+    def __init__(self, threshold: str = "medium", min_confidence: float = 0.5, escalate: bool = False):
+        if threshold not in SEVERITY_LEVELS:
+            raise ValueError(f"Unknown triage threshold '{threshold}'")
+        self.threshold = threshold
+        self.min_confidence = min_confidence
+        self.escalate = escalate
+        self.stats = TriageStats()
+        self._escalations: Deque[Tuple[Dict[str, Any], Dict[str, Any]]] = deque()
+        self._lock = threading.Lock()
+
+    def decide(self, detection: Dict[str, Any]) -> TriageDecision:
+        level = rate_detection(detection)
+        confidences = _confidences(detection)
+
+        if level is None:
+            decision = TriageDecision(None, True, "no rule-based rating")
+        elif SEVERITY_LEVELS.index(level) >= SEVERITY_LEVELS.index(self.threshold):
+            decision = TriageDecision(level, True, f"rated {level}")
+        elif confidences and min(confidences) < self.min_confidence:
+            decision = TriageDecision(level, True, f"low confidence {min(confidences):.2f}")
+        else:
+            decision = TriageDecision(level, False, f"rated {level}, below {self.threshold}")
+
+        with self._lock:
+            self.stats.total += 1
+            if decision.use_llm:
+                self.stats.sent_to_llm += 1
+            else:
+                self.stats.templated += 1
+        return decision
+
+    def templated_analysis(self, detection: Dict[str, Any], decision: TriageDecision) -> Dict[str, Any]:
+        types = sorted(set(_object_types(detection))) or ["nothing"]
+        confidences = _confidences(detection)
+        return {
+            "threat_analysis": {
+                "type": ", ".join(types),
+                "severity": decision.level,
+                "confidence": max(confidences) if confidences else 0,
+                "details": f"Rule-based triage: {decision.reason}"
+            },
+            "agency_actions": {
+                agency: list(actions) for agency, actions in RESPONSE_TEMPLATES[decision.level].items()
+            }
+        }
+
+    def queue_escalation(self, detection: Dict[str, Any], response: Dict[str, Any]) -> None:
+        """Remember a templated response so the LLM can refine it later"""
+        if self.escalate:
+            with self._lock:
+                self._escalations.append((detection, response))
+
+    def pending_escalations(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        with self._lock:
+            pending = list(self._escalations)
+            self._escalations.clear()
+            self.stats.escalated += len(pending)
+        return pending
+
+    def summary(self) -> Dict[str, Any]:
+        return {**asdict(self.stats), "llm_calls_avoided": self.stats.llm_calls_avoided}
@@ -0,0 +1,305 @@
+"""Persistent store of threat responses and raw detections, in SQLite with WAL.
+
+Writes append one row per record, plus its index entries, in one
+transaction per batch. Nothing is rewritten, so a write costs the same
+however much is stored. Both tables are indexed on timestamp, severity,
+sensor and type. Positions also go into an R*Tree, so "near X" is a
+bounding-box lookup rather than a scan, refined with the exact distance.
+
+Reads are newest first and page with a (timestamp, id) cursor instead of
+OFFSET, so page 1000 is as fast as page 1. WAL lets the read API query
+while the agent writes, from any number of processes.
+
+A record can supersede an earlier one, as an escalated LLM analysis does
+the rules response for the same detection. The new row keeps the old id in
+``supersedes`` and the old row is marked ``superseded_by``. Queries return
+only current rows unless asked for the history.
+"""
+import math
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from detection_records import (METERS_PER_DEGREE, SEVERITY_LEVELS, detection_position, detection_sensor,
+                               detection_time, distance_m)
+
+TABLES = ("responses", "detections")
+MAX_PAGE_SIZE = 500
+NEAR_WINDOW_S = 3600.0  # first time window searched by location queries without a time bound
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    stored_at REAL NOT NULL,
+    severity TEXT,
+    severity_rank INTEGER,
+    sensor TEXT,
+    type TEXT,
+    lat REAL,
+    lon REAL,
+    data TEXT NOT NULL,
+    supersedes INTEGER,
+    superseded_by INTEGER
+);
+CREATE INDEX IF NOT EXISTS {table}_timestamp ON {table} (timestamp);
+CREATE INDEX IF NOT EXISTS {table}_severity ON {table} (severity_rank, timestamp);
+CREATE INDEX IF NOT EXISTS {table}_sensor ON {table} (sensor, timestamp);
+CREATE INDEX IF NOT EXISTS {table}_type ON {table} (type, timestamp);
+"""
+# Time and severity are R*Tree dimensions too, so "high in the last hour near X" is one box lookup.
+# R*Tree stores 32-bit floats rounded outward, so it can only over-match; the exact row filters follow.
+_RTREE = ("CREATE VIRTUAL TABLE IF NOT EXISTS {table}_geo USING rtree("
+          "id, min_lat, max_lat, min_lon, max_lon, min_t, max_t, min_rank, max_rank)")
+_LAT_INDEX = "CREATE INDEX IF NOT EXISTS {table}_lat ON {table} (lat, lon)"
+_COLUMNS = "id, timestamp, severity, sensor, type, lat, lon, data, supersedes, superseded_by"
+
+
+def severity_rank(severity: Optional[str]) -> Optional[int]:
+    return SEVERITY_LEVELS.index(severity) if severity in SEVERITY_LEVELS else None
+
+
+def parse_cursor(cursor: str) -> Tuple[float, int]:
+    """'<timestamp>:<id>' of the last item on the previous page"""
+    try:
+        timestamp, row_id = cursor.rsplit(":", 1)
+        return float(timestamp), int(row_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor {cursor!r}")
+
+
+class ResponseStore:
+    """Append-only SQLite store (superseded rows are only marked); one writer, one reader per thread"""
+
+    def __init__(self, path: str, synchronous: str = "NORMAL"):
+        self.path = path
+        self.synchronous = synchronous
+        self.spatial = "rtree"
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        # Every thread's reader, so close() can close connections opened by other threads
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._generation = 0  # bumped by close(); readers from before it are reopened
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are opened lazily, so a store created before a fork is safe to use after it
+        db = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(f"PRAGMA synchronous={self.synchronous}")
+        db.create_function("distance_m", 4, distance_m, deterministic=True)
+        with db:
+            for table in TABLES:
+                db.executescript(_SCHEMA.format(table=table))
+                # Stores created before supersession was recorded
+                columns = {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+                for column in ("supersedes", "superseded_by"):
+                    if column not in columns:
+                        db.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+                try:
+                    db.execute(_RTREE.format(table=table))
+                except sqlite3.OperationalError:
+                    # SQLite built without R*Tree: bounding boxes use a plain (lat, lon) index
+                    self.spatial = "index"
+                    db.execute(_LAT_INDEX.format(table=table))
+        return db
+
+    @property
+    def writer(self) -> sqlite3.Connection:
+        if self._writer is None:
+            self._writer = self._connect()
+        return self._writer
+
+    @property
+    def reader(self) -> sqlite3.Connection:
+        generation, db = getattr(self._local, "reader", (None, None))
+        if db is None or generation != self._generation:
+            db = self._connect()
+            with self._readers_lock:
+                self._readers.append(db)
+                self._local.reader = (self._generation, db)
+        return db
+
+    def _insert(self, table: str, rows: List[Tuple], supersedes: Optional[Sequence[Optional[int]]] = None) -> List[int]:
+        stored_at = time.time()
+        supersedes = supersedes if supersedes is not None else [None] * len(rows)
+        ids = []
+        with self._write_lock, self.writer as db:
+            for row, old_id in zip(rows, supersedes):
+                cursor = db.execute(
+                    f"INSERT INTO {table} (timestamp, stored_at, severity, severity_rank, sensor, type, lat, lon, data,"
+                    " supersedes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (row[0], stored_at) + row[1:] + (old_id,)
+                )
+                ids.append(cursor.lastrowid)
+                if old_id is not None:
+                    db.execute(f"UPDATE {table} SET superseded_by = ? WHERE id = ?", (cursor.lastrowid, old_id))
+            if self.spatial == "rtree":
+                boxes = []
+                for i, (timestamp, _, rank, _, _, lat, lon, _) in zip(ids, rows):
+                    if lat is not None:
+                        rank = -1 if rank is None else rank
+                        boxes.append((i, lat, lat, lon, lon, timestamp, timestamp, rank, rank))
+                db.executemany(f"INSERT INTO {table}_geo VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", boxes)
+        return ids
+
+    def add_detections(self, detections: Sequence[Dict[str, Any]]) -> List[int]:
+        """Store raw detections as received; returns their ids"""
+        rows = []
+        for detection in detections:
+            lat, lon = detection_position(detection) or (None, None)
+            level = detection.get("threat_level")
+            rows.append((detection_time(detection), level, severity_rank(level), detection_sensor(detection),
+                         detection.get("type"), lat, lon, json.dumps(detection, default=str)))
+        return self._insert("detections", rows)
+
+    def add_responses(self, responses: Sequence[Dict[str, Any]],
+                      detections: Optional[Sequence[Dict[str, Any]]] = None,
+                      supersedes: Optional[Sequence[Optional[int]]] = None) -> List[int]:
+        """Store threat responses; returns their ids.
+
+        ``detections`` (the analysed records, in the same order) give the sensor.
+        ``supersedes`` gives, per response, the id of an earlier response it
+        replaces, or None.
+        """
+        rows = []
+        for index, response in enumerate(responses):
+            summary = response.get("detection") or {}
+            source = detections[index] if detections is not None else summary
+            lat, lon = detection_position(summary) or detection_position(source) or (None, None)
+            level = response.get("threat_level")
+            rows.append((detection_time(summary), level, severity_rank(level), detection_sensor(source),
+                         summary.get("type"), lat, lon, json.dumps(response, default=str)))
+        return self._insert("responses", rows, supersedes)
+
+    def query(self, table: str = "responses", severity: Optional[str] = None,
+              min_severity: Optional[str] = None, sensor: Optional[str] = None, type: Optional[str] = None,
+              since: Optional[float] = None, until: Optional[float] = None,
+              near: Optional[Tuple[float, float, float]] = None, cursor: Optional[str] = None,
+              limit: int = 50, include_superseded: bool = False) -> Dict[str, Any]:
+        """Newest-first page of records matching every given filter.
+
+        ``near`` is (lat, lon, radius in meters). Pass the returned
+        ``next_cursor`` back to get the following page; it is None on the last.
+        Superseded records are left out unless ``include_superseded`` is set.
+        """
+        if table not in TABLES:
+            raise ValueError(f"Unknown table {table!r}")
+        for level in (severity, min_severity):
+            if level is not None and level not in SEVERITY_LEVELS:
+                raise ValueError(f"Unknown severity {level!r}, expected one of {SEVERITY_LEVELS}")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = parse_cursor(cursor) if cursor is not None else None
+        filters = dict(severity=severity, min_severity=min_severity, sensor=sensor, type=type, near=near,
+                       include_superseded=include_superseded)
+
+        if near is not None and self.spatial == "rtree":
+            rows = self._select_near(table, filters, since, until, after, limit + 1)
+        else:
+            rows = self._select(table, filters, since, until, after, limit + 1)
+        items = [self._item(row) for row in rows[:limit]]
+        next_cursor = f"{items[-1]['timestamp']!r}:{items[-1]['id']}" if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def _select_near(self, table: str, filters: Dict[str, Any], since: Optional[float], until: Optional[float],
+                     after: Optional[Tuple[float, int]], limit: int) -> List[Tuple]:
+        # Sorting every match in the area by time would grow with the area's history, so search
+        # time windows back from the newest possible match, widening them until a page is filled
+        db = self.reader
+        newest = after[0] if after else until
+        if newest is None:
+            newest = db.execute(f"SELECT max(timestamp) FROM {table}").fetchone()[0]
+        oldest = since if since is not None else db.execute(f"SELECT min(timestamp) FROM {table}").fetchone()[0]
+        if newest is None or oldest is None:
+            return []
+        window = NEAR_WINDOW_S
+        while newest - window > oldest:
+            rows = self._select(table, filters, newest - window, until, after, limit)
+            if len(rows) >= limit:
+                return rows
+            window *= 8
+        return self._select(table, filters, since, until, after, limit)
+
+    def _select(self, table: str, filters: Dict[str, Any], since: Optional[float], until: Optional[float],
+                after: Optional[Tuple[float, int]], limit: int) -> List[Tuple]:
+        severity, min_severity = filters["severity"], filters["min_severity"]
+        where = [] if filters["include_superseded"] else ["superseded_by IS NULL"]
+        params = []
+        for level, op in ((severity, "="), (min_severity, ">=")):
+            if level is not None:
+                where.append(f"severity_rank {op} ?")
+                params.append(SEVERITY_LEVELS.index(level))
+        for column in ("sensor", "type"):
+            if filters[column] is not None:
+                where.append(f"{column} = ?")
+                params.append(filters[column])
+        if since is not None:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("timestamp < ?")
+            params.append(until)
+        if after is not None:
+            where.append("(timestamp, id) < (?, ?)")
+            params.extend(after)
+        if filters["near"] is not None:
+            lat, lon, radius = filters["near"]
+            dlat = radius / METERS_PER_DEGREE
+            dlon = dlat / max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6)
+            box = (lat - dlat, lat + dlat, lon - dlon, lon + dlon)
+            if self.spatial == "rtree":
+                box_where = ["min_lat >= ?", "max_lat <= ?", "min_lon >= ?", "max_lon <= ?"]
+                box_params = list(box)
+                ranks = [SEVERITY_LEVELS.index(level) for level in (severity, min_severity) if level is not None]
+                bounds = [t for t in (until, after[0] if after else None) if t is not None]
+                for condition, value in (("max_t >= ?", since), ("min_t <= ?", min(bounds, default=None)),
+                                         ("max_rank >= ?", max(ranks, default=None)),
+                                         ("min_rank <= ?", SEVERITY_LEVELS.index(severity) if severity else None)):
+                    if value is not None:
+                        box_where.append(condition)
+                        box_params.append(value)
+                where.append(f"id IN (SELECT id FROM {table}_geo WHERE {' AND '.join(box_where)})")
+                params.extend(box_params)
+            else:
+                where.append("lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?")
+                params.extend(box)
+            where.append("distance_m(lat, lon, ?, ?) <= ?")
+            params.extend((lat, lon, radius))
+
+        sql = (f"SELECT {_COLUMNS} FROM {table}"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY timestamp DESC, id DESC LIMIT ?")
+        return self.reader.execute(sql, params + [limit]).fetchall()
+
+    def get(self, table: str, record_id: int) -> Optional[Dict[str, Any]]:
+        if table not in TABLES:
+            raise ValueError(f"Unknown table {table!r}")
+        row = self.reader.execute(
+            f"SELECT {_COLUMNS} FROM {table} WHERE id = ?", (record_id,)
+        ).fetchone()
+        return self._item(row) if row is not None else None
+
+    @staticmethod
+    def _item(row: Tuple) -> Dict[str, Any]:
+        record_id, timestamp, severity, sensor, kind, lat, lon, data, supersedes, superseded_by = row
+        return {"id": record_id, "timestamp": timestamp, "severity": severity, "sensor": sensor, "type": kind,
+                "lat": lat, "lon": lon, "supersedes": supersedes, "superseded_by": superseded_by,
+                "record": json.loads(data)}
+
+    def summary(self) -> Dict[str, Any]:
+        db = self.reader
+        return {table: db.execute(f"SELECT count(*) FROM {table}").fetchone()[0] for table in TABLES}
+
+    def close(self) -> None:
+        """Close the writer and the readers of every thread; the store reopens them on next use"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            for db in self._readers:
+                db.close()
+            self._readers.clear()
+            self._generation += 1
@@ -0,0 +1,144 @@
+"""Compact binary storage for sonar pings.
+
+A ``.ping`` file is a 64-byte header followed by a contiguous row-major
+float32 matrix (one row of 60 features per ping). Labels live in a
+``.labels`` sidecar of one uint8 per ping (0 rock, 1 mine, 255 unknown) and
+free-form metadata in a ``.meta.json`` sidecar. Readers memory-map the matrix
+and hand out NumPy views, so opening an archive costs neither parse time nor
+resident memory until rows are touched.
+"""
+import os
+import json
+import time
+import struct
+import argparse
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"PING"
+VERSION = 1
+HEADER_SIZE = 64
+HEADER_FORMAT = "<4sIQI"  # magic, version, rows, cols
+FEATURE_DTYPE = np.float32
+LABEL_CODES = {"R": 0, "M": 1}
+UNKNOWN_LABEL = 255
+CSV_CHUNK_ROWS = 100_000
+
+
+def sidecar_paths(path) -> Tuple[Path, Path]:
+    path = Path(path)
+    return path.with_suffix(".labels"), path.with_suffix(".meta.json")
+
+
+def _write_header(f, rows: int, cols: int) -> None:
+    header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, rows, cols)
+    f.seek(0)
+    f.write(header.ljust(HEADER_SIZE, b"\0"))
+
+
+def csv_to_ping(csv_path, out_path=None, num_features: int = 60, chunk_rows: int = CSV_CHUNK_ROWS) -> Path:
+    """Convert a sonar CSV (features, then an optional R/M label) to a .ping archive.
+
+    The CSV is read in chunks, so archives larger than memory convert fine.
+    """
+    import pandas as pd
+
+    csv_path = Path(csv_path)
+    out_path = Path(out_path) if out_path else csv_path.with_suffix(".ping")
+    labels_path, meta_path = sidecar_paths(out_path)
+
+    rows = 0
+    has_labels = False
+    with open(out_path, "wb") as features, open(labels_path, "wb") as labels:
+        _write_header(features, 0, num_features)
+        for chunk in pd.read_csv(csv_path, header=None, chunksize=chunk_rows):
+            values = chunk.iloc[:, :num_features].to_numpy(dtype=FEATURE_DTYPE)
+            features.write(np.ascontiguousarray(values).tobytes())
+            if chunk.shape[1] > num_features:
+                has_labels = True
+                codes = chunk.iloc[:, num_features].astype(str).str.strip().map(LABEL_CODES)
+                labels.write(codes.fillna(UNKNOWN_LABEL).to_numpy(dtype=np.uint8).tobytes())
+            else:
+                labels.write(np.full(len(chunk), UNKNOWN_LABEL, dtype=np.uint8).tobytes())
+            rows += len(chunk)
+        _write_header(features, rows, num_features)
+
+    if not has_labels:
+        os.remove(labels_path)
+    with open(meta_path, "w") as f:
+        json.dump({
+            "source": str(csv_path),
+            "created": time.time(),
+            "rows": rows,
+            "features": num_features,
+            "dtype": np.dtype(FEATURE_DTYPE).name,
+            "labels": LABEL_CODES if has_labels else None,
+        }, f, indent=2)
+    return out_path
+
+
+class PingStore:
+    """Read-only, memory-mapped view of a .ping archive"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            magic, version, rows, cols = struct.unpack(HEADER_FORMAT, f.read(struct.calcsize(HEADER_FORMAT)))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a ping archive")
+        if version != VERSION:
+            raise ValueError(f"Unsupported ping archive version {version}")
+
+        self.rows, self.cols = rows, cols
+        self.features = np.memmap(self.path, dtype=FEATURE_DTYPE, mode="r",
+                                  offset=HEADER_SIZE, shape=(rows, cols))
+
+        labels_path, meta_path = sidecar_paths(self.path)
+        self.labels: Optional[np.ndarray] = None
+        if labels_path.exists():
+            self.labels = np.memmap(labels_path, dtype=np.uint8, mode="r", shape=(rows,))
+        self.meta = {}
+        if meta_path.exists():
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def iter_chunks(self, chunk_rows: int = CSV_CHUNK_ROWS) -> Iterator[np.ndarray]:
+        """Yield consecutive row blocks as views into the mapped file"""
+        for start in range(0, self.rows, chunk_rows):
+            yield self.features[start:start + chunk_rows]
+
+
+def load_dataset(path, num_features: int = 60) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return (features, labels) from a .ping archive (mapped) or a sonar CSV (parsed)"""
+    path = Path(path)
+    if path.suffix == ".ping":
+        store = PingStore(path)
+        return store.features, store.labels
+
+    import pandas as pd
+
+    df = pd.read_csv(path, header=None)
+    features = df.iloc[:, :num_features].to_numpy(dtype=FEATURE_DTYPE)
+    labels = None
+    if df.shape[1] > num_features:
+        codes = df[num_features].astype(str).str.strip().map(LABEL_CODES)
+        labels = codes.fillna(UNKNOWN_LABEL).to_numpy(dtype=np.uint8)
+    return features, labels
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert sonar CSV files to memory-mappable .ping archives')
+    parser.add_argument('csv', nargs='+', help='CSV files to convert')
+    parser.add_argument('--output', default=None, help='Output path (single input only)')
+    args = parser.parse_args()
+
+    if args.output and len(args.csv) > 1:
+        parser.error('--output only works with a single input file')
+    for csv_file in args.csv:
+        out = csv_to_ping(csv_file, args.output)
+        print(f"Wrote {len(PingStore(out))} pings to {out}")
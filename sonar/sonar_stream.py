@@ -0,0 +1,215 @@
+"""Streaming sonar ingestion: score pings in fixed-size chunks as they arrive.
+
+Pings are CSV lines (60 floats, optionally followed by a label) read from a
+growing file, a pipe or a local TCP socket. Each chunk is scored through the
+SVM and mine threats are written out immediately as newline-delimited JSON.
+Memory stays constant: pings go into one preallocated buffer and records are
+written and dropped per chunk.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import selectors
+from bisect import bisect_left
+from typing import IO, Iterator, Optional
+
+import numpy as np
+
+from sonar_threat_detector import NUM_FEATURES, SonarScorer, build_threat_records
+
+DEFAULT_CHUNK_SIZE = 256
+POLL_INTERVAL = 0.1  # seconds a source waits for data before reporting it is idle
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+def tail_file(path: str, follow: bool = True, poll_interval: float = POLL_INTERVAL) -> Iterator[Optional[str]]:
+    """Yield complete lines from a file, following it as it grows; None while idle"""
+    with open(path, "r") as f:
+        partial = ""
+        while True:
+            line = f.readline()
+            if line:
+                partial += line
+                if partial.endswith("\n"):
+                    yield partial
+                    partial = ""
+                continue
+            if not follow:
+                if partial:
+                    yield partial
+                return
+            yield None
+            time.sleep(poll_interval)
+
+
+def read_pipe(stream: IO[str] = sys.stdin, poll_interval: float = POLL_INTERVAL) -> Iterator[Optional[str]]:
+    """Yield lines from a pipe until EOF; None when nothing arrived within poll_interval"""
+    # Read the raw descriptor so lines never sit in Python's buffer while select() reports idle
+    fd = stream.fileno()
+    selector = selectors.DefaultSelector()
+    selector.register(fd, selectors.EVENT_READ)
+    buffer = b""
+    try:
+        while True:
+            if not selector.select(poll_interval):
+                yield None
+                continue
+            data = os.read(fd, 65536)
+            if not data:
+                break
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8") + "\n"
+        if buffer:
+            yield buffer.decode("utf-8")
+    finally:
+        selector.close()
+
+
+def socket_lines(host: str, port: int, poll_interval: float = POLL_INTERVAL) -> Iterator[Optional[str]]:
+    """Listen on a local TCP port and yield lines from each connecting sender in turn"""
+    with socket.create_server((host, port)) as server:
+        server.settimeout(poll_interval)
+        print(f"Listening for sonar pings on {host}:{port}", file=sys.stderr)
+        while True:
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                yield None
+                continue
+            with connection:
+                connection.settimeout(poll_interval)
+                buffer = b""
+                while True:
+                    try:
+                        data = connection.recv(65536)
+                    except socket.timeout:
+                        yield None
+                        continue
+                    if not data:
+                        break
+                    buffer += data
+                    *lines, buffer = buffer.split(b"\n")
+                    for line in lines:
+                        yield line.decode("utf-8") + "\n"
+                if buffer:
+                    yield buffer.decode("utf-8")
+
+
+def open_source(source: str, follow: bool = True) -> Iterator[Optional[str]]:
+    """Open '-' (stdin), 'tcp://host:port' or a file path as a line source"""
+    if source == "-":
+        return read_pipe(sys.stdin)
+    if source.startswith("tcp://"):
+        host, port = source[len("tcp://"):].rsplit(":", 1)
+        return socket_lines(host, int(port))
+    return tail_file(source, follow=follow)
+
+
+class LatencyStats:
+    """Constant-memory latency summary: count, mean, max and a bucketed histogram"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, latencies_ms: np.ndarray) -> None:
+        if latencies_ms.size == 0:
+            return
+        self.count += int(latencies_ms.size)
+        self.total_ms += float(latencies_ms.sum())
+        self.max_ms = max(self.max_ms, float(latencies_ms.max()))
+        indices = np.searchsorted(LATENCY_BUCKETS_MS, latencies_ms)
+        for index, hits in zip(*np.unique(indices, return_counts=True)):
+            self.buckets[index] += int(hits)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile"""
+        if not self.count:
+            return 0.0
+        cumulative = np.cumsum(self.buckets)
+        index = bisect_left(list(cumulative), q / 100 * self.count)
+        return min(LATENCY_BUCKETS_MS[index], self.max_ms) if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+
+    def summary(self) -> dict:
+        return {
+            "pings": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+        }
+
+
+def parse_ping(line: str, out: np.ndarray) -> bool:
+    """Parse one CSV ping into ``out``; False for blank or malformed lines"""
+    fields = line.strip().split(",")
+    if len(fields) < NUM_FEATURES:
+        return False
+    try:
+        out[:] = [float(value) for value in fields[:NUM_FEATURES]]
+    except ValueError:
+        return False
+    return True
+
+
+def stream_sonar_data(lines: Iterator[Optional[str]], output: IO[str], scorer: Optional[SonarScorer] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, stats_interval: float = 10.0) -> LatencyStats:
+    """Score pings from a line source chunk by chunk, writing mine threats as NDJSON.
+
+    A chunk is scored when it is full or when the source goes idle, so pings
+    never wait for a chunk that may not fill. Latency is measured per ping
+    from when its line was read to when its chunk's output was flushed.
+    """
+    scorer = scorer or SonarScorer()
+    buffer = np.empty((chunk_size, NUM_FEATURES), dtype=np.float64)
+    received = np.empty(chunk_size, dtype=np.float64)
+    stats = LatencyStats()
+    filled = 0
+    threats = 0
+    last_report = time.monotonic()
+
+    def flush() -> None:
+        nonlocal filled, threats
+        chunk = buffer[:filled]
+        is_mine, confidence = scorer.score(chunk)
+        for record in build_threat_records(chunk[is_mine], confidence[is_mine]):
+            output.write(json.dumps(record) + "\n")
+        output.flush()
+        threats += int(is_mine.sum())
+        stats.add((time.perf_counter() - received[:filled]) * 1000)
+        filled = 0
+
+    for line in lines:
+        if line is not None and parse_ping(line, buffer[filled]):
+            received[filled] = time.perf_counter()
+            filled += 1
+        if filled and (filled == chunk_size or line is None):
+            flush()
+        if time.monotonic() - last_report >= stats_interval:
+            print(f"Sonar stream: {threats} threats, latency {stats.summary()}", file=sys.stderr)
+            last_report = time.monotonic()
+
+    if filled:
+        flush()
+    print(f"Sonar stream finished: {threats} threats, latency {stats.summary()}", file=sys.stderr)
+    return stats
+
+
+def open_output(path: str) -> IO[str]:
+    """'-' writes NDJSON to stdout, 'tcp://host:port' to a listening socket (the agent
+    daemon's queue), anything else appends to a file"""
+    if path == "-":
+        return sys.stdout
+    if path.startswith("tcp://"):
+        host, port = path[len("tcp://"):].rsplit(":", 1)
+        return socket.create_connection((host, int(port))).makefile("w", encoding="utf-8")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return open(path, "a")
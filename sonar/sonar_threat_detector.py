@@ -1,54 +1,198 @@
-import joblib
-import pandas as pd
 import numpy as np
+import os
+import re
+import sys
 import json
 import time
-import requests
+import argparse
+from functools import lru_cache
 from pathlib import Path
 
-def load_model():
-    """Load the trained SVM model"""
-    model_path = Path(__file__).parent / 'svm_model.pkl'
+NUM_FEATURES = 60
+# rockvsmine.py encodes mines as 1; older models were trained on the raw 'M' label
+MINE_LABELS = ('M', 1)
+SCORE_CHUNK_SIZE = 65536
+MODEL_DIR = Path(__file__).parent
+MODELS_DIR = MODEL_DIR / 'models'  # versioned artifacts written by train_sonar.py
+
+class NumpySVM:
+    """RBF SVM decision function evaluated with NumPy from the arrays train_sonar.export_svm writes.
+
+    Mirrors the SVC attributes SonarScorer relies on (classes_, decision_function),
+    without importing scikit-learn or unpickling anything.
+    """
+
+    def __init__(self, support_vectors, dual_coef, intercept, gamma, classes,
+                 scaler_mean=None, scaler_scale=None):
+        self.support_vectors = np.ascontiguousarray(support_vectors, dtype=np.float64)
+        self.dual_coef = np.asarray(dual_coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.gamma = float(gamma)
+        self.classes_ = np.asarray(classes)
+        self.scaler_mean = None if scaler_mean is None else np.asarray(scaler_mean, dtype=np.float64)
+        self.scaler_scale = None if scaler_scale is None else np.asarray(scaler_scale, dtype=np.float64)
+        self.sv_sq_norms = np.einsum('ij,ij->i', self.support_vectors, self.support_vectors)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    def decision_function(self, X):
+        """Signed distance to the boundary; > 0 selects classes_[1], as with SVC"""
+        X = np.asarray(X, dtype=np.float64)
+        if self.scaler_mean is not None:
+            X = (X - self.scaler_mean) / self.scaler_scale
+        # ||x - sv||^2 = ||x||^2 + ||sv||^2 - 2 x.sv, one matrix product for the whole batch
+        kernel = X @ self.support_vectors.T
+        kernel *= -2.0
+        kernel += np.einsum('ij,ij->i', X, X)[:, None]
+        kernel += self.sv_sq_norms
+        np.maximum(kernel, 0.0, out=kernel)
+        kernel *= -self.gamma
+        np.exp(kernel, out=kernel)
+        return kernel @ self.dual_coef + self.intercept
+
+def _version_key(name):
+    """Orders train_sonar.py version names (YYYYmmdd-HHMMSS, then -1, -2, ... on clashes) by age"""
+    match = re.match(r'^(\d{8}-\d{6})(?:-(\d+))?$', name)
+    return (match.group(1), int(match.group(2) or 0)) if match else (name, 0)
+
+def selected_model_path(models_dir=None, version=None):
+    """Artifact of the model train_sonar.py selected in the newest version, or None.
+
+    CV scores are only comparable within one training run (same data and
+    folds), so runs are chosen by recency rather than by score. ``version``
+    (default: the SONAR_MODEL_VERSION environment variable) pins a run. The
+    NumPy export is preferred when the selected model has one.
+    """
+    models_dir = Path(models_dir) if models_dir else MODELS_DIR
+    version = version or os.environ.get('SONAR_MODEL_VERSION')
+    if version:
+        metrics_paths = [models_dir / version / 'metrics.json']
+        if not metrics_paths[0].exists():
+            raise FileNotFoundError(f"No trained sonar model version {version!r} in {models_dir}")
+    else:
+        metrics_paths = sorted(models_dir.glob('*/metrics.json'), key=lambda p: _version_key(p.parent.name),
+                               reverse=True)
+    for metrics_path in metrics_paths:
+        with open(metrics_path) as f:
+            report = json.load(f)
+        entry = report.get('candidates', {}).get(report.get('best'), {})
+        artifact = entry.get('npz') or entry.get('artifact')
+        if artifact is not None:
+            return metrics_path.parent / artifact
+    return None
+
+@lru_cache(maxsize=None)
+def load_model(model_path=None):
+    """Load the trained model once per process.
+
+    Without a path, uses the model selected by the newest (or pinned)
+    train_sonar.py run, then the NumPy export (svm_model.npz), then the
+    pickled scikit-learn model. Pickled models need joblib and scikit-learn
+    installed.
+    """
+    if model_path is None:
+        npz_path = MODEL_DIR / 'svm_model.npz'
+        model_path = selected_model_path() or (npz_path if npz_path.exists() else MODEL_DIR / 'svm_model.pkl')
+    if Path(model_path).suffix == '.npz':
+        return NumpySVM.load(model_path)
+
+    import joblib
+
     return joblib.load(model_path)
 
-def process_sonar_data(data_path):
+class SonarScorer:
+    """Scores batches of sonar pings with one vectorized pass over a NumPy array"""
+
+    def __init__(self, model=None):
+        self.model = model if model is not None else load_model()
+        classes = list(self.model.classes_)
+        mine_labels = [c for c in classes if c in MINE_LABELS]
+        if len(classes) != 2 or not mine_labels:
+            raise ValueError(f"Expected a binary rock/mine model, got classes {classes}")
+        self.mine_index = classes.index(mine_labels[0])
+        # decision_function > 0 selects classes_[1]
+        self.mine_positive = self.mine_index == 1
+        # Models without a decision function (trees, KNN) are scored from predict_proba
+        self.use_proba = not hasattr(self.model, 'decision_function')
+
+    def score(self, X):
+        """Return (is_mine mask, mine confidence) for an (n, 60) array of pings.
+
+        The confidence is the SVM decision value oriented so that positive
+        means "mine"; prediction is derived from its sign, the same rule
+        SVC.predict applies, so each ping goes through the kernel only once.
+        Probabilistic models report the log-odds of "mine" on the same scale.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.shape[0] == 0:
+            return np.zeros(0, dtype=bool), np.zeros(0)
+        if self.use_proba:
+            p = np.clip(self.model.predict_proba(X)[:, self.mine_index], 1e-6, 1 - 1e-6)
+            confidence = np.log(p / (1 - p))
+            return confidence > 0, confidence
+        decision = np.asarray(self.model.decision_function(X), dtype=np.float64)
+        confidence = decision if self.mine_positive else -decision
+        return confidence > 0, confidence
+
+    def score_chunks(self, X, chunk_size=SCORE_CHUNK_SIZE):
+        """Yield (start, is_mine, confidence) per chunk to bound temporary memory"""
+        for start in range(0, X.shape[0], chunk_size):
+            is_mine, confidence = self.score(X[start:start + chunk_size])
+            yield start, is_mine, confidence
+
+def build_threat_records(signatures, confidences, timestamp=None):
+    """Build threat records for mine pings from the signature and confidence arrays in bulk"""
+    timestamp = time.time() if timestamp is None else timestamp
+    return [
+        {
+            "type": "underwater_threat",
+            "timestamp": timestamp,
+            "location": {
+                "type": "maritime_zone",
+                "coordinates": {"lat": 25.8371, "lon": -97.4023},  # Example coordinates
+                "area": "Southern Maritime Border Zone"
+            },
+            "detection": {
+                "type": "mine",
+                "confidence": confidence,
+                "sonar_signature": signature
+            },
+            "metadata": {
+                "detection_method": "sonar",
+                "sensor_type": "active_sonar",
+                "processing_timestamp": timestamp
+            }
+        }
+        for signature, confidence in zip(signatures.tolist(), confidences.tolist())
+    ]
+
+def detect_threats(X, scorer=None):
+    """Score an (n, 60) array of pings and return threat records for the predicted mines"""
+    scorer = scorer or SonarScorer()
+    threats = []
+    for start, is_mine, confidence in scorer.score_chunks(X):
+        chunk = X[start:start + len(is_mine)]
+        threats.extend(build_threat_records(chunk[is_mine], confidence[is_mine]))
+    return threats
+
+def process_sonar_data(data_path, scorer=None):
     """Process sonar data and detect threats"""
-    # Load the model
-    model = load_model()
+    if Path(data_path).suffix == '.ping':
+        # Memory-mapped archive: chunks are scored straight from the mapped pages
+        from ping_store import PingStore
+
+        return detect_threats(PingStore(data_path).features, scorer)
     
+    import pandas as pd
+
     # Read and process sonar data
     df = pd.read_csv(data_path, header=None)
-    X = df.iloc[:, :-1]  # All columns except the last one
+    X = df.iloc[:, :NUM_FEATURES].to_numpy(dtype=np.float64)  # Drop the label column
     
-    # Make predictions
-    predictions = model.predict(X)
-    
-    # Process each prediction
-    threats = []
-    for idx, pred in enumerate(predictions):
-        if pred == 'M':  # If prediction is Mine
-            threat_data = {
-                "type": "underwater_threat",
-                "timestamp": time.time(),
-                "location": {
-                    "type": "maritime_zone",
-                    "coordinates": {"lat": 25.8371, "lon": -97.4023},  # Example coordinates
-                    "area": "Southern Maritime Border Zone"
-                },
-                "detection": {
-                    "type": "mine",
-                    "confidence": float(model.decision_function([X.iloc[idx]])[0]),
-                    "sonar_signature": X.iloc[idx].tolist()
-                },
-                "metadata": {
-                    "detection_method": "sonar",
-                    "sensor_type": "active_sonar",
-                    "processing_timestamp": time.time()
-                }
-            }
-            threats.append(threat_data)
-    
-    return threats
+    return detect_threats(X, scorer)
 
 def send_threats_to_response_system(threats):
     """Send detected threats to the threat response system"""
@@ -66,13 +210,49 @@ def send_threats_to_response_system(threats):
     print(f"Saved threat detections to {output_path}")
     print("Run threat_response_creation.py with --mock flag to process these threats")
 
-def main():
+STREAM_OUTPUT_PATH = Path(__file__).parent.parent / 'plan_creation' / 'sonar_detections.ndjson'
+
+def main(stream=False, source=None, output=None, chunk_size=None, follow=True, model_path=None):
     """Main function to process sonar data and detect threats"""
     data_path = Path(__file__).parent / 'sonar.csv'
+    scorer = SonarScorer(load_model(model_path))
+    print(f"Using model {model_path or selected_model_path() or 'svm_model'}", file=sys.stderr)
+    
+    if stream:
+        from sonar_stream import DEFAULT_CHUNK_SIZE, open_output, open_source, stream_sonar_data
+
+        source = source or str(data_path)
+        print(f"Streaming sonar pings from {source}...", file=sys.stderr)
+        out = open_output(output or str(STREAM_OUTPUT_PATH))
+        try:
+            stream_sonar_data(open_source(source, follow=follow), out, scorer,
+                              chunk_size=chunk_size or DEFAULT_CHUNK_SIZE)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return
     
     print("Processing sonar data...")
-    threats = process_sonar_data(data_path)
+    threats = process_sonar_data(source or data_path, scorer)
     send_threats_to_response_system(threats)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Detect underwater threats in sonar data')
+    parser.add_argument('--stream', action='store_true',
+                        help='Score pings continuously and append threats as NDJSON')
+    parser.add_argument('--source', default=None,
+                        help="Ping source: CSV or .ping path, '-' for stdin or tcp://host:port (default: sonar.csv)")
+    parser.add_argument('--output', default=None,
+                        help=f"NDJSON output path, '-' for stdout or tcp://host:port to push to the agent daemon "
+                             f"(default: {STREAM_OUTPUT_PATH.name})")
+    parser.add_argument('--chunk-size', type=int, default=None, help='Pings scored per chunk in stream mode')
+    parser.add_argument('--no-follow', action='store_true',
+                        help='Stop at the end of a file source instead of waiting for new pings')
+    parser.add_argument('--model', default=None,
+                        help='Model .npz or .pkl to score with (default: best train_sonar.py model, else svm_model)')
+    args = parser.parse_args()
+    
+    main(stream=args.stream, source=args.source, output=args.output,
+         chunk_size=args.chunk_size, follow=not args.no_follow, model_path=args.model)
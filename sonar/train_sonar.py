@@ -0,0 +1,291 @@
+"""Cross-validated model selection for the rock/mine classifier.
+
+Every candidate model and hyperparameter combination is scored with stratified
+k-fold cross-validation on a training split. All fits (candidate x parameters
+x fold) run as one flat joblib job list, so they spread evenly over CPU cores.
+Folds and their standardized copies are computed once and cached on disk with
+joblib.Memory, keyed on the data file, so reruns skip preprocessing.
+
+Each candidate's best configuration is refit on the training split and scored
+on a held-out test split. The results are written as a versioned artifact
+directory; sonar_threat_detector.py loads the selected model of the newest one:
+
+    sonar/models/<version>/metrics.json     # dataset digest, CV and hold-out metrics for every candidate
+    sonar/models/<version>/<candidate>.pkl  # refit model
+    sonar/models/<version>/<candidate>.npz  # NumPy export, for RBF SVMs
+
+    python sonar/train_sonar.py --jobs -1
+"""
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+SONAR_DIR = Path(__file__).parent
+DEFAULT_DATA = SONAR_DIR / 'sonar.csv'
+MODELS_DIR = SONAR_DIR / 'models'
+CACHE_DIR = MODELS_DIR / '.cache'
+SELECTION_METRIC = 'cv_accuracy'
+
+# name -> (estimator factory, parameter grid). 'scale' is not an estimator parameter:
+# it selects the standardized fold arrays and puts a StandardScaler in front of the refit model.
+def _candidates() -> Dict[str, Any]:
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.svm import SVC
+    from sklearn.tree import DecisionTreeClassifier
+
+    return {
+        'logistic_regression': (lambda: LogisticRegression(max_iter=5000, random_state=0), {
+            'scale': [True], 'C': [0.01, 0.1, 1, 10, 100],
+        }),
+        'knn': (lambda: KNeighborsClassifier(), {
+            'scale': [True], 'n_neighbors': [1, 3, 5, 7, 9], 'weights': ['uniform', 'distance'],
+        }),
+        'svc_rbf': (lambda: SVC(kernel='rbf', random_state=0), {
+            'scale': [False, True], 'C': [0.1, 1, 10, 100], 'gamma': ['scale', 0.01, 0.1, 1],
+        }),
+        'decision_tree': (lambda: DecisionTreeClassifier(random_state=0), {
+            'scale': [False], 'criterion': ['gini', 'entropy'], 'max_depth': [None, 5, 10],
+            'min_samples_leaf': [1, 2, 4],
+        }),
+        'random_forest': (lambda: RandomForestClassifier(random_state=0, n_jobs=1), {
+            'scale': [False], 'n_estimators': [100, 300], 'max_features': ['sqrt', 0.3],
+            'criterion': ['gini', 'entropy'],
+        }),
+        'extra_trees': (lambda: ExtraTreesClassifier(random_state=0, n_jobs=1), {
+            'scale': [False], 'n_estimators': [100, 300], 'max_features': ['sqrt', 0.3],
+            'criterion': ['gini', 'entropy'],
+        }),
+    }
+
+def file_digest(path) -> str:
+    """SHA-256 of a dataset; a .ping archive is hashed together with its labels sidecar"""
+    from ping_store import sidecar_paths
+
+    path = Path(path)
+    paths = [path]
+    labels_path = sidecar_paths(path)[0]
+    if path.suffix == '.ping' and labels_path.exists():
+        paths.append(labels_path)
+    digest = hashlib.sha256()
+    for part in paths:
+        with open(part, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def prepare_folds(data_path: str, digest: str, n_splits: int, test_size: float, seed: int) -> Dict[str, Any]:
+    """Split the data into train/test and k stratified folds, with standardized copies of each fold.
+
+    ``digest`` is unused here but is part of the joblib.Memory cache key, so
+    editing the data file invalidates the cached folds.
+    """
+    from sklearn.model_selection import StratifiedKFold, train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from ping_store import UNKNOWN_LABEL, load_dataset
+
+    features, labels = load_dataset(data_path)
+    if labels is None:
+        raise ValueError(f"{data_path} has no labels to train on")
+    # Pings labelled neither rock nor mine are not a third class
+    labelled = np.asarray(labels) != UNKNOWN_LABEL
+    X = np.asarray(features, dtype=np.float64)[labelled]
+    y = np.asarray(labels, dtype=np.int64)[labelled]
+    if len(np.unique(y)) < 2:
+        raise ValueError(f"{data_path} needs both rock and mine labels to train on")
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, stratify=y, random_state=seed)
+
+    folds = []
+    for train_idx, val_idx in StratifiedKFold(n_splits, shuffle=True, random_state=seed).split(X_train, y_train):
+        scaler = StandardScaler().fit(X_train[train_idx])
+        folds.append({
+            'train_idx': train_idx,
+            'val_idx': val_idx,
+            'scaled_train': scaler.transform(X_train[train_idx]),
+            'scaled_val': scaler.transform(X_train[val_idx]),
+        })
+    return {'X_train': X_train, 'y_train': y_train, 'X_test': X_test, 'y_test': y_test, 'folds': folds,
+            'unlabelled_rows': int((~labelled).sum())}
+
+def build_model(name: str, params: Dict[str, Any], candidates=None):
+    """Estimator for a candidate configuration, behind a StandardScaler when params['scale'] is set"""
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    factory, _ = (candidates or _candidates())[name]
+    params = dict(params)
+    scale = params.pop('scale', False)
+    estimator = factory().set_params(**params)
+    return make_pipeline(StandardScaler(), estimator) if scale else estimator
+
+def _fit_fold(estimator, X_train, y_train, X_val, y_val) -> float:
+    estimator.fit(X_train, y_train)
+    return float((estimator.predict(X_val) == y_val).mean())
+
+def _refit(name, params, X_train, y_train):
+    return build_model(name, params).fit(X_train, y_train)
+
+def holdout_metrics(model, X_test, y_test) -> Dict[str, float]:
+    """Hold-out metrics for a fitted model, using the detector's own scoring rule"""
+    from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+    from sonar_threat_detector import SonarScorer
+
+    is_mine, confidence = SonarScorer(model).score(X_test)
+    return {
+        'holdout_accuracy': float((is_mine == (y_test == 1)).mean()),
+        'holdout_mine_precision': float(precision_score(y_test, is_mine, zero_division=0)),
+        'holdout_mine_recall': float(recall_score(y_test, is_mine, zero_division=0)),
+        'holdout_mine_f1': float(f1_score(y_test, is_mine, zero_division=0)),
+        'holdout_roc_auc': float(roc_auc_score(y_test, confidence)),
+    }
+
+def export_svm(model, path) -> None:
+    """Write an RBF SVM (optionally behind a StandardScaler in a Pipeline) as plain arrays for NumpySVM"""
+    scaler = None
+    if hasattr(model, 'steps'):
+        transforms = [step for _, step in model.steps[:-1] if step not in (None, 'passthrough')]
+        if len(transforms) > 1 or (transforms and not hasattr(transforms[0], 'mean_')):
+            raise ValueError(f"Only a single StandardScaler can be exported, got {transforms!r}")
+        scaler = transforms[0] if transforms else None
+        model = model.steps[-1][1]
+    if getattr(model, 'kernel', None) != 'rbf':
+        raise ValueError(f"Only RBF SVMs can be exported, got {model!r}")
+
+    arrays = {
+        'support_vectors': model.support_vectors_,
+        'dual_coef': model.dual_coef_[0],  # already signed so that > 0 means classes_[1]
+        'intercept': model.intercept_[0],
+        'gamma': model._gamma,
+        'classes': model.classes_,
+    }
+    if scaler is not None:
+        arrays['scaler_mean'] = scaler.mean_ if scaler.with_mean else np.zeros(model.n_features_in_)
+        arrays['scaler_scale'] = scaler.scale_ if scaler.with_std else np.ones(model.n_features_in_)
+    np.savez(path, **arrays)
+
+def new_version(output_dir: Path) -> Path:
+    version = time.strftime('%Y%m%d-%H%M%S')
+    path, suffix = output_dir / version, 1
+    while path.exists():
+        path, suffix = output_dir / f"{version}-{suffix}", suffix + 1
+    return path
+
+def train(data_path=DEFAULT_DATA, output_dir=MODELS_DIR, n_jobs: int = -1, n_splits: int = 5,
+          test_size: float = 0.25, seed: int = 0, only: Optional[List[str]] = None,
+          cache_dir=CACHE_DIR, save: bool = True, verbose: bool = True) -> Dict[str, Any]:
+    """Run the cross-validated search, refit each candidate's best configuration and save the artifacts"""
+    import joblib
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import ParameterGrid
+
+    start = time.perf_counter()
+    data_path, output_dir = Path(data_path), Path(output_dir)
+    candidates = _candidates()
+    if only:
+        unknown = set(only) - set(candidates)
+        if unknown:
+            raise ValueError(f"Unknown candidates {sorted(unknown)}; choose from {sorted(candidates)}")
+        candidates = {name: candidates[name] for name in only}
+
+    digest = file_digest(data_path)
+    memory = joblib.Memory(str(cache_dir) if cache_dir else None, verbose=0)
+    data = memory.cache(prepare_folds)(str(data_path), digest, n_splits, test_size, seed)
+    X_train, y_train = data['X_train'], data['y_train']
+    prepared = time.perf_counter()
+
+    configs = [(name, params) for name, (_, grid) in candidates.items() for params in ParameterGrid(grid)]
+    tasks = []
+    for name, params in configs:
+        for fold in data['folds']:
+            X_fit = fold['scaled_train'] if params['scale'] else X_train[fold['train_idx']]
+            X_val = fold['scaled_val'] if params['scale'] else X_train[fold['val_idx']]
+            estimator = build_model(name, {k: v for k, v in params.items() if k != 'scale'}, candidates)
+            tasks.append(delayed(_fit_fold)(estimator, X_fit, y_train[fold['train_idx']], X_val, y_train[fold['val_idx']]))
+    if verbose:
+        print(f"Fitting {len(tasks)} models ({len(configs)} configurations x {n_splits} folds) with n_jobs={n_jobs}")
+    scores = np.array(Parallel(n_jobs=n_jobs)(tasks)).reshape(len(configs), n_splits)
+    searched = time.perf_counter()
+
+    best: Dict[str, Dict[str, Any]] = {}
+    for (name, params), fold_scores in zip(configs, scores):
+        if name not in best or fold_scores.mean() > best[name]['cv_accuracy']:
+            best[name] = {'params': params, 'cv_accuracy': float(fold_scores.mean()),
+                          'cv_accuracy_std': float(fold_scores.std())}
+
+    models = Parallel(n_jobs=n_jobs)(delayed(_refit)(name, entry['params'], X_train, y_train)
+                                     for name, entry in best.items())
+    report = {
+        'data': {'path': str(data_path), 'sha256': digest,
+                 'train_rows': int(len(y_train)), 'test_rows': int(len(data['y_test'])),
+                 'unlabelled_rows': data['unlabelled_rows']},
+        'n_splits': n_splits,
+        'seed': seed,
+        'n_jobs': n_jobs,
+        'selection_metric': SELECTION_METRIC,
+        'candidates': {},
+    }
+    for (name, entry), model in zip(best.items(), models):
+        report['candidates'][name] = {
+            'params': entry['params'],
+            'metrics': {'cv_accuracy': entry['cv_accuracy'], 'cv_accuracy_std': entry['cv_accuracy_std'],
+                        **holdout_metrics(model, data['X_test'], data['y_test'])},
+        }
+    report['best'] = max(report['candidates'], key=lambda n: report['candidates'][n]['metrics'][SELECTION_METRIC])
+    report['timings'] = {
+        'prepare_s': prepared - start,
+        'search_s': searched - prepared,
+        'total_s': time.perf_counter() - start,
+        'fits': len(tasks),
+    }
+
+    if save:
+        version_dir = new_version(output_dir)
+        version_dir.mkdir(parents=True)
+        report['version'] = version_dir.name
+        for (name, entry), model in zip(report['candidates'].items(), models):
+            joblib.dump(model, version_dir / f"{name}.pkl")
+            entry['artifact'] = f"{name}.pkl"
+            try:
+                export_svm(model, version_dir / f"{name}.npz")
+                entry['npz'] = f"{name}.npz"
+            except ValueError:
+                pass
+        with open(version_dir / 'metrics.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        report['path'] = str(version_dir)
+
+    if verbose:
+        for name, entry in sorted(report['candidates'].items(), key=lambda item: -item[1]['metrics'][SELECTION_METRIC]):
+            m = entry['metrics']
+            print(f"  {name:20s} cv {m['cv_accuracy']:.3f} ± {m['cv_accuracy_std']:.3f}  "
+                  f"hold-out acc {m['holdout_accuracy']:.3f} auc {m['holdout_roc_auc']:.3f}")
+        print(f"Best model: {report['best']} "
+              f"({report['timings']['total_s']:.1f}s, search {report['timings']['search_s']:.1f}s)")
+        if save:
+            print(f"Saved artifacts to {report['path']}")
+    return report
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(SONAR_DIR))
+    parser = argparse.ArgumentParser(description='Cross-validated model selection for the sonar classifier')
+    parser.add_argument('--data', default=str(DEFAULT_DATA), help='Labelled sonar CSV or .ping archive')
+    parser.add_argument('--output', default=str(MODELS_DIR), help='Directory for versioned model artifacts')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel fits (-1 for all cores)')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--test-size', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', default=None, help='Restrict the search to these candidates')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute folds instead of using the fold cache')
+    parser.add_argument('--dry-run', action='store_true', help='Search and report without writing artifacts')
+    args = parser.parse_args()
+
+    train(args.data, args.output, n_jobs=args.jobs, n_splits=args.folds, test_size=args.test_size,
+          seed=args.seed, only=args.only, cache_dir=None if args.no_cache else CACHE_DIR,
+          save=not args.dry_run)
@@ -0,0 +1,47 @@
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plan_creation"))
+from concurrent_pipeline import PipelineOptions, run_concurrently
+
+
+def test_results_keep_input_order():
+    def fn(item):
+        time.sleep(0.01 * (5 - item))
+        return item * 2
+
+    assert run_concurrently(range(5), fn, PipelineOptions(max_concurrency=5)) == [0, 2, 4, 6, 8]
+
+
+def test_timeout_bounds_wall_time():
+    release = threading.Event()
+
+    def fn(item):
+        if item == 0:
+            release.wait(5)  # a call that hangs well past the timeout
+        return item
+
+    options = PipelineOptions(max_concurrency=2, timeout=0.2, retries=0)
+    start = time.perf_counter()
+    try:
+        results = run_concurrently([0, 1], fn, options, on_failure=lambda item, e: "failed")
+        elapsed = time.perf_counter() - start
+    finally:
+        release.set()
+    assert results == ["failed", 1]
+    assert elapsed < 1.0
+
+
+def test_retries_then_on_failure():
+    calls = []
+
+    def fn(item):
+        calls.append(item)
+        raise RuntimeError("backend down")
+
+    options = PipelineOptions(retries=2, backoff=0.01)
+    assert run_concurrently(["a"], fn, options, on_failure=lambda item, e: repr(e)) == [
+        "RuntimeError('backend down')"]
+    assert calls == ["a", "a", "a"]
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plan_creation"))
+import daemon
+from daemon import DetectionDaemon, open_input
+
+
+def run_daemon(tmp_path, inputs, **kwargs):
+    """One run until idle over fresh sources and the shared checkpoint; returns the ids processed"""
+    processed = []
+
+    def process(records):
+        processed.extend(record["id"] for record in records)
+        return [{"id": record["id"]} for record in records]
+
+    DetectionDaemon([open_input(str(path)) for path in inputs], process, str(tmp_path / "checkpoint.json"),
+                    str(tmp_path / "responses.ndjson"), batch_size=2, **kwargs).run(until_idle=True)
+    return processed
+
+
+def append_lines(path, ids, partial=""):
+    with open(path, "a") as f:
+        f.writelines(json.dumps({"id": i}) + "\n" for i in ids)
+        f.write(partial)
+
+
+def test_ndjson_resumes_from_the_checkpoint(tmp_path):
+    stream = tmp_path / "detections.ndjson"
+    append_lines(stream, [1, 2, 3], partial='{"id": 4')
+    assert run_daemon(tmp_path, [stream]) == [1, 2, 3]
+
+    append_lines(stream, [], partial='}\n')
+    append_lines(stream, [5])
+    assert run_daemon(tmp_path, [stream]) == [4, 5]
+    assert run_daemon(tmp_path, [stream]) == []
+    responses = (tmp_path / "responses.ndjson").read_text().splitlines()
+    assert [json.loads(line)["id"] for line in responses] == [1, 2, 3, 4, 5]
+
+
+def test_rotated_or_truncated_ndjson_is_read_from_the_start(tmp_path):
+    stream = tmp_path / "detections.ndjson"
+    append_lines(stream, [1, 2, 3])
+    run_daemon(tmp_path, [stream])
+
+    rotated = tmp_path / "rotated.ndjson"
+    append_lines(rotated, [10, 11, 12, 13])
+    os.replace(rotated, stream)  # new inode, even though it is longer
+    assert run_daemon(tmp_path, [stream]) == [10, 11, 12, 13]
+
+    stream.write_text(json.dumps({"id": 20}) + "\n")  # same inode, shorter than the offset
+    assert run_daemon(tmp_path, [stream]) == [20]
+
+
+def test_rewritten_json_is_processed_once(tmp_path):
+    detections = tmp_path / "detections.json"
+    detections.write_text(json.dumps({"detections": [{"id": 1}, {"id": 2}]}))
+    assert run_daemon(tmp_path, [detections]) == [1, 2]
+
+    detections.write_text(json.dumps({"detections": [{"id": 1}, {"id": 2}, {"id": 3}]}))
+    assert run_daemon(tmp_path, [detections]) == [3]
+
+    detections.write_text(json.dumps({"detections": [{"id": 1}, {"id": 2}, {"id": 3}]}))  # same content
+    assert run_daemon(tmp_path, [detections]) == []
+
+    detections.write_text(json.dumps({"detections": [{"id": 7}, {"id": 8}]}))  # new content
+    assert run_daemon(tmp_path, [detections]) == [7, 8]
+
+
+def test_drained_spool_is_compacted_without_replaying(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "SPOOL_COMPACT_BYTES", 1)
+    spool = tmp_path / "spool.ndjson"
+    queued = DetectionDaemon([], lambda records: [], str(tmp_path / "checkpoint.json"),
+                             str(tmp_path / "responses.ndjson"), listen=("127.0.0.1", 0), spool_path=str(spool))
+    for i in (1, 2, 3):
+        queued.queue.append(json.dumps({"id": i}).encode() + b"\n")
+    queued.queue.append(b"not json\n")
+    summary = queued.run(until_idle=True)
+    assert summary["detections"] == 3
+    assert summary["queue"] == {"received": 3, "rejected": 1}
+    assert spool.stat().st_size == 0
+
+    checkpoint = json.loads((tmp_path / "checkpoint.json").read_text())["sources"]
+    assert checkpoint[str(spool)]["offset"] == 0
+    append_lines(spool, [4])
+    assert run_daemon(tmp_path, [spool]) == [4]
+
+
+def test_idle_hook_records_are_appended_to_the_responses(tmp_path):
+    stream = tmp_path / "detections.ndjson"
+    append_lines(stream, [1])
+    closing = [[{"type": "incident_closed", "incident_id": 7}], []]
+    run_daemon(tmp_path, [stream], idle=lambda: closing.pop(0) if closing else [])
+    responses = [json.loads(line) for line in (tmp_path / "responses.ndjson").read_text().splitlines()]
+    assert responses == [{"id": 1}, {"type": "incident_closed", "incident_id": 7}]
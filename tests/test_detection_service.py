@@ -0,0 +1,54 @@
+import sys
+import importlib
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("torch")
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "camera"))
+from inference_executor import InferenceExecutor
+from model_loader import ModelLoader
+
+
+@pytest.fixture(scope="module")
+def service(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DETECT_RESPONSE_STORE", str(tmp_path_factory.mktemp("store") / "store.db"))
+        patch.setenv("DETECT_PRELOAD", "0")
+        yield importlib.import_module("detection_service")
+
+
+@pytest.fixture
+def client(service):
+    return TestClient(service.app)  # no startup event, so the model is never loaded
+
+
+def test_full_executor_answers_503_with_retry_after(service, client, monkeypatch):
+    full = InferenceExecutor(workers=1, max_queue=0, retry_after=3.4)
+    full._admit()  # the only slot is taken by a running job
+    monkeypatch.setattr(service, "executor", full)
+
+    response = client.post("/detect", files={"file": ("ping.bin", b"\0" * 64)},
+                           data={"detection_type": "sonar", "location": '{"lat": 25.8, "lon": -97.4}'})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert full.rejected == 1
+    full.shutdown(wait=False)
+
+
+def test_ready_reports_503_until_the_model_is_warm(service, client, monkeypatch):
+    loader = ModelLoader(lambda: "model", name="yolov5s")
+    monkeypatch.setattr(service, "model_loader", loader)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert response.json()["state"] == "not_loaded"
+
+    loader.warm_up()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
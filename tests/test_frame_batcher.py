@@ -0,0 +1,60 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "camera"))
+from frame_batcher import FrameBatcher
+from inference_executor import InferenceExecutor, Overloaded
+
+
+def run(batcher, coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await batcher.close()
+
+    return asyncio.run(main())
+
+
+def test_short_results_fail_every_frame_in_the_batch():
+    executor = InferenceExecutor(workers=1, max_queue=0)
+    batcher = FrameBatcher(lambda frames: frames[:1], executor, max_batch_size=4, max_wait=0.05)
+
+    async def submit():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True), 2)
+
+    results = run(batcher, submit())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    executor.shutdown()
+
+
+def test_admitted_burst_waits_for_a_worker_instead_of_failing():
+    executor = InferenceExecutor(workers=1, max_queue=0)
+
+    def slow(frames):
+        time.sleep(0.02)
+        return [f * 2 for f in frames]
+
+    batcher = FrameBatcher(slow, executor, max_batch_size=2, max_wait=0, max_pending=20)
+
+    async def burst():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+
+    assert run(batcher, burst()) == [i * 2 for i in range(20)]
+    assert executor.rejected == 0
+    assert batcher.stats()["pending"] == 0
+    executor.shutdown()
+
+
+def test_submissions_past_max_pending_are_rejected():
+    executor = InferenceExecutor(workers=1, max_queue=0)
+    batcher = FrameBatcher(lambda frames: frames, executor, max_batch_size=2, max_pending=2)
+
+    with pytest.raises(Overloaded):
+        run(batcher, batcher.submit_many([1, 2, 3]))
+    executor.shutdown()
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plan_creation"))
+from fusion import FusionIndex
+
+
+def camera(at, lat=25.8, lon=-97.4, kind="boat", level=None):
+    record = {"objects_detected": [{"type": kind, "confidence": 0.8}],
+              "coordinates": {"lat": lat, "lon": lon}, "timestamp": at}
+    if level is not None:
+        record["threat_level"] = level
+    return record
+
+
+def test_incident_is_resent_only_when_severity_or_types_change():
+    index = FusionIndex(distance_m=200, window_s=60)
+    sent = [index.fuse([camera(t)]) for t in range(5)]
+    assert [len(records) for records in sent] == [1, 0, 0, 0, 0]
+
+    assert len(index.fuse([camera(5, kind="swimmer")])) == 1
+    assert index.fuse([camera(6, level="high")])[0]["threat_level"] == "high"
+    assert index.fuse([camera(7, level="low")]) == []
+
+    record = index.fuse([camera(8, kind="jet_ski")])[0]
+    assert record["detection_count"] == 9
+    assert index.summary()["analyses"] == 4
+
+
+def test_expiry_follows_incident_time_not_arrival_order():
+    index = FusionIndex(distance_m=200, window_s=60)
+    recent, _ = index.add(camera(100))
+    late, _ = index.add(camera(0, lat=26.5))  # arrives after, but is older
+    assert index.expire(now=70) == [late]
+    assert list(index.incidents) == [recent.incident_id]
+    assert index.expire(now=161) == [recent]
+
+
+def test_late_record_does_not_keep_incident_open_longer():
+    index = FusionIndex(distance_m=200, window_s=60)
+    incident, _ = index.add(camera(100))
+    index.add(camera(80))  # merged, but last_seen stays 100
+    assert incident.last_seen == 100
+    assert index.expire(now=161) == [incident]
+
+
+def test_expire_reports_incidents_closed_while_adding():
+    index = FusionIndex(distance_m=200, window_s=60)
+    first, _ = index.add(camera(0))
+    index.add(camera(100, lat=26.5))  # closes the first incident as a side effect
+    assert list(index.incidents) == [2]
+    assert index.expire(now=100) == [first]
+    assert index.expire(now=100) == []
+    assert index.summary()["closed_incidents"] == 1
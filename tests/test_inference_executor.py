@@ -0,0 +1,37 @@
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "camera"))
+from inference_executor import InferenceExecutor, Overloaded, executor_from_env
+
+
+def test_requests_past_capacity_are_rejected_until_a_slot_frees():
+    executor = InferenceExecutor(workers=1, max_queue=1, retry_after=3.0)
+    release = threading.Event()
+
+    async def main():
+        running = [asyncio.ensure_future(executor.run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as overloaded:
+            await executor.run(lambda: None)
+        assert overloaded.value.retry_after == 3.0
+        assert executor.stats()["in_flight"] == 2
+        release.set()
+        await asyncio.gather(*running)
+        return await executor.run(lambda: "admitted again")
+
+    assert asyncio.run(main()) == "admitted again"
+    assert executor.stats() == {"workers": 1, "capacity": 2, "in_flight": 0, "completed": 3, "rejected": 1}
+    executor.shutdown()
+
+
+def test_executor_from_env(monkeypatch):
+    monkeypatch.setenv("DETECT_WORKERS", "3")
+    monkeypatch.setenv("DETECT_QUEUE_SIZE", "5")
+    executor = executor_from_env(retry_after=0.5)
+    assert (executor.workers, executor.capacity, executor.retry_after) == (3, 8, 0.5)
+    executor.shutdown()
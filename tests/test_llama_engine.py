@@ -0,0 +1,112 @@
+import sys
+import json
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+sys.path.insert(0, str(ROOT / "plan_creation"))
+from llama_engine import GenerationEngine, MicroBatcher
+from tiny_lm import load_tiny_lm
+from threat_response_creation import THREAT_PROMPT_PREFIX, THREAT_PROMPT_PREFIX_NAME, format_detection_section
+
+PREFIXES = {THREAT_PROMPT_PREFIX_NAME: THREAT_PROMPT_PREFIX, "short": "Answer in one word.\n"}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    model, tokenizer = load_tiny_lm(hidden_size=64, layers=2)
+    engine = GenerationEngine(model, tokenizer, max_new_tokens=12, generation_kwargs={"do_sample": False})
+    for name, text in PREFIXES.items():
+        engine.register_prefix(name, text)
+    return engine
+
+
+@pytest.fixture(scope="module")
+def prompts():
+    with open(ROOT / "plan_creation" / "mock_detections.json") as f:
+        detections = json.load(f)
+    # Different lengths, so rows in a batch are padded
+    return [format_detection_section(detection) for detection in detections][:3] + ["Boat at pier 4?"]
+
+
+def test_prefix_path_sends_the_same_prompt(engine, prompts):
+    for prompt in prompts:
+        input_ids, _ = engine.prefix_inputs(THREAT_PROMPT_PREFIX_NAME, [prompt])
+        full = engine.render_chat(THREAT_PROMPT_PREFIX + prompt)
+        expected = engine.tokenizer(full, return_tensors="pt", add_special_tokens=False)["input_ids"]
+        assert input_ids.tolist() == expected.tolist()
+
+
+def test_cached_prefix_matches_plain_generation(engine, prompts):
+    cached = engine.generate_with_prefix(THREAT_PROMPT_PREFIX_NAME, prompts)
+    assert cached == engine.generate_with_prefix(THREAT_PROMPT_PREFIX_NAME, prompts, use_cache=False)
+    assert cached == [engine.generate(THREAT_PROMPT_PREFIX + prompt) for prompt in prompts]
+
+
+def test_prefixed_batch_matches_plain_generation(engine, prompts):
+    requests = [(THREAT_PROMPT_PREFIX_NAME if i % 2 else "short", prompt) for i, prompt in enumerate(prompts)]
+    expected = [engine.generate(PREFIXES[name] + prompt) for name, prompt in requests]
+    assert engine.generate_prefixed_batch(requests) == expected
+
+
+def test_micro_batcher_resolves_every_item_in_order():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(items)
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait=0.05)
+    futures = [batcher.submit(i) for i in range(10)]
+    assert [future.result(timeout=5) for future in futures] == [i * 10 for i in range(10)]
+    assert all(len(batch) <= 4 for batch in batches)
+    batcher.close()
+
+
+def test_micro_batcher_fails_short_results():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=2, max_wait=0.05)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="1 results for 2 items"):
+            future.result(timeout=5)
+    batcher.close()
+
+
+def test_micro_batcher_close_runs_queued_then_fails_the_rest():
+    batcher = MicroBatcher(lambda items: items, max_wait=0.01)
+    queued = batcher.submit("queued")
+    batcher.close()
+    assert queued.result(timeout=1) == "queued"
+
+    # An entry left behind the close sentinel is failed rather than left pending
+    late = Future()
+    batcher._queue.put(("late", late))
+    batcher.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        late.result(timeout=1)
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit("after")
+
+
+def test_closing_a_stream_stops_generation(engine):
+    calls = []
+    forward = engine.model.forward
+
+    def counting_forward(*args, **kwargs):
+        calls.append(1)
+        return forward(*args, **kwargs)
+
+    engine.model.forward = counting_forward
+    try:
+        stream = engine.stream("Boat at pier 4?", max_new_tokens=200, stop_at_json_end=False)
+        next(stream)
+        stream.close()
+    finally:
+        del engine.model.forward
+    assert len(calls) < 20
+    assert not any(thread.name == "generation-stream" for thread in threading.enumerate())
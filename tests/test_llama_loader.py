@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import huggingface_hub
+from llama_loader import ALLOW_PATTERNS, resolve_snapshot
+
+MODEL_ID = "test/tiny-llama"
+REVISION = "0" * 40
+
+
+def hub_cache(cache_dir):
+    """A hub cache that holds MODEL_ID at REVISION; returns the snapshot directory"""
+    repo = cache_dir / f"models--{MODEL_ID.replace('/', '--')}"
+    snapshot = repo / "snapshots" / REVISION
+    snapshot.mkdir(parents=True)
+    (snapshot / "config.json").write_text("{}")
+    (repo / "refs").mkdir()
+    (repo / "refs" / "main").write_text(REVISION)
+    return snapshot
+
+
+@pytest.fixture
+def hub_calls(monkeypatch):
+    """Records snapshot_download calls; only local lookups reach the real function"""
+    calls = []
+    real = huggingface_hub.snapshot_download
+
+    def snapshot_download(*args, **kwargs):
+        calls.append(kwargs)
+        if kwargs.get("local_files_only"):
+            return real(*args, **kwargs)
+        return "/downloaded"
+
+    monkeypatch.setattr(huggingface_hub, "snapshot_download", snapshot_download)
+    return calls
+
+
+def test_preloaded_directory_is_used_without_the_hub(tmp_path, hub_calls):
+    hub_cache(tmp_path / "cache")
+    preloaded = hub_cache(tmp_path / "volume")
+    path, source = resolve_snapshot(MODEL_ID, REVISION, str(tmp_path / "cache"), str(preloaded))
+    assert (path, source) == (str(preloaded), "preloaded")
+    assert hub_calls == []
+
+
+def test_preloaded_directory_without_a_model_is_an_error(tmp_path, hub_calls):
+    with pytest.raises(FileNotFoundError):
+        resolve_snapshot(MODEL_ID, REVISION, str(tmp_path), local_path=str(tmp_path))
+
+
+def test_warm_cache_is_used_before_downloading(tmp_path, hub_calls):
+    snapshot = hub_cache(tmp_path)
+    path, source = resolve_snapshot(MODEL_ID, REVISION, str(tmp_path))
+    assert (Path(path), source) == (snapshot, "cache")
+    assert [call["local_files_only"] for call in hub_calls] == [True]
+
+
+def test_cold_cache_downloads_only_what_loading_needs(tmp_path, hub_calls):
+    assert resolve_snapshot(MODEL_ID, REVISION, str(tmp_path)) == ("/downloaded", "download")
+    assert [call.get("local_files_only", False) for call in hub_calls] == [True, False]
+    assert hub_calls[1]["allow_patterns"] == ALLOW_PATTERNS
+    assert hub_calls[1]["revision"] == REVISION
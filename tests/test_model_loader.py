@@ -0,0 +1,59 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "camera"))
+from model_loader import ModelLoader, ModelNotReady
+
+
+def test_model_is_ready_only_after_warmup():
+    warmed = []
+    loader = ModelLoader(lambda: "model", warmed.append, name="test")
+    assert loader.state == "not_loaded"
+    with pytest.raises(ModelNotReady, match="not_loaded"):
+        loader.get()
+
+    assert loader.load_weights() == "model"
+    assert loader.state == "loaded" and not loader.ready
+    with pytest.raises(ModelNotReady, match="loaded"):
+        loader.get()
+
+    loader.warm_up()
+    assert warmed == ["model"]
+    assert loader.get() == "model"
+    status = loader.status()
+    assert (status["state"], status["ready"], status["shared_from_parent"]) == ("ready", True, False)
+    assert set(status["timings"]) == {"load_s", "warmup_s"}
+
+
+def test_weights_load_once():
+    calls = []
+    loader = ModelLoader(lambda: calls.append(1) or "model")
+    loader.warm_up()
+    loader.warm_up()
+    loader.load_weights()
+    assert len(calls) == 1
+
+
+def test_failed_load_is_reported():
+    def load():
+        raise FileNotFoundError("no weights")
+
+    loader = ModelLoader(load)
+    loader.start_background().join(5)
+    assert loader.state == "failed"
+    assert loader.status()["error"] == "FileNotFoundError: no weights"
+    with pytest.raises(ModelNotReady, match="failed: FileNotFoundError"):
+        loader.get()
+
+
+def test_background_load_makes_the_model_ready():
+    release = threading.Event()
+    loader = ModelLoader(lambda: release.wait(5) and "model")
+    loader.start_background()
+    assert not loader.wait(0.05)
+    release.set()
+    assert loader.wait(5)
+    assert loader.get() == "model"
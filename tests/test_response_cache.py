@@ -0,0 +1,93 @@
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plan_creation"))
+import response_cache
+from response_cache import ResponseCache, detection_key
+
+DETECTION = {"type": "camera_detection", "timestamp": 1.0,
+             "objects": [{"type": "boat", "confidence": 0.91}],
+             "location": {"coordinates": {"lat": 25.81234, "lon": -97.41234}}}
+
+
+def analysis(severity="high"):
+    return {"threat_analysis": {"severity": severity}, "agency_actions": {"coast_guard": ["intercept"]}}
+
+
+def test_key_ignores_volatile_fields_and_includes_the_version():
+    later = {**DETECTION, "timestamp": 99.0}
+    assert detection_key(DETECTION) == detection_key(later)
+    assert detection_key(DETECTION, version="prompt_v1") != detection_key(DETECTION, version="prompt_v2")
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.put("k", analysis())
+    now[0] += 9
+    assert cache.get("k") == analysis()
+    now[0] += 2
+    assert cache.get("k") is None
+    assert (cache.stats.hits, cache.stats.expired, cache.stats.misses) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", analysis("low"))
+    cache.put("b", analysis("medium"))
+    cache.get("a")
+    cache.put("c", analysis("high"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats.evictions == 1
+
+
+def test_sqlite_file_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = ResponseCache(path=path)
+    first.get_or_compute(DETECTION, analysis, version="v1")
+    first.close()
+
+    second = ResponseCache(path=path)
+    assert second.get_or_compute(DETECTION, lambda: analysis("low"), version="v1") == analysis()
+    assert second.stats.disk_hits == 1
+    # A different prompt or model version is not served from the old file
+    assert second.get_or_compute(DETECTION, lambda: analysis("low"), version="v2") == analysis("low")
+    second.close()
+
+
+def test_concurrent_identical_requests_share_one_call():
+    cache = ResponseCache()
+    calls, release = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return analysis()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute(DETECTION, compute)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while cache.stats.coalesced < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [analysis()] * 4
+    assert len({id(result) for result in results}) == 4
+
+
+def test_callers_cannot_change_the_cached_analysis():
+    cache = ResponseCache()
+    first = cache.get_or_compute(DETECTION, analysis)
+    first["agency_actions"]["coast_guard"].append("board")
+    second = cache.get_or_compute(DETECTION, analysis)
+    second["threat_analysis"]["severity"] = "low"
+    assert cache.get_or_compute(DETECTION, analysis) == analysis()
@@ -0,0 +1,70 @@
+import sys
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from response_store import ResponseStore
+
+
+def response(level, timestamp, lat=25.8, lon=-97.4):
+    return {"threat_level": level,
+            "detection": {"type": "camera_detection", "timestamp": timestamp,
+                          "location": {"coordinates": {"lat": lat, "lon": lon}}}}
+
+
+def test_superseded_responses_are_hidden_unless_asked(tmp_path):
+    store = ResponseStore(str(tmp_path / "store.db"))
+    rules_id, other_id = store.add_responses([response("low", 100.0), response("medium", 50.0)])
+    [escalated_id] = store.add_responses([response("high", 100.0)], supersedes=[rules_id])
+
+    current = store.query()["items"]
+    assert [item["id"] for item in current] == [escalated_id, other_id]
+    assert current[0]["supersedes"] == rules_id
+    assert [item["id"] for item in store.query(near=(25.8, -97.4, 1000))["items"]] == [escalated_id, other_id]
+
+    history = store.query(include_superseded=True)["items"]
+    assert {item["id"] for item in history} == {rules_id, escalated_id, other_id}
+    assert store.get("responses", rules_id)["superseded_by"] == escalated_id
+    store.close()
+
+
+def test_pages_follow_the_cursor(tmp_path):
+    store = ResponseStore(str(tmp_path / "store.db"))
+    store.add_responses([response("low", float(t)) for t in range(7)])
+    seen, cursor = [], None
+    while True:
+        page = store.query(limit=3, cursor=cursor)
+        seen += [item["timestamp"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [float(t) for t in reversed(range(7))]
+    store.close()
+
+
+def test_close_closes_readers_opened_by_other_threads(tmp_path):
+    store = ResponseStore(str(tmp_path / "store.db"))
+    store.add_responses([response("low", 1.0)])
+    readers = []
+
+    def query():
+        store.query()
+        readers.append(store.reader)
+
+    threads = [threading.Thread(target=query) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(db) for db in readers}) == 3
+
+    store.close()
+    for db in readers:
+        with pytest.raises(sqlite3.ProgrammingError):
+            db.execute("SELECT 1")
+    # The store reopens connections on next use, in this thread and in others
+    assert len(store.query()["items"]) == 1
+    store.close()
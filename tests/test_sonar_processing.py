@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "camera"))
+from sonar_processing import SonarConfig
+
+
+def test_from_metadata_converts_known_fields():
+    config = SonarConfig.from_metadata({"beams": "4", "max_peaks": 8.0, "pulse_length": 0.002, "operator": "ignored"})
+    assert (config.beams, config.max_peaks, config.pulse_length) == (4, 8, 0.002)
+    assert isinstance(config.max_peaks, int)
+
+
+@pytest.mark.parametrize("metadata", [
+    {"pulse_length": 0}, {"sample_rate": 0}, {"sample_rate": "nan"}, {"beams": -1},
+    {"false_alarm_rate": 1}, {"guard_cells": -2}, {"beams": "four"}, {"sound_speed": None},
+    {"beams": 4.7}, {"training_cells": "16.5"}, {"beams": True}, {"sample_rate": False}, {"max_peaks": "inf"},
+])
+def test_from_metadata_rejects_invalid_values(metadata):
+    with pytest.raises(ValueError):
+        SonarConfig.from_metadata(metadata)
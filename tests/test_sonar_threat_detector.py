@@ -0,0 +1,26 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+SONAR_DIR = Path(__file__).resolve().parent.parent / "sonar"
+sys.path.insert(0, str(SONAR_DIR))
+from sonar_threat_detector import MINE_LABELS, NUM_FEATURES, NumpySVM, SonarScorer
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")  # pickled with another scikit-learn version
+def test_numpy_svm_matches_the_shipped_sklearn_model():
+    joblib = pytest.importorskip("joblib")
+    pytest.importorskip("sklearn")
+    svc = joblib.load(SONAR_DIR / "svm_model.pkl")
+    exported = NumpySVM.load(SONAR_DIR / "svm_model.npz")
+    X = np.loadtxt(SONAR_DIR / "sonar.csv", delimiter=",", usecols=range(NUM_FEATURES))
+
+    decision = exported.decision_function(X)
+    np.testing.assert_allclose(decision, svc.decision_function(X), rtol=1e-9, atol=1e-9)
+    assert list(exported.classes_) == list(svc.classes_)
+    predicted = svc.predict(X)
+    assert (exported.classes_[(decision > 0).astype(int)] == predicted).all()
+    is_mine, _ = SonarScorer(exported).score(X)
+    assert is_mine.tolist() == [label in MINE_LABELS for label in predicted.tolist()]
@@ -0,0 +1,67 @@
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plan_creation"))
+from llm_client import EchoBackend, LlamaClient
+from threat_response_creation import stream_llama_model
+
+ANSWER = json.dumps({"threat_analysis": {"type": "vessel", "severity": "high", "confidence": 0.9, "details": ""},
+                     "agency_actions": {}})
+
+
+class RecordingBackend(EchoBackend):
+    """Streams ANSWER followed by trailing text, recording how far it got and whether it was closed"""
+
+    def __init__(self, fail_after=None):
+        super().__init__(response=ANSWER + " trailing tokens the model would keep generating", chunk_size=4)
+        self.fail_after = fail_after
+        self.yielded = 0
+        self.closed = False
+
+    def stream(self, prompt, prefix_name=None, prefix=""):
+        try:
+            for piece in super().stream(prompt, prefix_name, prefix):
+                if self.fail_after is not None and self.yielded >= self.fail_after:
+                    raise ConnectionError("stream dropped")
+                self.yielded += 1
+                yield piece
+        finally:
+            self.closed = True
+
+
+def test_stream_stops_and_closes_once_json_completes():
+    backend = RecordingBackend()
+    severities = []
+    response = stream_llama_model("prompt", lambda severity, elapsed: severities.append(severity),
+                                  LlamaClient(backend))
+    assert json.loads(response)["threat_analysis"]["severity"] == "high"
+    assert severities == ["high"]
+    assert backend.closed
+    assert backend.yielded * 4 < len(backend.response)
+
+
+def test_stream_error_closes_and_reports():
+    backend = RecordingBackend(fail_after=2)
+    assert stream_llama_model("prompt", lambda *_: None, LlamaClient(backend)).startswith("Error:")
+    assert backend.closed
+    with pytest.raises(ConnectionError):
+        stream_llama_model("prompt", lambda *_: None, LlamaClient(RecordingBackend(fail_after=2)),
+                           raise_errors=True)
+
+
+def test_close_incidents_records_each_closed_incident_once(monkeypatch):
+    import threat_response_creation
+    from fusion import FusionIndex
+
+    index = FusionIndex(distance_m=200, window_s=60)
+    monkeypatch.setattr(threat_response_creation, "fusion", index)
+    index.fuse([{"objects_detected": [{"type": "boat", "confidence": 0.8}],
+                 "coordinates": {"lat": 25.8, "lon": -97.4}, "timestamp": 0}])
+
+    assert threat_response_creation.close_incidents(now=30) == []
+    closed = threat_response_creation.close_incidents(now=100)
+    assert [(r["type"], r["incident_id"], r["closed_at"]) for r in closed] == [("incident_closed", 1, 100)]
+    assert threat_response_creation.close_incidents(now=200) == []
@@ -0,0 +1,58 @@
+import sys
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+SONAR_DIR = Path(__file__).resolve().parent.parent / "sonar"
+sys.path.insert(0, str(SONAR_DIR))
+from ping_store import UNKNOWN_LABEL, csv_to_ping, sidecar_paths
+from sonar_threat_detector import selected_model_path
+
+
+def write_version(models_dir, version, best, cv_accuracy):
+    version_dir = models_dir / version
+    version_dir.mkdir(parents=True)
+    report = {"best": best, "candidates": {
+        best: {"artifact": f"{best}.pkl", "metrics": {"cv_accuracy": cv_accuracy}},
+        "other": {"artifact": "other.pkl", "metrics": {"cv_accuracy": 0.0}},
+    }}
+    (version_dir / "metrics.json").write_text(json.dumps(report))
+
+
+def test_newest_run_is_selected_regardless_of_score(tmp_path, monkeypatch):
+    monkeypatch.delenv("SONAR_MODEL_VERSION", raising=False)
+    write_version(tmp_path, "20240101-120000", "knn", 0.99)
+    write_version(tmp_path, "20240301-120000", "svc_rbf", 0.80)
+    write_version(tmp_path, "20240301-120000-2", "logistic_regression", 0.70)
+    write_version(tmp_path, "20240301-120000-10", "random_forest", 0.60)
+    assert selected_model_path(tmp_path) == tmp_path / "20240301-120000-10" / "random_forest.pkl"
+
+
+def test_version_can_be_pinned(tmp_path, monkeypatch):
+    write_version(tmp_path, "20240101-120000", "knn", 0.99)
+    write_version(tmp_path, "20240301-120000", "svc_rbf", 0.80)
+    monkeypatch.setenv("SONAR_MODEL_VERSION", "20240101-120000")
+    assert selected_model_path(tmp_path) == tmp_path / "20240101-120000" / "knn.pkl"
+    with pytest.raises(FileNotFoundError):
+        selected_model_path(tmp_path, version="20230101-000000")
+
+
+def test_unknown_labels_are_not_trained_on(tmp_path):
+    pytest.importorskip("sklearn")
+    from train_sonar import train
+
+    csv = tmp_path / "pings.csv"
+    csv.write_text((SONAR_DIR / "sonar.csv").read_text())
+    archive = csv_to_ping(csv)
+    labels = np.fromfile(sidecar_paths(archive)[0], dtype=np.uint8)
+    labels[::10] = UNKNOWN_LABEL
+    labels.tofile(sidecar_paths(archive)[0])
+
+    report = train(archive, tmp_path / "models", n_jobs=1, n_splits=3, only=["logistic_regression"],
+                   cache_dir=None, verbose=False)
+    assert report["data"]["unlabelled_rows"] == len(labels[::10])
+    assert report["data"]["train_rows"] + report["data"]["test_rows"] == len(labels) - len(labels[::10])
+    with open(Path(report["path"]) / "metrics.json") as f:
+        assert json.load(f)["data"]["sha256"] == report["data"]["sha256"]
@@ -0,0 +1,73 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "plan_creation"))
+from triage import RESPONSE_TEMPLATES, Triage, rate_detection
+
+
+def camera(*objects, **fields):
+    return {"objects_detected": [{"type": t, "confidence": c} for t, c in objects], **fields}
+
+
+@pytest.mark.parametrize("detection, level", [
+    (camera(("boat", 0.9), threat_level="medium"), "medium"),  # the service's own rating wins
+    (camera(("boat", 0.9), ("submarine", 0.8)), "high"),
+    ({"detection": {"type": "mine", "confidence": 0.7}}, "high"),
+    (camera(("diver", 0.9)), "medium"),
+    (camera(("boat", 0.9)), "low"),
+    (camera(), "none"),
+    ({"sensor": "radar", "range_m": 1200}, None),
+])
+def test_rate_detection(detection, level):
+    assert rate_detection(detection) == level
+
+
+@pytest.mark.parametrize("detection, level, use_llm, reason", [
+    ({"sensor": "radar"}, None, True, "no rule-based rating"),
+    (camera(("diver", 0.9)), "medium", True, "rated medium"),
+    (camera(("boat", 0.3)), "low", True, "low confidence 0.30"),
+    (camera(("boat", 0.9)), "low", False, "rated low, below medium"),
+    (camera(), "none", False, "rated none, below medium"),
+])
+def test_decide(detection, level, use_llm, reason):
+    triage = Triage(threshold="medium", min_confidence=0.5)
+    decision = triage.decide(detection)
+    assert (decision.level, decision.use_llm, decision.reason) == (level, use_llm, reason)
+    assert (triage.stats.sent_to_llm, triage.stats.templated) == ((1, 0) if use_llm else (0, 1))
+
+
+def test_unknown_threshold_is_rejected():
+    with pytest.raises(ValueError):
+        Triage(threshold="severe")
+
+
+def test_templated_analysis_uses_the_rule_rating():
+    triage = Triage()
+    detection = camera(("boat", 0.9), ("buoy", 0.6))
+    analysis = triage.templated_analysis(detection, triage.decide(detection))
+    assert analysis["threat_analysis"]["type"] == "boat, buoy"
+    assert analysis["threat_analysis"]["severity"] == "low"
+    assert analysis["threat_analysis"]["confidence"] == 0.9
+    assert analysis["agency_actions"] == RESPONSE_TEMPLATES["low"]
+    # The template itself is not handed out
+    analysis["agency_actions"]["border_patrol"].append("changed")
+    assert RESPONSE_TEMPLATES["low"]["border_patrol"] == ["Log sighting and continue routine patrol"]
+
+
+def test_escalations_are_queued_only_when_enabled():
+    detection, response = camera(("boat", 0.9)), {"threat_level": "low"}
+
+    quiet = Triage(escalate=False)
+    quiet.queue_escalation(detection, response)
+    assert quiet.pending_escalations() == []
+
+    triage = Triage(escalate=True)
+    for _ in range(3):
+        triage.decide(detection)
+        triage.queue_escalation(detection, response)
+    assert triage.pending_escalations() == [(detection, response)] * 3
+    assert triage.pending_escalations() == []
+    assert triage.summary()["escalated"] == 3
+    assert triage.summary()["llm_calls_avoided"] == 0
@@ -0,0 +1,81 @@
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "camera"))
+import video_stream
+from video_stream import FFmpegDecoder, stream_video
+
+
+class FakeWebSocket:
+    def __init__(self, config, chunks):
+        self.config = config
+        self.messages = [{"type": "websocket.receive", "bytes": chunk} for chunk in chunks]
+        self.messages.append({"type": "websocket.receive", "text": '{"type": "end"}'})
+        self.sent = []
+
+    async def receive_json(self):
+        return self.config
+
+    async def receive(self):
+        if not self.messages:
+            await asyncio.sleep(3600)  # a client that keeps the socket open without sending
+        await asyncio.sleep(0.01)
+        return self.messages.pop(0)
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+def fake_decoder(script):
+    """An FFmpegDecoder whose subprocess is a Python script instead of ffmpeg"""
+    decoders = []
+
+    class ScriptDecoder(FFmpegDecoder):
+        def __init__(self, *args):
+            super().__init__(*args)
+            decoders.append(self)
+
+        def command(self):
+            return [sys.executable, "-c", script]
+
+    return ScriptDecoder, decoders
+
+
+async def no_objects(frame):
+    return []
+
+
+def test_decoder_failure_is_reported_to_the_client(monkeypatch):
+    decoder_cls, decoders = fake_decoder("import sys; sys.stdin.close(); sys.stderr.write('Invalid data'); sys.exit(1)")
+    monkeypatch.setattr(video_stream, "FFmpegDecoder", decoder_cls)
+    websocket = FakeWebSocket({"source": "container", "width": 2, "height": 2}, [b"x" * 65536] * 50)
+
+    summary = asyncio.run(asyncio.wait_for(stream_video(websocket, no_objects), 10))
+
+    errors = [m for m in websocket.sent if m["type"] == "error"]
+    assert len(errors) == 1 and "code 1" in errors[0]["detail"] and "Invalid data" in errors[0]["detail"]
+    assert websocket.sent[-1] == summary
+    assert decoders[0].proc.returncode == 1
+
+
+def test_detector_failure_stops_the_decoder(monkeypatch):
+    # Emits 2x2 BGR frames until killed
+    decoder_cls, decoders = fake_decoder(
+        "import sys, time\nwhile True:\n    sys.stdout.buffer.write(bytes(12)); sys.stdout.flush(); time.sleep(0.01)")
+    monkeypatch.setattr(video_stream, "FFmpegDecoder", decoder_cls)
+    websocket = FakeWebSocket({"source": "container", "width": 2, "height": 2, "detect_every": 1}, [])
+
+    async def failing_detect(frame):
+        raise RuntimeError("detector crashed")
+
+    async def session():
+        with pytest.raises(RuntimeError, match="detector crashed"):
+            await stream_video(websocket, failing_detect)
+        pending = [t for t in asyncio.all_tasks() if t.get_coro().__name__ in ("pump", "_read_stderr")]
+        assert not pending
+
+    asyncio.run(asyncio.wait_for(session(), 10))
+    assert decoders[0].proc.returncode is not None